@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+Burst load against the configured database: THREADS concurrent "requests"
+each running a few queries and releasing the connection the way Django
+does at the end of a request. Prints the wall time and bookissue.dbpool
+stats, e.g. to compare DB_POOL=0 (persistent connections) with the pool.
+Run this against a local PostgreSQL with: python manage.py shell < benchmark_db_pool.py
+"""
+
+import threading
+import time
+
+from django.db import close_old_connections, connection
+
+from bookissue.dbpool import pool_stats
+from tickets.models import Ticket
+
+THREADS = 32
+REQUESTS_PER_THREAD = 50
+
+
+def worker(timings):
+    for _ in range(REQUESTS_PER_THREAD):
+        start = time.perf_counter()
+        close_old_connections()  # request_started
+        Ticket.objects.filter(status='OPEN').count()
+        list(Ticket.objects.values_list('id', flat=True)[:20])
+        close_old_connections()  # request_finished
+        timings.append(time.perf_counter() - start)
+    connection.close()
+
+
+timings = []
+threads = [threading.Thread(target=worker, args=(timings,)) for _ in range(THREADS)]
+start = time.perf_counter()
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+elapsed = time.perf_counter() - start
+
+timings.sort()
+print(f'{len(timings)} requests on {THREADS} threads in {elapsed:.2f}s')
+print(f'p50 {timings[len(timings) // 2] * 1000:.1f} ms, p99 {timings[int(len(timings) * 0.99)] * 1000:.1f} ms')
+for alias, stats in pool_stats().items():
+    print(alias, stats)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Benchmark response encoding: DRF's JSONRenderer against FastJSONRenderer
+(orjson) and MessagePackRenderer, when those packages are installed
+Run this with: python manage.py shell < benchmark_renderers.py
+"""
+
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from bookissue import renderers
+
+ROUNDS = 20
+
+
+def user(pk, role='student'):
+    return {
+        'id': pk, 'email': f'user{pk}@example.com', 'username': f'user{pk}',
+        'first_name': 'Jane', 'last_name': f'Doe {pk}', 'full_name': f'Jane Doe {pk}',
+        'role': role, 'department': 'Computer Science',
+        'profile_picture': f'http://localhost:8000/media/profile_pictures/profile_{pk}.jpg',
+        'profile_picture_url': f'/media/profile_pictures/profile_{pk}.jpg',
+        'is_active': True, 'created_at': '2025-01-15T08:30:00.123456Z',
+    }
+
+
+def ticket(pk):
+    return {
+        'id': pk, 'title': f'Book "Data Structures" #{pk} is missing pages',
+        'status': ['OPEN', 'IN_PROGRESS', 'RESOLVED'][pk % 3],
+        'created_by': user(pk % 50), 'assigned_to': user(1000 + pk % 5, 'ict') if pk % 2 else None,
+        'created_at': '2025-08-01T10:00:00.654321Z', 'comments_count': pk % 7,
+    }
+
+
+def notification(pk):
+    return {
+        'id': pk, 'title': f'Ticket #{pk} Updated',
+        'message': f"Your ticket 'Book #{pk} is missing pages' status changed to In Progress.",
+        'notification_type': 'ticket_status', 'is_read': bool(pk % 3),
+        'created_at': '2025-08-01T10:00:00.654321Z', 'ticket_id': pk, 'time_ago': '2\xa0hours',
+    }
+
+
+def page(results):
+    return {'count': 5000, 'next': 'http://localhost:8000/api/tickets/?page=2', 'previous': None, 'results': results}
+
+
+payloads = {
+    'ticket page (20)': page([ticket(pk) for pk in range(20)]),
+    'ticket list (2000)': [ticket(pk) for pk in range(2000)],
+    'notifications (500)': [notification(pk) for pk in range(500)],
+}
+
+candidates = [('DRF JSONRenderer', JSONRenderer())]
+if renderers.orjson is not None:
+    candidates.append(('FastJSONRenderer', renderers.FastJSONRenderer()))
+else:
+    print("orjson is not installed: FastJSONRenderer falls back to JSONRenderer")
+if renderers.msgpack is not None:
+    candidates.append(('MessagePackRenderer', renderers.MessagePackRenderer()))
+else:
+    print("msgpack is not installed: skipping MessagePackRenderer")
+
+print(f"Best of {ROUNDS} rounds")
+for name, data in payloads.items():
+    baseline = None
+    for label, renderer in candidates:
+        timings = []
+        for _ in range(ROUNDS):
+            started = time.perf_counter()
+            body = renderer.render(data)
+            timings.append(time.perf_counter() - started)
+        best = min(timings)
+        baseline = baseline or best
+        print(f"{name:<22} {label:<20} {best * 1000:8.3f} ms  {len(body):>9,} bytes  x{baseline / best:.1f}")
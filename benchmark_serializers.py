@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Benchmark the compiled list serializers against the regular DRF ones
+Run this with: python manage.py shell < benchmark_serializers.py
+
+Sample rows are created inside a transaction that is rolled back, so the
+database is left untouched.
+"""
+
+import time
+
+from django.db import transaction
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+
+from bookissue.compiled import compile_serializer
+from notifications.models import Notification
+from notifications.serializers import NotificationListSerializer
+from tickets.models import Ticket
+from tickets.serializers import TicketListSerializer
+from users.models import User
+from users.serializers import UserListSerializer
+
+ROWS = 2000
+ROUNDS = 5
+
+
+def best_of(func):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def compare(name, serializer_class, queryset):
+    compiled = compile_serializer(serializer_class())
+    objects = list(queryset)
+    rows = list(queryset.values_list(*compiled.paths))
+
+    regular = JSONRenderer().render(serializer_class(objects, many=True).data)
+    assert regular == JSONRenderer().render(compiled.render(rows)), f"{name}: outputs differ"
+
+    # Serialization only: both sides start from already fetched rows
+    drf = best_of(lambda: serializer_class(objects, many=True).data)
+    fast = best_of(lambda: compiled.render(rows))
+    print(f"{name:<14} {len(rows):>6} rows  DRF {len(rows) / drf:>10,.0f} rows/s  "
+          f"compiled {len(rows) / fast:>10,.0f} rows/s  x{drf / fast:.1f}")
+
+
+with transaction.atomic():
+    staff = User.objects.create_user(
+        email='bench-staff@example.com', username='bench-staff', password='x',
+        first_name='Bench', last_name='Staff', role='ict', department='ICT'
+    )
+    student = User.objects.create_user(
+        email='bench-student@example.com', username='bench-student', password='x',
+        first_name='Bench', last_name='Student', profile_picture='profile_pictures/bench.png'
+    )
+    User.objects.bulk_create([
+        User(email=f'bench-{i}@example.com', username=f'bench-{i}', first_name='User', last_name=str(i))
+        for i in range(ROWS)
+    ])
+    Ticket.objects.bulk_create([
+        Ticket(title=f'Benchmark ticket {i}', description='Pages missing from the book',
+               created_by=student, assigned_to=staff if i % 2 else None)
+        for i in range(ROWS)
+    ])
+    Notification.objects.bulk_create([
+        Notification(user=student, title=f'Notification {i}', message='Your ticket was updated')
+        for i in range(ROWS)
+    ])
+
+    print(f"Best of {ROUNDS} rounds")
+    compare('tickets', TicketListSerializer, Ticket.objects.select_related('created_by', 'assigned_to')
+            .annotate(comments_count=Count('comments')).order_by('-id')[:ROWS])
+    compare('notifications', NotificationListSerializer, Notification.objects.filter(user=student)[:ROWS])
+    compare('users', UserListSerializer, User.objects.order_by('-id')[:ROWS])
+
+    transaction.set_rollback(True)
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class BookissueConfig(AppConfig):
+    name = 'bookissue'
+
+    def ready(self):
+        import bookissue.signals
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookissue.settings')
+# Read by settings: persistent connections don't suit ASGI
+os.environ.setdefault('DJANGO_ASGI', '1')
 
 application = get_asgi_application()
+
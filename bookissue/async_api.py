@@ -0,0 +1,134 @@
+"""
+Building blocks for the async (ASGI-native) read views.
+
+An async view serves the common form of a read endpoint with the async
+ORM and returns None for anything else (parameters it doesn't handle,
+unknown objects, permission errors, non-JSON clients), in which case the
+regular DRF view answers through sync_to_async. Both produce the same
+bytes and headers for the requests the async view accepts. Requests
+being profiled (bookissue/profiling.py) always go to the DRF view.
+"""
+from functools import cache, wraps
+from math import ceil
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .async_auth import authenticate
+from .compiled import compile_serializer
+from .renderers import FastJSONRenderer
+
+_renderer = FastJSONRenderer()
+
+
+def json_requested(request):
+    """True when DRF would pick the JSON renderer for this request"""
+    if 'format' in request.GET:
+        return False
+    # DRF prefers the most specific type listed, so every one of them has
+    # to resolve to JSON; "; indent=N" asks for indented output
+    for item in request.META.get('HTTP_ACCEPT', '*/*').split(','):
+        media_type, _, params = item.partition(';')
+        if media_type.strip() not in ('*/*', 'application/*', 'application/json') or 'indent' in params:
+            return False
+    return True
+
+
+def only_params(request, allowed):
+    """True when the query string holds nothing but `allowed` parameters"""
+    return set(request.GET) <= set(allowed)
+
+
+@cache
+def compiled(serializer_class):
+    """Compiled form of `serializer_class` with all of its fields"""
+    return compile_serializer(serializer_class())
+
+
+def _allowed_methods(sync_view):
+    """The Allow header the DRF view sends"""
+    actions = getattr(sync_view, 'actions', None)
+    if actions is None:
+        methods = {method for method in sync_view.cls.http_method_names if hasattr(sync_view.cls, method)}
+    else:
+        methods = set(actions) | {'options'}
+    # View.setup() maps HEAD to GET
+    if 'get' in methods:
+        methods.add('head')
+    return [method.upper() for method in sync_view.cls.http_method_names if method in methods]
+
+
+async def paginate(request, queryset, render=None):
+    """
+    PageNumberPagination's payload for `queryset`, with `render` turning a
+    page of rows into results (the rows as they are without it); None for
+    a page DRF would reject
+    """
+    number = request.GET.get('page', '1')
+    if not number.isdigit() or int(number) < 1:
+        return None
+    number = int(number)
+    page_size = api_settings.PAGE_SIZE
+    count = await queryset.acount()
+    if number > max(1, ceil(count / page_size)):
+        return None
+
+    offset = (number - 1) * page_size
+    rows = [row async for row in queryset[offset:offset + page_size]]
+    url = request.build_absolute_uri()
+    if number == 1:
+        previous = None
+    elif number == 2:
+        previous = remove_query_param(url, 'page')
+    else:
+        previous = replace_query_param(url, 'page', number - 1)
+    return {
+        'count': count,
+        'next': replace_query_param(url, 'page', number + 1) if offset + page_size < count else None,
+        'previous': previous,
+        'results': rows if render is None else render(rows),
+    }
+
+
+def async_read_view(sync_view):
+    """
+    Decorator turning `handler(request, user, **kwargs)` into an async view
+    for the URL served by `sync_view`, which handles every other method
+    and whatever the handler declines (returns None for).
+    """
+    fallback = sync_to_async(sync_view)
+    allow = ', '.join(_allowed_methods(sync_view))
+
+    def decorator(handler):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            # Profiled requests use the DRF view, which runs in the profiled thread
+            profiling = getattr(request, 'profiling', False)
+            if request.method in ('GET', 'HEAD') and json_requested(request) and not profiling:
+                user = await authenticate(request)
+                if user is not None:
+                    response = await handler(request, user, *args, **kwargs)
+                    if response is not None:
+                        # Headers APIView.finalize_response() adds
+                        response['Allow'] = allow
+                        patch_vary_headers(response, ('Accept',))
+                        return response
+                    # DRF's Request takes the user as is instead of loading it again
+                    request._force_auth_user = user
+            return await fallback(request, *args, **kwargs)
+
+        # Lets schema generation document the URL as the DRF view
+        for name in ('cls', 'initkwargs', 'actions'):
+            if hasattr(sync_view, name):
+                setattr(view, name, getattr(sync_view, name))
+        return csrf_exempt(view)
+    return decorator
+
+
+def json_response(data):
+    """What DRF's Response would send through the JSON renderer"""
+    return HttpResponse(_renderer.render(data), content_type='application/json')
@@ -0,0 +1,28 @@
+"""
+JWT authentication for async views.
+
+Same checks as simplejwt's JWTAuthentication (valid access token, existing
+and active user), with the user loaded through the async ORM.
+"""
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .cache import token_user_id
+
+
+async def authenticate(request):
+    """The request's user (also set as request.user), or None"""
+    user_id = token_user_id(request)
+    if user_id is None:
+        return None
+
+    User = get_user_model()
+    try:
+        user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        return None
+    if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        return None
+
+    request.user = user
+    return user
@@ -0,0 +1,124 @@
+"""
+Per-view query budgets.
+
+Decorate a view method (a ViewSet action, an APIView handler or the
+list/retrieve/create... method a generic view delegates to) or a view
+function with @query_budget(n) to declare the most database queries one
+request may run, independent of the page size. budget_for(request) finds
+the budget of the view a request resolved to; async views built with
+bookissue.async_api share the budget of the DRF view they stand in for.
+
+QueryBudgetMiddleware enforces the budgets while QUERY_BUDGETS_ENFORCED
+is set (DEBUG by default): a request over its budget fails with
+QueryBudgetExceeded, listing the queries. Tests check them with
+bookissue.testing.QueryBudgetAssertions.
+"""
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.renderers import BrowsableAPIRenderer
+
+from .metrics import request_stats
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(queries):
+    """Declare the query budget of a view method or function"""
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+# Generic views' handlers delegate to these methods
+GENERIC_ACTIONS = {
+    'get': ('list', 'retrieve'),
+    'post': ('create',),
+    'put': ('update',),
+    'patch': ('partial_update',),
+    'delete': ('destroy',),
+}
+
+
+def budget_for_view(func, method):
+    """Query budget of a resolved view callable for `method`, or None"""
+    budget = getattr(func, 'query_budget', None)
+    cls = getattr(func, 'cls', None)
+    if budget is not None or cls is None:
+        return budget
+
+    actions = getattr(func, 'actions', None)
+    if actions is not None:
+        names = [actions.get(method.lower())]
+    else:
+        names = [method.lower(), *GENERIC_ACTIONS.get(method.lower(), ())]
+    for name in names:
+        budget = getattr(getattr(cls, name or '', None), 'query_budget', None)
+        if budget is not None:
+            return budget
+    return None
+
+
+def budget_for(request):
+    """Query budget of the view handling `request`, or None"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return budget_for_view(match.func, request.method)
+
+
+class QueryBudgetMiddleware:
+    """
+    Fails requests that run more queries than their view's budget. Has to
+    come after MetricsMiddleware, which counts the queries.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = self.start()
+        if stats is None:
+            return self.get_response(request)
+        return self.finish(request, self.get_response(request), stats)
+
+    async def __acall__(self, request):
+        stats = self.start()
+        if stats is None:
+            return await self.get_response(request)
+        return self.finish(request, await self.get_response(request), stats)
+
+    def start(self):
+        stats = request_stats()
+        if not settings.QUERY_BUDGETS_ENFORCED or stats is None:
+            return None
+        # Queries are counted by MetricsMiddleware, including those async views run in threads
+        stats.sql = []
+        return stats
+
+    def finish(self, request, response, stats):
+        budget = budget_for(request)
+        # The browsable API's forms run queries of their own
+        renderer = getattr(response, 'accepted_renderer', None)
+        if isinstance(renderer, BrowsableAPIRenderer):
+            budget = None
+        if budget is not None and stats.queries > budget:
+            logger.error('%s %s ran %d queries, budget %d', request.method, request.path, stats.queries, budget)
+            listing = '\n'.join(stats.sql)
+            raise QueryBudgetExceeded(
+                f'{request.method} {request.path} ran {stats.queries} queries, budget {budget}:\n{listing}'
+            )
+        response['X-Query-Count'] = str(stats.queries)
+        return response
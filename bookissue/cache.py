@@ -0,0 +1,215 @@
+"""
+Per-user response cache for read-heavy endpoints.
+
+Cached responses are keyed by the JWT user id, the URL with its query
+parameters (sorted), the Accept header and a version counter for every
+scope (`tickets`, `comments`, `notifications`, `users`) the endpoint
+depends on. Saves and deletes bump the counters of their scope after
+commit (see bookissue/signals.py), which makes every older entry
+unreachable; nothing is deleted explicitly.
+
+A hit is answered before DRF authenticates the request: the token is
+validated without loading the user, so repeated identical reads don't
+touch the database. Entries are only written after the view itself
+returned 200 for that user, and the `users` version is part of every
+key, so role or account changes invalidate them as well.
+
+The backend is the `responses` alias in CACHES (file based by default so
+workers on one host share it; any Django cache backend works).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+CACHE_ALIAS = 'responses'
+CHANGED_AT_KEY = 'version:changed-at'
+
+_authentication = JWTAuthentication()
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(scope):
+    return f'version:{scope}'
+
+
+def versions(*scopes):
+    """Current version of each scope, initialising missing counters"""
+    cache = _cache()
+    keys = [_version_key(scope) for scope in scopes]
+    current = cache.get_many(keys)
+    for key in keys:
+        if key not in current:
+            # Start from the clock, not 0: an evicted counter must not
+            # come back with a value older entries were stored under
+            cache.add(key, time.time_ns(), timeout=None)
+            current[key] = cache.get(key)
+    return [current[key] for key in keys]
+
+
+def bump(*scopes):
+    """Invalidate every cached response depending on `scopes`"""
+    cache = _cache()
+    cache.set(CHANGED_AT_KEY, time.time(), timeout=None)
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_on_commit(*scopes):
+    """bump() once the current transaction commits (immediately outside one)"""
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+def token_user_id(request):
+    """User id from a valid JWT access token, without a database query"""
+    header = _authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = _authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    try:
+        token = _authentication.get_validated_token(raw_token)
+    except InvalidToken:
+        return None
+    return token.get(jwt_settings.USER_ID_CLAIM)
+
+
+def response_key(request, scopes):
+    """Cache key for a GET request, None when it can't be cached"""
+    user_id = token_user_id(request)
+    if user_id is None:
+        return None
+    query = sorted((name, values) for name, values in request.GET.lists())
+    parts = [
+        user_id, request.get_host(), request.path, query,
+        request.META.get('HTTP_ACCEPT', ''), *zip(scopes, versions(*scopes)),
+    ]
+    raw = '|'.join(str(part) for part in parts)
+    return 'response:' + hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def _restore(request, cached):
+    content, status, headers = cached
+    response = HttpResponse(content, status=status, headers=headers)
+    etag = response.get('ETag')
+    if etag:
+        return get_conditional_response(request, etag=etag, response=response)
+    return response
+
+
+def _cacheable(response):
+    """(content, status, headers) to store, or None"""
+    if response.status_code != 200 or response.streaming:
+        return None
+    # The browsable API embeds per-session forms and CSRF tokens
+    if response.get('Content-Type', '').startswith('text/html'):
+        return None
+    return (response.content, response.status_code, dict(response.items()))
+
+
+def _used_replica():
+    from .routers import used_replica
+    return used_replica()
+
+
+def _recently_changed(changed_at):
+    """
+    True when a replica may not have replayed the last change yet
+    (bookissue/routers.py). A response built from it must not be cached
+    under the new versions.
+    """
+    return time.time() - (changed_at or 0) < settings.REPLICA_MAX_LAG
+
+
+def _needs_render(response):
+    return hasattr(response, 'render') and not response.is_rendered
+
+
+def cache_response(*scopes):
+    """
+    Decorator for a view function (an `as_view()` result, an @api_view
+    function or an async view) caching its successful GET responses per
+    user.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapped(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD') or not settings.RESPONSE_CACHE_TIMEOUT:
+                    return await view(request, *args, **kwargs)
+                key = await sync_to_async(response_key)(request, scopes)
+                if key is None:
+                    return await view(request, *args, **kwargs)
+
+                cached = await _cache().aget(key)
+                if cached is not None:
+                    return _restore(request, cached)
+
+                response = await view(request, *args, **kwargs)
+                if _needs_render(response):
+                    await sync_to_async(response.render)()
+                cached = _cacheable(response)
+                if cached is not None and _used_replica():
+                    if _recently_changed(await _cache().aget(CHANGED_AT_KEY)):
+                        cached = None
+                if cached is not None:
+                    await _cache().aset(key, cached, settings.RESPONSE_CACHE_TIMEOUT)
+                return response
+            return async_wrapped
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not settings.RESPONSE_CACHE_TIMEOUT:
+                return view(request, *args, **kwargs)
+            key = response_key(request, scopes)
+            if key is None:
+                return view(request, *args, **kwargs)
+
+            cached = _cache().get(key)
+            if cached is not None:
+                return _restore(request, cached)
+
+            response = view(request, *args, **kwargs)
+            if _needs_render(response):
+                response.render()
+            cached = _cacheable(response)
+            if cached is not None and _used_replica() and _recently_changed(_cache().get(CHANGED_AT_KEY)):
+                cached = None
+            if cached is not None:
+                _cache().set(key, cached, settings.RESPONSE_CACHE_TIMEOUT)
+            return response
+        return wrapped
+    return decorator
+
+
+class CachedActionsMixin:
+    """
+    ViewSet mixin caching the GET actions listed in `cached_actions`
+    ({action name: scopes}) with cache_response(). Pass
+    `cached_actions={}` to as_view() for an uncached view.
+    """
+    cached_actions = {}
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        cached_actions = initkwargs.get('cached_actions', cls.cached_actions)
+        scopes = cached_actions.get((actions or {}).get('get'))
+        return cache_response(*scopes)(view) if scopes else view
@@ -0,0 +1,174 @@
+"""
+Compiled read-only serialization for list endpoints.
+
+compile_serializer() turns a ModelSerializer (narrowed by ?fields= or not)
+into the list of values() paths it reads plus one generated row -> dict
+function that produces exactly what the serializer would, without DRF's
+per-field, per-row machinery. Compiled serializers are cached per class
+and field selection.
+
+Fields that are not plain model columns need a recipe in the serializer's
+`compiled_fields`: {name: (paths, function)}, where the function receives
+the values of `paths` in order (None as function means the single path's
+value as is). Serializers with anything else return None and stay on the
+regular path.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .streaming import split_rows, stream_json_list
+
+# Fields whose to_representation() is the identity for values from the database
+IDENTITY_FIELDS = (
+    serializers.CharField, serializers.EmailField, serializers.IntegerField,
+    serializers.BooleanField, serializers.ReadOnlyField, PrimaryKeyRelatedField,
+)
+
+_cache = {}
+
+
+class NotCompilable(Exception):
+    pass
+
+
+class CompiledSerializer:
+    def __init__(self, paths, build, source):
+        self.paths = paths
+        self.build = build
+        self.source = source
+
+    def render(self, rows, request=None):
+        """Dicts for tuples of `paths` values (e.g. values_list(*paths))"""
+        build = self.build
+        return [build(row, request) for row in rows]
+
+
+def _is_identity(field):
+    if type(field) in IDENTITY_FIELDS:
+        return True
+    if type(field) is serializers.BigIntegerField:
+        return not getattr(field, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING)
+    if type(field) is serializers.ChoiceField:
+        # Stored string choices map to themselves
+        return all(isinstance(key, str) for key in field.choices)
+    return False
+
+
+def _file_url(storage):
+    def url(name, request):
+        if not name:
+            return None
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return url
+
+
+class _Compiler:
+
+    def __init__(self):
+        self.paths = []
+        self.namespace = {}
+
+    def column(self, path):
+        if path not in self.paths:
+            self.paths.append(path)
+        return f'row[{self.paths.index(path)}]'
+
+    def function(self, func):
+        name = f'f{len(self.namespace)}'
+        self.namespace[name] = func
+        return name
+
+    def object(self, serializer, model, prefix, names=None):
+        recipes = getattr(serializer, 'compiled_fields', {})
+        items = []
+        for name, field in serializer.fields.items():
+            if field.write_only or (names is not None and name not in names):
+                continue
+            items.append(f'{name!r}: {self.field(name, field, recipes, model, prefix)}')
+        return '{' + ', '.join(items) + '}'
+
+    def field(self, name, field, recipes, model, prefix):
+        if name in recipes:
+            paths, func = recipes[name]
+            args = ', '.join(self.column(prefix + path) for path in paths)
+            return args if func is None else f'{self.function(func)}({args})'
+
+        if field.source == '*' or len(field.source_attrs) != 1:
+            raise NotCompilable(name)
+        try:
+            model_field = model._meta.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            raise NotCompilable(name)
+        forward = model_field.concrete and (model_field.many_to_one or model_field.one_to_one)
+        if model_field.is_relation and not forward:
+            raise NotCompilable(name)
+
+        if prefix and model_field.primary_key:
+            # Same value as the foreign key column guarding the nested object
+            value = self.column(prefix[:-2])
+        else:
+            value = self.column(prefix + model_field.name)
+        if isinstance(field, serializers.BaseSerializer):
+            if not model_field.is_relation:
+                raise NotCompilable(name)
+            nested = self.object(field, model_field.related_model, f'{prefix}{model_field.name}__')
+            return f'(None if {value} is None else {nested})'
+        if model_field.is_relation and not isinstance(field, PrimaryKeyRelatedField):
+            raise NotCompilable(name)
+        if isinstance(field, serializers.FileField):
+            return f'{self.function(_file_url(model_field.storage))}({value}, request)'
+        if _is_identity(field):
+            return value
+        return f'(None if {value} is None else {self.function(field.to_representation)}({value}))'
+
+
+def compile_serializer(serializer):
+    """
+    CompiledSerializer for a serializer instance (or many=True list) and
+    the fields it currently renders; None when it can't be compiled.
+    """
+    serializer = getattr(serializer, 'child', serializer)
+    serializer_class = type(serializer)
+    names = tuple(serializer.fields)
+    key = (serializer_class, names)
+    if key not in _cache:
+        # Compile from a context-free instance: the cache outlives requests
+        compiler = _Compiler()
+        try:
+            expression = compiler.object(serializer_class(), serializer_class.Meta.model, '', set(names))
+        except NotCompilable:
+            _cache[key] = None
+        else:
+            source = f'def build(row, request):\n    return {expression}\n'
+            exec(source, compiler.namespace)
+            _cache[key] = CompiledSerializer(compiler.paths, compiler.namespace['build'], source)
+    return _cache[key]
+
+
+def compiled_list_response(view, queryset, serializer, paginate=True):
+    """
+    List response rendered by the compiled serializer from values_list()
+    rows, paginated like the view when `paginate` is set (and streamed
+    when it isn't and the list is long, see bookissue/streaming.py). None
+    when the serializer can't be compiled.
+    """
+    compiled = compile_serializer(serializer)
+    if compiled is None:
+        return None
+
+    rows = queryset.values_list(*compiled.paths)
+    if not paginate:
+        rows, rest = split_rows(view.request, rows)
+        if rest is not None:
+            return stream_json_list(view.request, rows, rest, lambda chunk: compiled.render(chunk, view.request))
+        return Response(compiled.render(rows, view.request))
+
+    page = view.paginate_queryset(rows)
+    data = compiled.render(rows if page is None else page, view.request)
+    if page is None:
+        return Response(data)
+    return view.get_paginated_response(data)
@@ -0,0 +1,166 @@
+"""
+Response compression (gzip, and Brotli when the brotli package is installed).
+
+Negotiated from Accept-Encoding, skipped for small bodies, already
+compressed media and Server-Sent Events, and applied chunk by chunk to
+streaming responses (sync and async). Bytes before/after compression are
+counted per encoding; see compression_stats().
+"""
+import gzip
+import re
+import threading
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Media types that are already compressed, or must not be buffered (SSE)
+SKIP_CONTENT_TYPES = (
+    'image/', 'video/', 'audio/', 'font/woff', 'text/event-stream',
+    'application/zip', 'application/gzip', 'application/x-gzip', 'application/x-brotli',
+    'application/x-7z-compressed', 'application/x-rar-compressed', 'application/pdf',
+)
+COMPRESSIBLE_IMAGES = ('image/svg+xml',)
+
+_coding_re = re.compile(r'\s*([a-z*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$', re.I)
+_lock = threading.Lock()
+_stats = {}
+
+
+def _record(encoding, original, compressed, responses=0):
+    with _lock:
+        stats = _stats.setdefault(encoding, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0})
+        stats['responses'] += responses
+        stats['bytes_in'] += original
+        stats['bytes_out'] += compressed
+
+
+def compression_stats():
+    """Per-encoding responses, bytes in/out and bytes saved since start"""
+    with _lock:
+        return {
+            encoding: {**stats, 'bytes_saved': stats['bytes_in'] - stats['bytes_out']}
+            for encoding, stats in _stats.items()
+        }
+
+
+def choose_encoding(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header value"""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        match = _coding_re.match(item)
+        if match:
+            try:
+                accepted[match.group(1).lower()] = float(match.group(2) or 1)
+            except ValueError:
+                continue
+
+    def quality(coding):
+        return accepted.get(coding, accepted.get('*', 0))
+
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    candidates = [coding for coding in candidates if quality(coding) > 0]
+    if not candidates:
+        return None
+    # Highest q-value wins; ties go to the better compressor (listed first)
+    return max(candidates, key=lambda coding: (quality(coding), -candidates.index(coding)))
+
+
+class _Compressor:
+    """Incremental compressor with a flush after every chunk"""
+
+    def __init__(self, encoding):
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._flush = self._compressor.flush
+            self._compress = self._compressor.process
+            self._finish = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def chunk(self, data):
+        return self._compress(data) + self._flush()
+
+    def finish(self):
+        return self._finish()
+
+
+def compress(encoding, content):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _stream(encoding, chunks):
+    compressor = _Compressor(encoding)
+    for data in chunks:
+        out = compressor.chunk(data)
+        _record(encoding, len(data), len(out))
+        yield out
+    out = compressor.finish()
+    _record(encoding, 0, len(out), responses=1)
+    yield out
+
+
+async def _astream(encoding, chunks):
+    compressor = _Compressor(encoding)
+    async for data in chunks:
+        out = compressor.chunk(data)
+        _record(encoding, len(data), len(out))
+        yield out
+    out = compressor.finish()
+    _record(encoding, 0, len(out), responses=1)
+    yield out
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses for clients that accept it. Settings:
+    COMPRESSION_MIN_SIZE (bytes, non-streaming bodies only),
+    COMPRESSION_GZIP_LEVEL and COMPRESSION_BROTLI_QUALITY.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return response
+        content_type = response.get('Content-Type', '').lower()
+        if content_type.startswith(SKIP_CONTENT_TYPES) and not content_type.startswith(COMPRESSIBLE_IMAGES):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _astream(encoding, response.streaming_content)
+            else:
+                response.streaming_content = _stream(encoding, response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            content = compress(encoding, response.content)
+            if len(content) >= len(response.content):
+                return response
+            _record(encoding, len(response.content), len(content), responses=1)
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        # The compressed body is a different byte sequence: weaken strong ETags
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,57 @@
+"""
+Conditional GET support (ETag / Last-Modified) for API read endpoints.
+
+Views compute cheap validators from a single small query, call
+not_modified() before doing any real work and set_validators() on the
+full response.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the values that determine a representation"""
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return quote_etag(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+
+def latest(*timestamps):
+    """Most recent of the given timestamps, ignoring None"""
+    values = [value for value in timestamps if value is not None]
+    return max(values) if values else None
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """
+    Return a 304 response when the client's cached copy is still current
+    (If-None-Match / If-Modified-Since), otherwise None.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        _apply_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """Attach validators to a successful response"""
+    if response.status_code == 200:
+        _apply_validators(response, etag, last_modified)
+    return response
+
+
+def _apply_validators(response, etag, last_modified):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Per-user data: browsers may keep it but must revalidate every time
+    patch_cache_control(response, private=True, no_cache=True)
@@ -0,0 +1,70 @@
+"""
+Database connection reuse statistics.
+
+With a psycopg_pool pool (DATABASES OPTIONS['pool'], see settings) the
+pool's own counters are reported: size, connections in use and idle,
+requests waiting, total wait time and requests that timed out. With
+persistent connections (CONN_MAX_AGE) only the number of connections
+opened is known; it should stay close to the number of worker threads.
+"""
+import threading
+
+from django.db import connections
+
+_lock = threading.Lock()
+_opened = {}
+
+# psycopg_pool get_stats() keys -> names reported by pool_stats()
+POOL_COUNTERS = {
+    'pool_min': 'min_size',
+    'pool_max': 'max_size',
+    'pool_size': 'size',
+    'pool_available': 'idle',
+    'requests_waiting': 'waiting',
+    'requests_num': 'requests',
+    'requests_queued': 'requests_queued',
+    'requests_wait_ms': 'wait_ms',
+    'requests_errors': 'timeouts',
+    'returns_bad': 'bad_returns',
+    'connections_num': 'connections_opened',
+    'connections_ms': 'connect_ms',
+    'connections_errors': 'connection_errors',
+    'connections_lost': 'connections_lost',
+}
+
+
+def record_connection(sender, connection, **kwargs):
+    """connection_created receiver counting new connections per alias"""
+    with _lock:
+        _opened[connection.alias] = _opened.get(connection.alias, 0) + 1
+
+
+def _pool(alias):
+    connection = connections[alias]
+    if not connection.settings_dict.get('OPTIONS', {}).get('pool'):
+        return None
+    return getattr(connection, 'pool', None)
+
+
+def pool_stats():
+    """{alias: stats} for every configured database"""
+    stats = {}
+    for alias in connections:
+        pool = _pool(alias)
+        if pool is not None:
+            # Cumulative since the pool opened; pop_stats() would reset them
+            raw = pool.get_stats()
+            entry = {'mode': 'pool'}
+            entry.update({name: raw.get(key, 0) for key, name in POOL_COUNTERS.items()})
+            entry['in_use'] = entry['size'] - entry['idle']
+        else:
+            conn_max_age = connections[alias].settings_dict.get('CONN_MAX_AGE', 0)
+            with _lock:
+                opened = _opened.get(alias, 0)
+            entry = {
+                'mode': 'persistent' if conn_max_age != 0 else 'per-request',
+                'conn_max_age': conn_max_age,
+                'connections_opened': opened,
+            }
+        stats[alias] = entry
+    return stats
@@ -0,0 +1,93 @@
+"""
+Lazily loaded API documentation.
+
+Views import `swagger_auto_schema` and `openapi` from here instead of
+drf_yasg. The decorator only records its arguments, and openapi.<name>
+(or a call of it) is a placeholder, so serving the API never imports
+drf_yasg. The docs routes build their drf_yasg views on first request
+(docs_view()), and schema generation calls apply_docs() to resolve the
+placeholders and apply the real decorators first.
+"""
+from django.views.decorators.csrf import csrf_exempt
+
+_pending = []
+
+
+class _Deferred:
+    """drf_yasg.openapi.<name>, or a call of it, resolved on demand"""
+    _unset = object()
+
+    def __init__(self, name, args=None, kwargs=None):
+        self._name = name
+        self._args = args
+        self._kwargs = kwargs
+        self._value = self._unset
+
+    def __call__(self, *args, **kwargs):
+        return _Deferred(self._name, args, kwargs)
+
+    def resolve(self):
+        if self._value is self._unset:
+            from drf_yasg import openapi as drf_openapi
+            value = getattr(drf_openapi, self._name)
+            if self._args is not None:
+                value = value(*_resolve(self._args), **_resolve(self._kwargs))
+            self._value = value
+        return self._value
+
+
+def _resolve(value):
+    if isinstance(value, _Deferred):
+        return value.resolve()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_resolve(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _resolve(item) for key, item in value.items()}
+    return value
+
+
+class _LazyOpenAPI:
+    """Stand-in for the drf_yasg.openapi module"""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _Deferred(name)
+
+
+openapi = _LazyOpenAPI()
+
+
+def swagger_auto_schema(**kwargs):
+    """drf_yasg's swagger_auto_schema, applied when the schema is generated"""
+    def decorator(view_method):
+        _pending.append((view_method, kwargs))
+        return view_method
+    return decorator
+
+
+def apply_docs():
+    """Apply every recorded swagger_auto_schema (imports drf_yasg)"""
+    from drf_yasg.utils import swagger_auto_schema as decorate
+    while _pending:
+        view_method, kwargs = _pending.pop(0)
+        decorate(**_resolve(kwargs))(view_method)
+
+
+def docs_view(renderer=None):
+    """
+    URLconf entry for a docs route: the spec (renderer None) or the
+    'swagger'/'redoc' UI. The drf_yasg view is built on first request.
+    """
+    view = None
+
+    def lazy_view(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            from .schema import SchemaView
+            if renderer is None:
+                view = SchemaView.without_ui(cache_timeout=0)
+            else:
+                view = SchemaView.with_ui(renderer, cache_timeout=0)
+        return view(request, *args, **kwargs)
+    return csrf_exempt(lazy_view)
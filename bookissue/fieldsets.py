@@ -0,0 +1,101 @@
+"""
+Sparse fieldsets for API read endpoints.
+
+?fields=id,title,status keeps only the listed top-level fields of each
+object and ?omit=description drops fields. Serializers opt in with
+SparseFieldsMixin; views pass their queryset through prune_queryset() so
+relations, annotations and columns behind unrequested fields are not
+loaded either. Nested objects are always rendered whole.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _names(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Drop the fields not selected by ?fields= / ?omit= on read requests.
+
+    Only applies to the top-level serializer (or the child of a many=True
+    list) built with the request in its context.
+
+    `sparse_requires` maps fields whose source is not a model field
+    (properties, method fields) to the model paths they read, e.g.
+    {'full_name': ['first_name', 'last_name'], 'author_name': ['author.first_name']}.
+    """
+    sparse_requires = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        fields = _names(request, 'fields')
+        omit = _names(request, 'omit') or set()
+        if fields is None and not omit:
+            return
+        for name in list(self.fields):
+            if (fields is not None and name not in fields) or name in omit:
+                self.fields.pop(name)
+
+
+def prune_queryset(queryset, serializer, annotations=None, always=()):
+    """
+    Narrow `queryset` to what `serializer` renders.
+
+    - nested serializers and dotted sources over a forward relation
+      become select_related()
+    - `annotations` (name -> expression) are only added for rendered fields
+    - only() keeps the primary key, `always` and the columns the rendered
+      fields read; when a field's source can't be traced to the model all
+      columns are loaded
+    """
+    serializer = getattr(serializer, 'child', serializer)
+    annotations = annotations or {}
+    requires = getattr(serializer, 'sparse_requires', {})
+    opts = queryset.model._meta
+    columns = set(always)
+    related = set()
+    traceable = True
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in annotations:
+            queryset = queryset.annotate(**{name: annotations[name]})
+            continue
+
+        if name in requires:
+            paths = [(path.split('.'), False) for path in requires[name]]
+        elif field.source == '*':
+            traceable = False
+            continue
+        else:
+            paths = [(field.source_attrs, isinstance(field, serializers.BaseSerializer))]
+
+        for attrs, nested in paths:
+            try:
+                model_field = opts.get_field(attrs[0])
+            except FieldDoesNotExist:
+                traceable = False
+                continue
+            if model_field.is_relation and not model_field.concrete:
+                # Reverse relations are prefetched, not selected
+                continue
+            columns.add(model_field.name)
+            if model_field.is_relation and (nested or len(attrs) > 1):
+                related.add(model_field.name)
+
+    if related:
+        queryset = queryset.select_related(*related)
+    if traceable:
+        queryset = queryset.only(opts.pk.name, *columns)
+    return queryset
@@ -0,0 +1,98 @@
+"""
+Measure what a worker imports at boot.
+
+Runs a fresh interpreter with `-X importtime` that loads the WSGI
+application and the URLconf (what a worker does before serving its first
+request) and reports import time per top-level package and for the
+project's own modules.
+
+Usage (e.g. in CI, failing when boot imports exceed 900 ms):
+    python manage.py profile_imports --threshold-ms 900
+"""
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BOOT_SCRIPT = (
+    'import importlib, sys; '
+    'importlib.import_module(sys.argv[1]); '
+    'importlib.import_module(sys.argv[2])'
+)
+
+# import time:       self [us] |  cumulative | imported package
+_line_re = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| *(\S+)$')
+
+
+def measure_imports():
+    """[(module, self_us, cumulative_us)] for one cold boot"""
+    wsgi_module = settings.WSGI_APPLICATION.rsplit('.', 1)[0]
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT, wsgi_module, settings.ROOT_URLCONF],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise CommandError(f'Boot failed:\n{result.stderr[-2000:]}')
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _line_re.match(line)
+        if match:
+            self_us, cumulative_us, module = match.groups()
+            modules.append((module, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def project_packages():
+    """Top-level packages of the apps living in this repository"""
+    base = str(settings.BASE_DIR)
+    packages = {settings.ROOT_URLCONF.split('.')[0]}
+    for config in apps.get_app_configs():
+        if os.path.abspath(config.path).startswith(base):
+            packages.add(config.name.split('.')[0])
+    return packages
+
+
+class Command(BaseCommand):
+    help = 'Report per-package and per-module import time of a worker boot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Boots to measure; the fastest one is reported')
+        parser.add_argument('--top', type=int, default=15, help='Packages and project modules to list')
+        parser.add_argument(
+            '--threshold-ms', type=float,
+            help='Fail when the total boot import time exceeds this many milliseconds'
+        )
+
+    def handle(self, *args, **options):
+        runs = [measure_imports() for _ in range(max(options['runs'], 1))]
+        modules = min(runs, key=lambda run: sum(self_us for _, self_us, _ in run))
+        total_ms = sum(self_us for _, self_us, _ in modules) / 1000
+        project = project_packages()
+
+        packages = defaultdict(int)
+        for module, self_us, _ in modules:
+            packages[module.split('.')[0]] += self_us
+
+        self.stdout.write(f'{len(modules)} modules imported in {total_ms:.0f} ms (best of {len(runs)})\n')
+        self.stdout.write('Packages (self time):')
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            marker = '*' if package in project else ' '
+            self.stdout.write(f'  {marker} {self_us / 1000:8.1f} ms  {package}')
+
+        self.stdout.write('\nProject modules (cumulative, including what they import):')
+        own = [entry for entry in modules if entry[0].split('.')[0] in project]
+        for module, _, cumulative_us in sorted(own, key=lambda entry: -entry[2])[:options['top']]:
+            self.stdout.write(f'    {cumulative_us / 1000:8.1f} ms  {module}')
+
+        threshold = options['threshold_ms']
+        if threshold is not None:
+            if total_ms > threshold:
+                raise CommandError(f'Boot imports took {total_ms:.0f} ms, over the {threshold:.0f} ms threshold')
+            self.stdout.write(self.style.SUCCESS(f'\nWithin the {threshold:.0f} ms threshold'))
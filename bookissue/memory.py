@@ -0,0 +1,99 @@
+"""
+Per-request memory instrumentation (tracemalloc).
+
+With MEMORY_TRACE set, MemoryTraceMiddleware measures the peak of Python
+allocations during each request above what was allocated when it
+started, including the iteration of streamed bodies. Peaks go to the
+log at DEBUG level, and to an X-Memory-Peak header on bodies that aren't
+streamed. A request peaking over MEMORY_TRACE_THRESHOLD bytes logs a
+warning with the MEMORY_TRACE_TOP source lines holding the most memory
+when it ends (response data and body included).
+
+tracemalloc slows Python down noticeably and its counters are
+process-wide, so turn it on for one worker that serves one request at a
+time (e.g. a gunicorn sync worker), not for the whole deployment.
+"""
+import logging
+import tracemalloc
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import route_name
+
+logger = logging.getLogger(__name__)
+
+# Allocations made by the tracing itself or by imports aren't the request's
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>')
+
+
+def top_allocations(limit):
+    """The `limit` source lines holding the most traced memory"""
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, filename) for filename in IGNORED_FILES]
+    )
+    return snapshot.statistics('lineno')[:limit]
+
+
+def report(request, peak):
+    route = route_name(request)
+    if peak < settings.MEMORY_TRACE_THRESHOLD:
+        logger.debug('%s %s (%s) peaked at %d bytes', request.method, request.path, route, peak)
+        return
+    lines = '\n'.join(f'  {stat}' for stat in top_allocations(settings.MEMORY_TRACE_TOP))
+    logger.warning(
+        '%s %s (%s) peaked at %.1f MiB; largest allocations still held:\n%s',
+        request.method, request.path, route, peak / 1024 / 1024, lines
+    )
+
+
+class MemoryTraceMiddleware:
+    """Reports each request's peak memory (see the module docstring)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.MEMORY_TRACE:
+            raise MiddlewareNotUsed
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.MEMORY_TRACE_FRAMES)
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        baseline = self.start()
+        return self.finish(request, self.get_response(request), baseline)
+
+    async def __acall__(self, request):
+        baseline = self.start()
+        return self.finish(request, await self.get_response(request), baseline)
+
+    def start(self):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        return baseline
+
+    def finish(self, request, response, baseline):
+        if response.streaming:
+            measured = self.ameasured if response.is_async else self.measured
+            response.streaming_content = measured(request, response.streaming_content, baseline)
+            return response
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        response['X-Memory-Peak'] = str(peak)
+        report(request, peak)
+        return response
+
+    def measured(self, request, content, baseline):
+        """The streamed body, reporting the peak once it has been sent"""
+        yield from content
+        report(request, tracemalloc.get_traced_memory()[1] - baseline)
+
+    async def ameasured(self, request, content, baseline):
+        """measured() for bodies streamed under ASGI"""
+        async for part in content:
+            yield part
+        report(request, tracemalloc.get_traced_memory()[1] - baseline)
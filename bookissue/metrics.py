@@ -0,0 +1,354 @@
+"""
+Request metrics in Prometheus text format.
+
+MetricsMiddleware records, per resolved URL name, method and status:
+a latency histogram, the number of database queries and the time spent
+in them, and response bytes. Each thread writes to its own shard, so the
+request path takes no shared lock (a shard's lock is only taken to add a
+series and while /metrics copies it).
+
+Queries are counted by an execute wrapper that every connection gets
+when it's created (see bookissue/signals.py). It adds to the current
+request's counters through a context variable, which also reaches the
+threads async views run their queries in.
+
+With several worker processes (gunicorn) set METRICS_DIR: every process
+then writes its totals there every METRICS_FLUSH_INTERVAL seconds and
+/metrics sums the files of all processes. Empty the directory when the
+service is restarted, as with prometheus_client's multiprocess mode.
+
+Scrapers authenticate with METRICS_TOKEN; while it is unset /metrics is
+refused unless DEBUG is on.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+
+from .compression import compression_stats
+from .dbpool import pool_stats
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Per series: histogram buckets (plus +Inf), then the totals below
+COUNT, SECONDS, QUERIES, DB_SECONDS, BYTES = range(len(BUCKETS) + 1, len(BUCKETS) + 6)
+SERIES_LENGTH = BYTES + 1
+
+
+class _Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+
+
+class _RequestStats:
+    __slots__ = ('request', 'queries', 'db_seconds', 'sql')
+
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.sql = None  # list of statements when something asked for them
+
+
+_shards = []
+_shards_lock = threading.Lock()
+_local = threading.local()
+_current = ContextVar('request_metrics', default=None)
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = _Shard()
+        with _shards_lock:
+            _shards.append(shard)
+    return shard
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper adding each query's time to the current request"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - start
+        if stats.sql is not None:
+            stats.sql.append(sql)
+
+
+def request_stats():
+    """Query counters of the current request (None outside MetricsMiddleware)"""
+    return _current.get()
+
+
+@contextmanager
+def untracked():
+    """Queries run in this block (diagnostics) don't count towards the request"""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver; pooled connections are created again on checkout"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record(route, method, status, seconds, queries, db_seconds, size):
+    key = (route, method, str(status))
+    shard = _shard()
+    values = shard.series.get(key)
+    if values is None:
+        with shard.lock:
+            values = shard.series.setdefault(key, [0] * SERIES_LENGTH)
+    for index, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            values[index] += 1
+            break
+    else:
+        values[len(BUCKETS)] += 1
+    values[COUNT] += 1
+    values[SECONDS] += seconds
+    values[QUERIES] += queries
+    values[DB_SECONDS] += db_seconds
+    values[BYTES] += size
+
+
+def snapshot():
+    """This process's series and gauges, JSON-serializable"""
+    series = {}
+    with _shards_lock:
+        shards = list(_shards)
+    for shard in shards:
+        with shard.lock:
+            items = [(key, list(values)) for key, values in shard.series.items()]
+        for key, values in items:
+            total = series.setdefault('\x1f'.join(key), [0] * SERIES_LENGTH)
+            for index, value in enumerate(values):
+                total[index] += value
+    return {
+        'time': time.time(),
+        'series': series,
+        'compression': compression_stats(),
+        'pools': pool_stats(),
+    }
+
+
+def flush(force=False):
+    """Write this process's snapshot to METRICS_DIR (at most every METRICS_FLUSH_INTERVAL)"""
+    global _last_flush
+    directory = settings.METRICS_DIR
+    if not directory or (not force and time.monotonic() - _last_flush < settings.METRICS_FLUSH_INTERVAL):
+        return
+    # One thread writes; the others carry on serving
+    if not _flush_lock.acquire(blocking=force):
+        return
+    try:
+        _last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(snapshot(), file)
+        os.replace(temporary, path)
+    finally:
+        _flush_lock.release()
+
+
+def collect():
+    """Snapshots of every process (just this one without METRICS_DIR)"""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return [snapshot()]
+    flush(force=True)
+    snapshots = []
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as file:
+                snapshots.append(json.load(file))
+        except (OSError, ValueError):
+            # Removed or being replaced
+            continue
+    return snapshots
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _sum_nested(snapshots, name, live_after=None):
+    """Sum per-key dicts of numbers (compression, pool stats) across processes"""
+    totals = {}
+    for data in snapshots:
+        if live_after is not None and data['time'] < live_after:
+            continue
+        for key, stats in data[name].items():
+            entry = totals.setdefault(key, {})
+            for stat, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    entry[stat] = entry.get(stat, 0) + value
+    return totals
+
+
+def render(snapshots):
+    """Prometheus text exposition of the summed snapshots"""
+    series = {}
+    for data in snapshots:
+        for key, values in data['series'].items():
+            total = series.setdefault(key, [0] * SERIES_LENGTH)
+            for index, value in enumerate(values):
+                total[index] += value
+
+    lines = [
+        '# HELP bookissue_request_duration_seconds Request latency by route',
+        '# TYPE bookissue_request_duration_seconds histogram',
+    ]
+    ordered = sorted((tuple(key.split('\x1f')), values) for key, values in series.items())
+    for (route, method, status), values in ordered:
+        cumulative = 0
+        for index, bound in enumerate((*BUCKETS, '+Inf')):
+            cumulative += values[index]
+            labels = _labels(route=route, method=method, status=status, le=bound)
+            lines.append(f'bookissue_request_duration_seconds_bucket{labels} {cumulative}')
+        labels = _labels(route=route, method=method, status=status)
+        lines.append(f'bookissue_request_duration_seconds_sum{labels} {values[SECONDS]}')
+        lines.append(f'bookissue_request_duration_seconds_count{labels} {values[COUNT]}')
+
+    totals = (
+        ('bookissue_request_queries_total', 'Database queries run by requests', QUERIES),
+        ('bookissue_request_db_seconds_total', 'Time requests spent in database queries', DB_SECONDS),
+        ('bookissue_response_bytes_total', 'Response body bytes sent (streamed bodies not counted)', BYTES),
+    )
+    for name, help_text, index in totals:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (route, method, status), values in ordered:
+            lines.append(f'{name}{_labels(route=route, method=method, status=status)} {values[index]}')
+
+    compression = _sum_nested(snapshots, 'compression')
+    for stat in ('responses', 'bytes_in', 'bytes_out'):
+        name = f'bookissue_compression_{stat}_total'
+        lines += [f'# HELP {name} Compressed responses ({stat.replace("_", " ")})', f'# TYPE {name} counter']
+        for encoding, stats in sorted(compression.items()):
+            lines.append(f'{name}{_labels(encoding=encoding)} {stats.get(stat, 0)}')
+
+    # Gauges only from processes that reported recently; counters from all
+    live_after = time.time() - 3 * settings.METRICS_FLUSH_INTERVAL
+    pools = _sum_nested(snapshots, 'pools', live_after)
+    counters = _sum_nested(snapshots, 'pools')
+    for stat in ('size', 'in_use', 'idle', 'waiting'):
+        name = f'bookissue_db_pool_{stat}'
+        lines += [f'# HELP {name} Database pool connections ({stat.replace("_", " ")})', f'# TYPE {name} gauge']
+        for alias, stats in sorted(pools.items()):
+            if stat in stats:
+                lines.append(f'{name}{_labels(alias=alias)} {stats[stat]}')
+    for stat in ('requests', 'wait_ms', 'timeouts', 'connections_opened', 'connections_lost'):
+        name = f'bookissue_db_{stat}_total'
+        lines += [f'# HELP {name} Database connections ({stat.replace("_", " ")})', f'# TYPE {name} counter']
+        for alias, stats in sorted(counters.items()):
+            if stat in stats:
+                lines.append(f'{name}{_labels(alias=alias)} {stats[stat]}')
+
+    # Only reported once something loaded the schema (importing it pulls in drf_yasg)
+    schema_module = sys.modules.get('bookissue.schema')
+    schema = getattr(schema_module, '_schema', None)
+    if schema is not None:
+        lines += [
+            '# HELP bookissue_openapi_schema_load_seconds Time this process took to load the OpenAPI schema',
+            '# TYPE bookissue_openapi_schema_load_seconds gauge',
+            f'bookissue_openapi_schema_load_seconds{_labels(source=schema.source)} {schema.seconds}',
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+def route_name(request):
+    """URL name of the view a request resolved to (the route pattern when unnamed)"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """Times every request and records it under its route (see record())"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, start = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, start)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, start = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, start)
+        return response
+
+    def start(self, request):
+        stats = _RequestStats(request)
+        return stats, _current.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, start):
+        size = 0 if response.streaming else len(response.content)
+        record(
+            route_name(request), request.method, response.status_code,
+            time.perf_counter() - start, stats.queries, stats.db_seconds, size
+        )
+        flush()
+
+
+@csrf_exempt
+@require_GET
+def metrics_view(request):
+    """
+    GET /metrics; requires `Authorization: Bearer <METRICS_TOKEN>`. Without
+    a token it is only served when DEBUG is on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,252 @@
+"""
+On-demand request profiling.
+
+A request from a super admin carrying the X-Profile header is run under a
+profiler: pyinstrument when it's installed, cProfile otherwise (or when
+the header says `X-Profile: cprofile`). The response gets an X-Profile-Id
+header and the profile is kept in the shared `responses` cache for
+PROFILE_TTL seconds, so any worker can serve it:
+
+    GET /api/profiles/                    recent profiles
+    GET /api/profiles/<id>/               flame graph input (download)
+    GET /api/profiles/<id>/?output=...    another output format
+
+cProfile runs come with folded stacks sampled alongside (`collapsed`, for
+flamegraph.pl, speedscope or inferno) and the pstats dump (`pstats`, for
+snakeviz);
+pyinstrument ones as speedscope JSON (`speedscope`) and its HTML page.
+Requests without the header only pay for the header lookup.
+"""
+import cProfile
+import marshal
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from users.permissions import IsSuperAdmin
+
+from .cache import CACHE_ALIAS, token_user_id
+from .docs import openapi, swagger_auto_schema
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:
+    Profiler = None
+
+PROFILE_HEADER = 'X-Profile'
+INDEX_KEY = 'profiles'
+INDEX_LENGTH = 50
+
+# output -> (content type, file extension)
+OUTPUTS = {
+    'collapsed': ('text/plain; charset=utf-8', 'txt'),
+    'pstats': ('application/octet-stream', 'prof'),
+    'speedscope': ('application/json', 'speedscope.json'),
+    'html': ('text/html; charset=utf-8', 'html'),
+}
+
+
+def _profile_key(profile_id):
+    return f'profile:{profile_id}'
+
+
+def _label(code):
+    return f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'.replace(';', ',')
+
+
+class _StackSampler(threading.Thread):
+    """
+    Samples the profiled thread's stack every PROFILE_INTERVAL seconds into
+    folded stacks ("outer;inner samples" lines). cProfile only records
+    caller/callee pairs, which can't be turned back into stacks reliably.
+    """
+
+    def __init__(self, base_frame):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = threading.get_ident()
+        self.base_frame = base_frame
+        self.samples = defaultdict(int)
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(settings.PROFILE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            # Only the frames below the middleware
+            while frame is not None and frame is not self.base_frame:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def finish(self):
+        self.done.set()
+        self.join()
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.samples.items()))
+
+
+class _CProfileRun:
+    kind = 'cprofile'
+
+    def __init__(self, base_frame):
+        self.sampler = _StackSampler(base_frame)
+        self.sampler.start()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def finish(self):
+        self.profile.disable()
+        self.profile.create_stats()
+        return {
+            'collapsed': self.sampler.finish().encode(),
+            # The format pstats.Stats.dump_stats() writes
+            'pstats': marshal.dumps(self.profile.stats),
+        }
+
+
+class _PyinstrumentRun:
+    kind = 'pyinstrument'
+
+    def __init__(self, base_frame):
+        self.profiler = Profiler(interval=settings.PROFILE_INTERVAL)
+        self.profiler.start()
+
+    def finish(self):
+        self.profiler.stop()
+        return {
+            'speedscope': self.profiler.output(renderer=SpeedscopeRenderer()).encode(),
+            'html': self.profiler.output_html().encode(),
+        }
+
+
+def start_profiler(requested, base_frame):
+    if Profiler is None or requested.strip().lower() == 'cprofile':
+        return _CProfileRun(base_frame)
+    return _PyinstrumentRun(base_frame)
+
+
+def may_profile(request):
+    """True when the request comes with a super admin's access token"""
+    user_id = token_user_id(request)
+    if user_id is None:
+        return False
+    return get_user_model().objects.filter(pk=user_id, role='super_admin', is_active=True).exists()
+
+
+def store(request, run, outputs, seconds, status_code):
+    profile_id = uuid.uuid4().hex
+    summary = {
+        'id': profile_id,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': status_code,
+        'duration_ms': round(seconds * 1000, 3),
+        'profiler': run.kind,
+        'outputs': list(outputs),
+        'created_at': timezone.now().isoformat(),
+    }
+    cache = caches[CACHE_ALIAS]
+    cache.set(_profile_key(profile_id), {'summary': summary, 'outputs': outputs}, settings.PROFILE_TTL)
+    # Best effort: a concurrent profile may drop out of the listing, not the cache
+    index = [entry for entry in cache.get(INDEX_KEY, []) if entry['id'] != profile_id]
+    cache.set(INDEX_KEY, [summary, *index][:INDEX_LENGTH], settings.PROFILE_TTL)
+    return profile_id
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests super admins mark with the X-Profile header.
+    Served async, other requests are awaited straight through; profiled
+    ones run in the request's sync thread, where the profiler can follow
+    them.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        requested = request.headers.get(PROFILE_HEADER)
+        if requested is None or not may_profile(request):
+            return self.get_response(request)
+        return self.profile(request, requested, self.get_response)
+
+    async def __acall__(self, request):
+        requested = request.headers.get(PROFILE_HEADER)
+        if requested is None or not await sync_to_async(may_profile)(request):
+            return await self.get_response(request)
+        # The views' sync work comes back to this thread (async_to_sync runs it here)
+        return await sync_to_async(self.profile)(
+            request, requested, async_to_sync(self.get_response)
+        )
+
+    def profile(self, request, requested, get_response):
+        # Makes async views run their work in this thread (see bookissue.async_api)
+        request.profiling = True
+        run = start_profiler(requested, sys._getframe())
+        start = time.perf_counter()
+        try:
+            response = get_response(request)
+        finally:
+            seconds = time.perf_counter() - start
+            outputs = run.finish()
+        response['X-Profile-Id'] = store(request, run, outputs, seconds, response.status_code)
+        return response
+
+
+@swagger_auto_schema(method='get', operation_description="Recently stored request profiles (super admin only)")
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsSuperAdmin])
+def profile_list_view(request):
+    cache = caches[CACHE_ALIAS]
+    # Profiles expire one by one; the index lives as long as the newest
+    index = cache.get(INDEX_KEY, [])
+    return Response([entry for entry in index if cache.has_key(_profile_key(entry['id']))])
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Download a stored request profile (super admin only)",
+    manual_parameters=[
+        openapi.Parameter(
+            'output', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(OUTPUTS),
+            description="collapsed or pstats (cProfile), speedscope or html (pyinstrument); "
+                        "defaults to the profile's flame graph input"
+        ),
+    ],
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsSuperAdmin])
+def profile_download_view(request, profile_id):
+    profile = caches[CACHE_ALIAS].get(_profile_key(profile_id))
+    if profile is None:
+        return Response({'error': 'Profile not found or expired'}, status=status.HTTP_404_NOT_FOUND)
+
+    outputs = profile['outputs']
+    output = request.query_params.get('output') or next(iter(outputs))
+    if output not in outputs:
+        return Response(
+            {'error': f"Output must be one of: {', '.join(outputs)}"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    content_type, extension = OUTPUTS[output]
+    response = HttpResponse(outputs[output], content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.{extension}"'
+    return response
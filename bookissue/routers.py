@@ -0,0 +1,166 @@
+"""
+Read replica routing.
+
+ReplicaRoutingMiddleware marks GET/HEAD/OPTIONS requests to the API's
+read paths (tickets, comments, notifications, users) as replica-safe and
+ReplicaRouter then sends their reads of those apps' models to one of
+DATABASE_REPLICAS. Everything else uses the primary (`default`):
+
+- writes, and every read after the first write of a request
+- requests of a user who wrote in the last REPLICA_STICKY_SECONDS (the
+  user id comes from the JWT; pins are kept in the shared `responses`
+  cache so every worker sees them), so users read their own writes
+- replicas lagging more than REPLICA_MAX_LAG seconds (or unreachable);
+  lag is measured at most every REPLICA_LAG_CHECK_INTERVAL seconds per
+  process
+
+Without replicas configured the router always answers None (primary).
+"""
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from django.utils.deprecation import MiddlewareMixin
+
+from .cache import CACHE_ALIAS, token_user_id
+
+ROUTED_APPS = {'tickets', 'comments', 'notifications', 'users'}
+READ_PATHS = ('/api/tickets/', '/api/comments/', '/api/notifications/', '/api/users/')
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# seconds of replay lag on a standby, 0 when it has replayed everything it received
+POSTGRES_LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+class RoutingState:
+    """Per-request routing decisions"""
+
+    def __init__(self, replica_safe):
+        self.replica_safe = replica_safe
+        self.wrote = False
+        self.used_replica = False
+
+
+_state = ContextVar('replica_routing', default=None)
+
+_lag_lock = threading.Lock()
+_lag = {}  # alias -> (measured at, lag seconds or None when unreachable)
+
+
+def _pin_key(user_id):
+    return f'primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send the user's reads to the primary for REPLICA_STICKY_SECONDS"""
+    caches[CACHE_ALIAS].set(_pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user_id):
+    return caches[CACHE_ALIAS].get(_pin_key(user_id), False)
+
+
+def measure_lag(alias):
+    """Replication lag of a replica in seconds; None when it can't be queried"""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        # Stand-ins (e.g. SQLite copies) don't replicate
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(POSTGRES_LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except DatabaseError:
+        return None
+    return float(lag or 0)
+
+
+def replica_lag(alias):
+    """measure_lag(), reused for REPLICA_LAG_CHECK_INTERVAL seconds"""
+    now = time.monotonic()
+    with _lag_lock:
+        measured_at, lag = _lag.get(alias, (None, None))
+        if measured_at is not None and now - measured_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return lag
+        # Other threads keep using the previous value while this one measures
+        _lag[alias] = (now, lag)
+    lag = measure_lag(alias)
+    with _lag_lock:
+        _lag[alias] = (now, lag)
+    return lag
+
+
+def healthy_replicas():
+    replicas = []
+    for alias in settings.DATABASE_REPLICAS:
+        lag = replica_lag(alias)
+        if lag is not None and lag <= settings.REPLICA_MAX_LAG:
+            replicas.append(alias)
+    return replicas
+
+
+def used_replica():
+    """True when the current request read from a replica"""
+    state = _state.get()
+    return state is not None and state.used_replica
+
+
+class ReplicaRouter:
+    """Sends replica-safe reads of the API apps to a healthy replica"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_safe or state.wrote:
+            return None
+        if model._meta.app_label not in ROUTED_APPS:
+            return None
+        replicas = healthy_replicas()
+        if not replicas:
+            return None
+        state.used_replica = True
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """Decides per request whether reads may use a replica"""
+
+    def process_request(self, request):
+        replica_safe = False
+        if settings.DATABASE_REPLICAS and request.method in SAFE_METHODS and request.path.startswith(READ_PATHS):
+            user_id = token_user_id(request)
+            replica_safe = user_id is None or not is_pinned(user_id)
+        _state.set(RoutingState(replica_safe))
+
+    def process_response(self, request, response):
+        state = _state.get()
+        if state is not None and state.wrote:
+            user_id = token_user_id(request)
+            if user_id is not None:
+                pin_to_primary(user_id)
+        _state.set(None)
+        return response
@@ -0,0 +1,130 @@
+"""
+Precomputed OpenAPI schema.
+
+drf_yasg generates the schema by introspecting every view and serializer,
+which is far too slow to repeat per request. The schema is built once per
+process instead, on the first docs request, or read from
+OPENAPI_SCHEMA_FILE when `python manage.py generate_schema` wrote it at
+deploy time. Re-run the command after API changes. This module imports
+drf_yasg and is only loaded by the docs routes (see bookissue/docs.py).
+
+The JSON/YAML documents are encoded once and served from memory with an
+ETag; the Swagger UI and ReDoc pages only render their HTML shell.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest, HttpResponse
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml, yaml_dump
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .docs import apply_docs
+from .conditional import make_etag, not_modified, set_validators
+
+logger = logging.getLogger(__name__)
+
+api_info = openapi.Info(
+    title="Book Issue Tracker API",
+    default_version='v1',
+    description="A comprehensive API for managing book issue tickets with role-based access control",
+    terms_of_service="https://www.yourapi.com/terms/",
+    contact=openapi.Contact(email="admin@bookissue.com"),
+    license=openapi.License(name="MIT License"),
+)
+
+_lock = threading.Lock()
+_schema = None
+
+
+class PrecomputedSchema:
+    def __init__(self, swagger, documents, source, seconds):
+        self.swagger = swagger  # Swagger object for the UI pages (title, version)
+        self.documents = documents  # 'json'/'yaml' -> encoded bytes
+        self.source = source
+        self.seconds = seconds
+        digest = hashlib.md5(documents['json'], usedforsecurity=False).hexdigest()
+        self.etags = {name: make_etag('schema', name, digest) for name in documents}
+
+
+def generate_schema():
+    """Introspect the API and return the Swagger object"""
+    import_module(settings.ROOT_URLCONF)
+    apply_docs()
+
+    # Views pick serializers by request method, so introspect through an
+    # anonymous GET like a docs visitor's
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.META = {'SERVER_NAME': 'localhost', 'SERVER_PORT': '80'}
+    request = Request(http_request)
+    request.user = AnonymousUser()
+
+    generator = SchemaView.generator_class(api_info)
+    swagger = generator.get_schema(request=request, public=True)
+    # Without host/schemes clients use the origin the spec was served from
+    swagger.pop('host', None)
+    swagger.pop('schemes', None)
+    return swagger
+
+
+def encode_json(swagger):
+    return OpenAPICodecJson([]).encode(swagger)
+
+
+def _build():
+    path = settings.OPENAPI_SCHEMA_FILE
+    started = time.perf_counter()
+    if path and os.path.exists(path):
+        with open(path, 'rb') as schema_file:
+            content = schema_file.read()
+        documents = {'json': content, 'yaml': yaml_dump(json.loads(content), binary=True)}
+        swagger = openapi.Swagger(info=api_info, _prefix='/', paths=openapi.Paths({}))
+        source = path
+    else:
+        swagger = generate_schema()
+        documents = {'json': encode_json(swagger), 'yaml': OpenAPICodecYaml([]).encode(swagger)}
+        source = 'generated'
+
+    seconds = time.perf_counter() - started
+    logger.info('OpenAPI schema loaded from %s in %.0f ms', source, seconds * 1000)
+    return PrecomputedSchema(swagger, documents, source, seconds)
+
+
+def load_schema():
+    """The process-wide PrecomputedSchema, built on first use"""
+    global _schema
+    if _schema is None:
+        with _lock:
+            if _schema is None:
+                _schema = _build()
+    return _schema
+
+
+class SchemaView(get_schema_view(api_info, public=True, permission_classes=(permissions.AllowAny,))):
+    """drf_yasg schema view answering from the precomputed schema"""
+
+    def get(self, request, version='', format=None):
+        schema = load_schema()
+        codec_class = getattr(request.accepted_renderer, 'codec_class', None)
+        if codec_class is None:
+            # Swagger UI / ReDoc: an HTML shell that fetches the spec itself
+            return Response(schema.swagger)
+
+        document = 'yaml' if codec_class is OpenAPICodecYaml else 'json'
+        etag = schema.etags[document]
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        response = HttpResponse(schema.documents[document], content_type=request.accepted_renderer.media_type)
+        return set_validators(response, etag)
@@ -12,7 +12,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
+from importlib.util import find_spec
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,11 +50,18 @@ INSTALLED_APPS = [
     'tickets',
     'comments',
     'notifications',
+    'bookissue',
 ]
 
 MIDDLEWARE = [
+    'bookissue.metrics.MetricsMiddleware',
+    'bookissue.budgets.QueryBudgetMiddleware',
+    'bookissue.profiling.ProfilingMiddleware',
+    'bookissue.memory.MemoryTraceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'bookissue.compression.CompressionMiddleware',
+    'bookissue.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -88,14 +97,57 @@ WSGI_APPLICATION = 'bookissue.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'bookIssue_db',
-        'USER': 'bookIssue-user',
-        'PASSWORD': '0001',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': os.environ.get('DB_NAME', 'bookIssue_db'),
+        'USER': os.environ.get('DB_USER', 'bookIssue-user'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', '0001'),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
     }
 }
 
+# Connection reuse (see bookissue/dbpool.py for the stats). With psycopg 3
+# and psycopg_pool installed (psycopg[pool] in the Pipfile) each worker
+# process keeps a bounded pool, checking connections on checkout, which
+# also suits ASGI. Otherwise, or with DB_POOL=0, each thread keeps its
+# connection for DB_CONN_MAX_AGE seconds and Django checks it before
+# reusing it in a new request. Under ASGI (bookissue/asgi.py sets
+# DJANGO_ASGI) requests run their queries in threads of their own, each of
+# which would keep a connection open, so DB_CONN_MAX_AGE defaults to 0.
+RUNNING_ASGI = os.environ.get('DJANGO_ASGI', '0') != '0'
+DB_POOL_ENABLED = (
+    os.environ.get('DB_POOL', '1') != '0'
+    and find_spec('psycopg') is not None and find_spec('psycopg_pool') is not None
+)
+if DB_POOL_ENABLED:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),  # seconds to wait for a free connection
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'check': ConnectionPool.check_connection,
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 0 if RUNNING_ASGI else 600))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Read replicas (bookissue/routers.py): DB_REPLICA_HOSTS=host1,host2 adds
+# `replica1`, `replica2`, ... with the primary's credentials. Safe-method
+# requests to the API read paths read from a replica unless its lag
+# exceeds REPLICA_MAX_LAG or the user wrote in the last REPLICA_STICKY_SECONDS.
+DATABASE_REPLICAS = []
+for number, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['bookissue.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 15
+REPLICA_MAX_LAG = 5  # seconds
+REPLICA_LAG_CHECK_INTERVAL = 5  # seconds between lag measurements per replica
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -142,6 +194,67 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 FILE_UPLOAD_PERMISSIONS = 0o644
 
+# Changes feed (tickets/sync.py): rows are handed out once they are this
+# old, so a transaction that took an earlier timestamp or id but commits
+# after a batch was read isn't skipped by the clients' cursors
+SYNC_SAFETY_WINDOW = 5  # seconds
+
+# Caches. `responses` holds the per-user response cache (bookissue/cache.py);
+# point RESPONSE_CACHE_BACKEND/RESPONSE_CACHE_LOCATION at e.g. Redis or
+# Memcached to share it between hosts.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'bookissue-responses')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+RESPONSE_CACHE_TIMEOUT = 300  # seconds; 0 disables the response cache
+
+# Response compression (gzip, or Brotli when the brotli package is installed)
+COMPRESSION_MIN_SIZE = 1024  # bytes; smaller bodies are sent as is
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4  # fast enough for dynamic responses
+
+# Request metrics served at /metrics (bookissue/metrics.py). With several
+# worker processes point METRICS_DIR at a directory they share (emptied on
+# restart). Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; while the
+# token is unset /metrics answers 403 unless DEBUG is on.
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = 15  # seconds
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Fail requests running more queries than their view's @query_budget
+# (bookissue/budgets.py); the test suite checks the budgets regardless
+QUERY_BUDGETS_ENFORCED = DEBUG
+
+# Slow query log (bookissue/slowqueries.py): queries taking longer are
+# logged and listed at /api/slow-queries/; a sample of them is EXPLAINed
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200)) or None  # 0 disables
+SLOW_QUERY_EXPLAIN_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE', 0.1))
+SLOW_QUERY_PLANS = 100  # plans kept
+SLOW_QUERY_MAX_STATEMENTS = 500  # distinct statements kept
+
+# Requests super admins send with an X-Profile header are profiled
+# (bookissue/profiling.py); profiles are kept in the `responses` cache
+PROFILE_TTL = 3600  # seconds
+PROFILE_INTERVAL = 0.001  # pyinstrument sampling interval, seconds
+
+# Peak memory per request with tracemalloc (bookissue/memory.py); slow,
+# enable on a single worker while investigating
+MEMORY_TRACE = os.environ.get('MEMORY_TRACE', '0') != '0'
+MEMORY_TRACE_THRESHOLD = 16 * 1024 * 1024  # bytes; larger peaks log their top allocations
+MEMORY_TRACE_TOP = 10
+MEMORY_TRACE_FRAMES = 1
+
+# Unpaginated lists (my_tickets, assigned_to_me, unread notifications)
+# longer than this are streamed in chunks (bookissue/streaming.py)
+STREAM_LIST_THRESHOLD = 500  # rows
+STREAM_CHUNK_SIZE = 200  # rows
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -162,13 +275,21 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    'DEFAULT_RENDERER_CLASSES': [
+        'bookissue.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'bookissue.renderers.FastJSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
 }
 
+# MessagePack responses (Accept: application/msgpack) when msgpack is installed
+if find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('bookissue.renderers.MessagePackRenderer')
+
 # Simple JWT Configuration
 
 SIMPLE_JWT = {
@@ -265,6 +386,9 @@ SWAGGER_SETTINGS = {
     'DEFAULT_MODEL_RENDERING': 'model',
 }
 
+# Written by `python manage.py generate_schema`; generated at startup when missing
+OPENAPI_SCHEMA_FILE = os.environ.get('OPENAPI_SCHEMA_FILE', os.path.join(BASE_DIR, 'openapi.json'))
+
 REDOC_SETTINGS = {
     'LAZY_RENDERING': False,
 }
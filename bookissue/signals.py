@@ -0,0 +1,31 @@
+from django.apps import apps
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+
+from .cache import bump_on_commit
+from .dbpool import record_connection
+from .metrics import install_query_recorder
+from .slowqueries import install_slow_query_log
+
+# Response cache scope bumped by saves and deletes of each model
+CACHE_SCOPES = {
+    'tickets.Ticket': 'tickets',
+    'comments.Comment': 'comments',
+    'notifications.Notification': 'notifications',
+    'users.User': 'users',
+}
+
+
+def invalidate_cached_responses(sender, **kwargs):
+    """Make cached responses built from the sender's table unreachable"""
+    bump_on_commit(CACHE_SCOPES[sender._meta.label])
+
+
+for label in CACHE_SCOPES:
+    model = apps.get_model(label)
+    post_save.connect(invalidate_cached_responses, sender=model, dispatch_uid=f'response-cache-save-{label}')
+    post_delete.connect(invalidate_cached_responses, sender=model, dispatch_uid=f'response-cache-delete-{label}')
+
+connection_created.connect(record_connection, dispatch_uid='dbpool-record-connection')
+connection_created.connect(install_query_recorder, dispatch_uid='metrics-query-recorder')
+connection_created.connect(install_slow_query_log, dispatch_uid='slow-query-log')
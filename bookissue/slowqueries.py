@@ -0,0 +1,177 @@
+"""
+Slow query log.
+
+Every connection gets an execute wrapper (see bookissue/signals.py) that
+times its queries. Queries slower than SLOW_QUERY_THRESHOLD_MS are logged
+with the view that ran them and added up per statement, placeholders and
+IN lists folded so the same query with other arguments counts as one.
+A sample of them (SLOW_QUERY_EXPLAIN_RATE) is run again under EXPLAIN,
+without ANALYZE so nothing executes twice, and the plans kept in a ring
+buffer of SLOW_QUERY_PLANS entries.
+
+GET /api/slow-queries/ (super admins) shows the statements with the most
+total time and the latest plans. Both are kept per process.
+"""
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from users.permissions import IsSuperAdmin
+
+from .docs import openapi, swagger_auto_schema
+from .metrics import request_stats, route_name, untracked
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_statements = {}  # fingerprint -> _Statement
+_plans = deque(maxlen=settings.SLOW_QUERY_PLANS)
+_explaining = ContextVar('slow_query_explaining', default=False)
+
+_IN_LIST = re.compile(r'%s(?:, %s)+')
+_EXPLAINABLE = ('SELECT', 'WITH')
+
+
+class _Statement:
+    __slots__ = ('sql', 'calls', 'seconds', 'max_seconds', 'views')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.views = {}
+
+
+def fingerprint(sql):
+    """The statement with IN lists of any length folded to one"""
+    return _IN_LIST.sub('%s, ...', sql)
+
+
+def current_view():
+    """Name of the view running the current request's queries"""
+    stats = request_stats()
+    if stats is None or stats.request is None:
+        return '-'
+    return route_name(stats.request)
+
+
+def time_query(execute, sql, params, many, context):
+    """Execute wrapper logging the queries over SLOW_QUERY_THRESHOLD_MS"""
+    if _explaining.get():
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    seconds = time.perf_counter() - start
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is not None and seconds * 1000 >= threshold:
+        slow_query(context['connection'], sql, params, many, seconds)
+    return result
+
+
+def slow_query(connection, sql, params, many, seconds):
+    view = current_view()
+    logger.warning('Slow query (%.1f ms) in %s: %s', seconds * 1000, view, sql)
+
+    key = fingerprint(sql)
+    with _lock:
+        statement = _statements.get(key)
+        if statement is None:
+            if len(_statements) >= settings.SLOW_QUERY_MAX_STATEMENTS:
+                # Make room by forgetting the statement that cost the least
+                del _statements[min(_statements, key=lambda k: _statements[k].seconds)]
+            statement = _statements[key] = _Statement(key)
+        statement.calls += 1
+        statement.seconds += seconds
+        statement.max_seconds = max(statement.max_seconds, seconds)
+        statement.views[view] = statement.views.get(view, 0) + 1
+
+    if not many and sql.lstrip().upper().startswith(_EXPLAINABLE) and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE:
+        plan = explain(connection, sql, params)
+        if plan is not None:
+            with _lock:
+                _plans.append({
+                    'sql': key,
+                    'view': view,
+                    'duration_ms': round(seconds * 1000, 3),
+                    'captured_at': timezone.now().isoformat(),
+                    'plan': plan,
+                })
+
+
+def explain(connection, sql, params):
+    """The plan of a query (EXPLAIN, not executing it); None when that fails"""
+    if connection.needs_rollback:
+        return None
+    token = _explaining.set(True)
+    try:
+        # A failed EXPLAIN mustn't abort the caller's transaction
+        with untracked(), transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                rows = cursor.fetchall()
+    except DatabaseError:
+        logger.debug('Could not EXPLAIN %s', sql, exc_info=True)
+        return None
+    finally:
+        _explaining.reset(token)
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    """connection_created receiver; pooled connections are created again on checkout"""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def report(limit=20):
+    """Slow statements by total time, and the captured plans, latest first"""
+    with _lock:
+        statements = sorted(_statements.values(), key=lambda statement: statement.seconds, reverse=True)[:limit]
+        rows = [
+            {
+                'sql': statement.sql,
+                'calls': statement.calls,
+                'total_ms': round(statement.seconds * 1000, 3),
+                'mean_ms': round(statement.seconds * 1000 / statement.calls, 3),
+                'max_ms': round(statement.max_seconds * 1000, 3),
+                'views': dict(sorted(statement.views.items(), key=lambda item: item[1], reverse=True)),
+            }
+            for statement in statements
+        ]
+        plans = list(reversed(_plans))
+    return {'threshold_ms': settings.SLOW_QUERY_THRESHOLD_MS, 'statements': rows, 'plans': plans}
+
+
+def reset():
+    with _lock:
+        _statements.clear()
+        _plans.clear()
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Slowest statements of this process by total time, with sampled query plans (super admin only)",
+    manual_parameters=[
+        openapi.Parameter('limit', openapi.IN_QUERY, description="Statements to list (default 20)", type=openapi.TYPE_INTEGER),
+    ],
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsSuperAdmin])
+def slow_queries_view(request):
+    try:
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report(max(1, min(limit, 200))))
@@ -0,0 +1,83 @@
+"""
+Streaming of the unpaginated lists (my_tickets, assigned_to_me, unread
+notifications).
+
+Lists of up to STREAM_LIST_THRESHOLD rows are answered as before. Longer
+ones are read through a database iterator and sent as JSON in chunks of
+STREAM_CHUNK_SIZE rows, so a worker holds one chunk at a time instead of
+every row, its dict and the whole rendered body. The bytes are the same
+the JSON renderer would produce. Other renderings (browsable API,
+MessagePack) are never streamed.
+
+Under ASGI the chunks come from an async iterator that renders each one
+in the request's sync thread; Django would otherwise read a sync
+iterator to the end before sending anything.
+
+Streamed responses aren't kept in the response cache, and the queries
+made after the first chunk aren't counted in the request's metrics.
+"""
+from functools import partial
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .renderers import FastJSONRenderer
+
+_renderer = FastJSONRenderer()
+
+
+def split_rows(request, rows):
+    """
+    (rows, None) for short lists and non-JSON requests; for longer JSON
+    ones (the first rows, an iterator over the rest)
+    """
+    # async_api builds on bookissue.compiled, which streams through here
+    from .async_api import json_requested
+
+    if not json_requested(request):
+        return rows, None
+    iterator = rows.iterator(chunk_size=settings.STREAM_CHUNK_SIZE)
+    head = list(islice(iterator, settings.STREAM_LIST_THRESHOLD + 1))
+    if len(head) <= settings.STREAM_LIST_THRESHOLD:
+        return head, None
+    return head, iterator
+
+
+def render_json(data):
+    return _renderer.render(data)
+
+
+def stream_json_list(request, head, rest, render, before=b'', after=None):
+    """
+    Response streaming the JSON list of render(chunk) for chunks of
+    `head` then `rest`, preceded by `before` and followed by the bytes
+    after() returns once every row is out
+    """
+    def chunks():
+        yield head
+        while chunk := list(islice(rest, settings.STREAM_CHUNK_SIZE)):
+            yield chunk
+
+    def content():
+        separator = b''
+        yield before + b'['
+        for chunk in chunks():
+            items = render_json(render(chunk))[1:-1]
+            if items:
+                yield separator + items
+                separator = b','
+        yield b']' + (after() if after is not None else b'')
+
+    async def async_content():
+        # Every part is made in the request's sync thread, where the database iterator was opened
+        next_part = sync_to_async(partial(next, content(), None))
+        while (part := await next_part()) is not None:
+            yield part
+
+    # A DRF Request wraps the Django one
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        return StreamingHttpResponse(async_content(), content_type='application/json')
+    return StreamingHttpResponse(content(), content_type='application/json')
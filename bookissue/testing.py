@@ -0,0 +1,87 @@
+"""
+Test helpers: a realistic helpdesk fixture and query budget assertions
+(see bookissue/budgets.py).
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .budgets import budget_for_view
+
+
+def seed_helpdesk(tickets=5, comments=2, prefix='t'):
+    """
+    Users of every role, `tickets` tickets per student spread over the
+    statuses and assignees, each with `comments` comments by its creator
+    and assignee. Saved one by one so the signals (notifications, events,
+    workload) run as in production. Returns the users by role.
+    """
+    from comments.models import Comment
+    from tickets.models import Ticket
+    from users.models import User
+
+    users = {}
+    for role in ('student', 'staff', 'ict', 'super_admin'):
+        users[role] = User.objects.get_or_create(
+            email=f'{role}@example.com',
+            defaults={'username': role, 'role': role, 'first_name': role.title(), 'last_name': 'User'}
+        )[0]
+    other_ict = User.objects.get_or_create(
+        email='ict2@example.com', defaults={'username': 'ict2', 'role': 'ict', 'first_name': 'Second', 'last_name': 'Ict'}
+    )[0]
+
+    statuses = ['OPEN', 'IN_PROGRESS', 'RESOLVED']
+    for creator in (users['student'], users['staff']):
+        for number in range(tickets):
+            ticket = Ticket.objects.create(
+                title=f'{prefix}{number} missing pages', description='Several pages are missing from the book',
+                created_by=creator, assigned_to=[None, users['ict'], other_ict][number % 3]
+            )
+            if number % 3:
+                ticket.status = statuses[number % 3]
+                ticket.save()
+            for index in range(comments):
+                author = ticket.assigned_to if index % 2 and ticket.assigned_to else creator
+                Comment.objects.create(ticket=ticket, author=author, message=f'Update {index}')
+    return users
+
+
+class QueryBudgetAssertions:
+    """TestCase mixin checking endpoints against their query budgets"""
+
+    def get_as(self, user, path):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def post_as(self, user, path, data):
+        return self.client.post(
+            path, data, content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+        )
+
+    def count_queries(self, user, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_as(user, path)
+        self.assertEqual(response.status_code, 200, f'{path}: {response.content[:200]}')
+        return [query['sql'] for query in queries]
+
+    def assertWithinBudget(self, user, path, grow=None):
+        """
+        GET `path` as `user` within the view's budget; with `grow` (a
+        callable adding data) also check the count doesn't change as the
+        response gets bigger
+        """
+        budget = budget_for_view(resolve(path.split('?')[0]).func, 'GET')
+        self.assertIsNotNone(budget, f'{path} has no query budget')
+
+        queries = self.count_queries(user, path)
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{path} ran {len(queries)} queries, budget {budget}:\n' + '\n'.join(queries)
+        )
+        if grow is not None:
+            grow()
+            more = self.count_queries(user, path)
+            self.assertEqual(
+                len(more), len(queries),
+                f'{path} went from {len(queries)} to {len(more)} queries with more data:\n' + '\n'.join(more)
+            )
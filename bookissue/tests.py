@@ -0,0 +1,570 @@
+import datetime
+import gzip
+import io
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import threading
+import tracemalloc
+import uuid
+import zlib
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import ResolverMatch
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+
+from comments.models import Comment
+from comments.serializers import CommentSerializer
+from tickets.models import Ticket
+from tickets.serializers import TicketListSerializer, TicketSerializer
+from users.models import User
+
+from . import compression, dbpool, renderers, schema
+from .budgets import QueryBudgetExceeded, QueryBudgetMiddleware, query_budget
+from .compression import CompressionMiddleware, choose_encoding
+from .fieldsets import prune_queryset
+from .memory import MemoryTraceMiddleware
+from .metrics import MetricsMiddleware
+from .renderers import FastJSONParser, FastJSONRenderer, MessagePackRenderer
+
+PAYLOAD = {
+    'id': 7,
+    'price': Decimal('12.50'),
+    'ratio': 0.25,
+    'created_at': datetime.datetime(2025, 8, 1, 10, 0, 0, 654321, tzinfo=datetime.timezone.utc),
+    'naive': datetime.datetime(2025, 8, 1, 10, 0),
+    'day': datetime.date(2025, 8, 1),
+    'at': datetime.time(9, 30, 15, 120),
+    'duration': datetime.timedelta(hours=2, seconds=5),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'label': gettext_lazy('Open'),
+    'text': 'Caf\xe9 "quoted" \\ line\u2028separator\u2029 \U0001f4da',
+    'flags': [True, False, None],
+    1: 'integer key',
+    'nested': [{'tuple': (1, 2)}, {'set': []}],
+    'empty': {},
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer writes the bytes DRF's JSONRenderer would"""
+
+    def render_both(self, data, media_type='application/json', context=None):
+        fast = FastJSONRenderer().render(data, media_type, context or {})
+        drf = JSONRenderer().render(data, media_type, context or {})
+        return fast, drf
+
+    def test_same_bytes(self):
+        for name, data in [('payload', PAYLOAD), ('list', [PAYLOAD, PAYLOAD]), ('scalar', 'x'), ('none', None)]:
+            with self.subTest(name):
+                fast, drf = self.render_both(data)
+                self.assertEqual(fast, drf)
+
+    def test_indent(self):
+        for media_type, context in [('application/json; indent=4', {}), ('application/json', {'indent': 2})]:
+            with self.subTest(media_type=media_type, context=context):
+                fast, drf = self.render_both(PAYLOAD, media_type, context)
+                self.assertEqual(fast, drf)
+                self.assertIn(b'\n', fast)
+
+    def test_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            fast, drf = self.render_both(PAYLOAD)
+            self.assertEqual(fast, drf)
+            parsed = FastJSONParser().parse(io.BytesIO(b'{"a": [1, 2.5, null]}'))
+        self.assertEqual(parsed, {'a': [1, 2.5, None]})
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def test_same_result_as_json_parser(self):
+        body = JSONRenderer().render(PAYLOAD)
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+
+    def test_invalid_body(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"a": '))
+
+    def test_other_encodings_use_json_parser(self):
+        body = '{"title": "Caf\xe9"}'.encode('latin-1')
+        parsed = FastJSONParser().parse(io.BytesIO(body), parser_context={'encoding': 'latin-1'})
+        self.assertEqual(parsed, {'title': 'Caf\xe9'})
+
+
+class PayloadView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    renderer_classes = [FastJSONRenderer, MessagePackRenderer]
+
+    def get(self, request):
+        return Response({'id': 1, 'price': Decimal('1.50'), 'day': datetime.date(2025, 8, 1)})
+
+
+class MessagePackNegotiationTests(SimpleTestCase):
+    """application/msgpack is negotiated only through MessagePackRenderer"""
+
+    def get(self, accept):
+        request = APIRequestFactory().get('/', HTTP_ACCEPT=accept)
+        response = PayloadView.as_view()(request)
+        response.render()
+        return response
+
+    def test_registered_only_with_msgpack(self):
+        registered = 'bookissue.renderers.MessagePackRenderer' in settings.REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES']
+        self.assertEqual(registered, renderers.msgpack is not None)
+
+    def test_negotiation(self):
+        packb = mock.Mock(return_value=b'\x83packed')
+        with mock.patch.object(renderers, 'msgpack', mock.Mock(packb=packb)):
+            response = self.get('application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(response.content, b'\x83packed')
+        packb.assert_called_once_with(
+            {'id': 1, 'price': Decimal('1.50'), 'day': datetime.date(2025, 8, 1)},
+            default=renderers.encode_default, use_bin_type=True
+        )
+
+        response = self.get('application/json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, b'{"id":1,"price":1.5,"day":"2025-08-01"}')
+
+    @skipIf(renderers.msgpack is None, 'msgpack is not installed')
+    def test_round_trip(self):
+        response = self.get('application/msgpack')
+        self.assertEqual(
+            renderers.msgpack.unpackb(response.content), {'id': 1, 'price': 1.5, 'day': '2025-08-01'}
+        )
+
+
+class CompressionTests(SimpleTestCase):
+    """CompressionMiddleware negotiation, skips and streaming"""
+    body = b'{"results": [' + b','.join(b'{"id": %d, "title": "Missing pages"}' % n for n in range(200)) + b']}'
+
+    def respond(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_choose_encoding(self):
+        cases = [
+            ('gzip, deflate', 'gzip', 'gzip'),
+            ('gzip, br', 'br', 'gzip'),
+            ('br;q=0.5, gzip', 'gzip', 'gzip'),
+            ('gzip;q=0.4, br;q=0.8', 'br', 'gzip'),
+            ('*', 'br', 'gzip'),
+            ('*;q=0.5, gzip;q=0', 'br', None),
+            ('gzip;q=0', None, None),
+            ('identity', None, None),
+            ('br', 'br', None),
+            ('', None, None),
+        ]
+        for header, with_brotli, without_brotli in cases:
+            with self.subTest(header=header):
+                with mock.patch.object(compression, 'brotli', object()):
+                    self.assertEqual(choose_encoding(header), with_brotli)
+                with mock.patch.object(compression, 'brotli', None):
+                    self.assertEqual(choose_encoding(header), without_brotli)
+
+    def test_gzip(self):
+        response = HttpResponse(self.body, content_type='application/json')
+        response['ETag'] = '"abc"'
+        response = self.respond(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    @skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        response = self.respond(HttpResponse(self.body, content_type='application/json'), 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.content), self.body)
+
+    def test_skips(self):
+        encoded = HttpResponse(self.body, content_type='application/json')
+        encoded['Content-Encoding'] = 'identity'
+        cases = {
+            'small body': HttpResponse(b'{"id": 1}', content_type='application/json'),
+            'already encoded': encoded,
+            'image': HttpResponse(self.body, content_type='image/png'),
+            'event stream': StreamingHttpResponse(iter([self.body]), content_type='text/event-stream'),
+            'not modified': HttpResponse(status=304),
+        }
+        for name, response in cases.items():
+            with self.subTest(name):
+                content_encoding = response.get('Content-Encoding')
+                response = self.respond(response)
+                self.assertEqual(response.get('Content-Encoding'), content_encoding)
+                if not response.streaming:
+                    self.assertNotEqual(response.content[:2], b'\x1f\x8b')
+
+    def test_svg_compressed(self):
+        response = self.respond(HttpResponse(b'<svg>' + b'<g/>' * 500 + b'</svg>', content_type='image/svg+xml'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_incompressible_body_sent_as_is(self):
+        body = os.urandom(4096)
+        response = self.respond(HttpResponse(body, content_type='application/octet-stream'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, body)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_vary_without_compression(self):
+        response = self.respond(HttpResponse(self.body, content_type='application/json'), accept_encoding='')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_streaming(self):
+        chunks = [self.body[:1000], self.body[1000:3000], self.body[3000:]]
+        response = StreamingHttpResponse(iter(chunks), content_type='application/json')
+        response['Content-Length'] = str(len(self.body))
+        response = self.respond(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+
+        # Every chunk is flushed, so clients can decode it as it arrives
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        decoded = [decompressor.decompress(chunk) for chunk in response.streaming_content]
+        self.assertEqual(decoded[:3], chunks)
+        self.assertEqual(b''.join(decoded), self.body)
+
+    def test_async_streaming(self):
+        async def chunks():
+            yield self.body[:1000]
+            yield self.body[1000:]
+
+        response = self.respond(StreamingHttpResponse(chunks(), content_type='application/json'))
+        self.assertTrue(response.is_async)
+
+        async def read():
+            return [chunk async for chunk in response.streaming_content]
+
+        self.assertEqual(gzip.decompress(b''.join(async_to_sync(read)())), self.body)
+
+
+class DBPoolStatsTests(TestCase):
+    """pool_stats() in each connection reuse mode, and the ASGI default"""
+
+    def test_persistent_mode(self):
+        with mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 600}):
+            before = dbpool.pool_stats()['default']
+            dbpool.record_connection(sender=type(connection), connection=connection)
+            after = dbpool.pool_stats()['default']
+        self.assertEqual(before['mode'], 'persistent')
+        self.assertEqual(before['conn_max_age'], 600)
+        self.assertEqual(after['connections_opened'], before['connections_opened'] + 1)
+
+    def test_per_request_mode(self):
+        with mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 0}):
+            self.assertEqual(dbpool.pool_stats()['default']['mode'], 'per-request')
+
+    def test_pool_mode(self):
+        pool = mock.Mock()
+        pool.get_stats.return_value = {'pool_min': 2, 'pool_max': 10, 'pool_size': 4, 'pool_available': 1, 'requests_num': 9}
+        with mock.patch.dict(connection.settings_dict, {'OPTIONS': {'pool': {'max_size': 10}}}), \
+                mock.patch.object(connection, 'pool', pool, create=True):
+            stats = dbpool.pool_stats()['default']
+        self.assertEqual(stats['mode'], 'pool')
+        self.assertEqual((stats['size'], stats['idle'], stats['in_use'], stats['requests']), (4, 1, 3, 9))
+        self.assertEqual(stats['timeouts'], 0)
+
+    def test_conn_max_age_default(self):
+        path = os.path.join(settings.BASE_DIR, 'bookissue', 'settings.py')
+        for asgi, expected in [('0', 600), ('1', 0)]:
+            with self.subTest(asgi=asgi), mock.patch.dict(os.environ, {'DB_POOL': '0', 'DJANGO_ASGI': asgi}):
+                os.environ.pop('DB_CONN_MAX_AGE', None)
+                namespace = runpy.run_path(path)
+                self.assertEqual(namespace['DATABASES']['default']['CONN_MAX_AGE'], expected)
+
+
+@query_budget(2)
+def budgeted_view(request):
+    return HttpResponse('ok')
+
+
+def run_queries(count):
+    with connection.cursor() as cursor:
+        for _ in range(count):
+            cursor.execute('SELECT 1')
+
+
+@override_settings(QUERY_BUDGETS_ENFORCED=True)
+class QueryBudgetMiddlewareTests(TestCase):
+    """The budget holds whether the stack is served sync or async"""
+
+    def request(self):
+        request = RequestFactory().get('/budgeted/')
+        request.resolver_match = ResolverMatch(budgeted_view, (), {})
+        return request
+
+    def sync_stack(self, queries):
+        def view(request):
+            run_queries(queries)
+            return budgeted_view(request)
+        return MetricsMiddleware(QueryBudgetMiddleware(view))
+
+    def async_stack(self, queries):
+        async def view(request):
+            await sync_to_async(run_queries)(queries)
+            return budgeted_view(request)
+        middleware = QueryBudgetMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        return MetricsMiddleware(middleware)
+
+    def test_sync(self):
+        self.assertEqual(self.sync_stack(2)(self.request())['X-Query-Count'], '2')
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'ran 3 queries, budget 2'), \
+                self.assertLogs('bookissue.budgets'):
+            self.sync_stack(3)(self.request())
+
+    def test_async(self):
+        self.assertEqual(async_to_sync(self.async_stack(2))(self.request())['X-Query-Count'], '2')
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'ran 3 queries, budget 2'), \
+                self.assertLogs('bookissue.budgets'):
+            async_to_sync(self.async_stack(3))(self.request())
+
+    @override_settings(QUERY_BUDGETS_ENFORCED=False)
+    def test_not_enforced(self):
+        response = async_to_sync(self.async_stack(3))(self.request())
+        self.assertNotIn('X-Query-Count', response)
+
+
+@override_settings(MEMORY_TRACE=True, MEMORY_TRACE_THRESHOLD=1 << 40)
+class MemoryTraceMiddlewareTests(SimpleTestCase):
+    """Peaks are measured around the view itself, sync or async"""
+
+    def setUp(self):
+        if not tracemalloc.is_tracing():
+            self.addCleanup(tracemalloc.stop)
+
+    def test_async_view_measured_on_the_event_loop(self):
+        async def view(request):
+            body = bytes(1 << 20)
+            return HttpResponse(f'{threading.get_ident()} {len(body)}')
+
+        middleware = MemoryTraceMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        async def call():
+            return threading.get_ident(), await middleware(RequestFactory().get('/'))
+
+        loop_thread, response = async_to_sync(call)()
+        self.assertEqual(response.content.decode(), f'{loop_thread} {1 << 20}')
+        self.assertGreaterEqual(int(response['X-Memory-Peak']), 1 << 20)
+
+    def test_async_stream_measured_once_sent(self):
+        async def chunks():
+            yield b'a'
+            yield b'b'
+
+        async def view(request):
+            return StreamingHttpResponse(chunks())
+
+        response = async_to_sync(MemoryTraceMiddleware(view))(RequestFactory().get('/'))
+        self.assertNotIn('X-Memory-Peak', response)
+
+        async def consume():
+            return [part async for part in response.streaming_content]
+
+        with self.assertLogs('bookissue.memory', 'DEBUG') as logs:
+            self.assertEqual(async_to_sync(consume)(), [b'a', b'b'])
+        self.assertIn('peaked at', logs.output[0])
+
+    def test_sync_view(self):
+        middleware = MemoryTraceMiddleware(lambda request: HttpResponse(bytes(1 << 20)))
+        self.assertFalse(iscoroutinefunction(middleware))
+        self.assertGreaterEqual(int(middleware(RequestFactory().get('/'))['X-Memory-Peak']), 1 << 20)
+
+
+class PrecomputedSchemaTests(SimpleTestCase):
+    """generate_schema writes what the docs would build, and the docs serve it as is"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'openapi.json')
+        # The schema is cached per process
+        patcher = mock.patch.object(schema, '_schema', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_command_matches_runtime_schema(self):
+        out = io.StringIO()
+        call_command('generate_schema', output=self.path, stdout=out)
+        self.assertIn(self.path, out.getvalue())
+        with open(self.path, 'rb') as schema_file:
+            written = schema_file.read()
+        self.assertEqual(written, schema.encode_json(schema.generate_schema()))
+        self.assertIn('/tickets/changes/', json.loads(written)['paths'])
+
+    def test_file_served_without_building(self):
+        content = json.dumps({'swagger': '2.0', 'info': {'title': 'Stored', 'version': 'v1'}, 'paths': {}}).encode()
+        with open(self.path, 'wb') as schema_file:
+            schema_file.write(content)
+
+        with override_settings(OPENAPI_SCHEMA_FILE=self.path), \
+                mock.patch.object(schema, 'generate_schema', side_effect=AssertionError('built at request time')):
+            response = self.client.get('/swagger.json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, content)
+            etag = response['ETag']
+            self.assertEqual(self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            yaml = self.client.get('/swagger.yaml')
+            self.assertIn(b'title: Stored', yaml.content)
+            self.assertNotEqual(yaml['ETag'], etag)
+
+
+# Boots the project like a worker, then requests the docs
+DOCS_IMPORT_SCRIPT = """
+import json, sys
+import django
+django.setup()
+import bookissue.urls
+from django.test import Client
+
+def loaded():
+    return sorted(name for name in sys.modules if name.startswith('drf_yasg.'))
+
+booted = loaded()
+Client().get('/api/tickets/')
+served = loaded()
+status = Client().get('/swagger.json').status_code
+print(json.dumps({'booted': booted, 'served': served, 'docs': loaded(), 'status': status}))
+"""
+
+
+class LazyDocsImportTests(SimpleTestCase):
+    """drf_yasg stays unimported until the docs are requested"""
+
+    def test_drf_yasg_imported_by_docs_only(self):
+        env = dict(os.environ, OPENAPI_SCHEMA_FILE='')
+        result = subprocess.run(
+            [sys.executable, '-c', DOCS_IMPORT_SCRIPT], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        modules = json.loads(result.stdout.splitlines()[-1])
+        # Only the app package itself (INSTALLED_APPS) is loaded at boot
+        self.assertEqual(modules['booted'], [])
+        self.assertEqual(modules['served'], [])
+        self.assertEqual(modules['status'], 200)
+        self.assertIn('drf_yasg.generators', modules['docs'])
+
+    def test_profile_imports_command(self):
+        out = io.StringIO()
+        call_command('profile_imports', runs=1, top=5, threshold_ms=10 ** 9, stdout=out)
+        output = out.getvalue()
+        self.assertRegex(output, r'\d+ modules imported in \d+ ms \(best of 1\)')
+        # Project packages are starred
+        self.assertRegex(output, r'\* +[\d.]+ ms  (bookissue|tickets|comments|notifications|users)\n')
+        self.assertRegex(output, r'ms  bookissue\.')
+        self.assertNotIn('drf_yasg.generators', output)
+        self.assertIn('Within the', output)
+
+        with self.assertRaisesMessage(CommandError, 'over the 0 ms threshold'):
+            call_command('profile_imports', runs=1, threshold_ms=0, stdout=io.StringIO())
+
+
+def sparse_serializer(serializer_class, query):
+    request = Request(APIRequestFactory().get(f'/api/tickets/{query}'))
+    return serializer_class(many=True, context={'request': request})
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class SparseFieldsetTests(TestCase):
+    """?fields= / ?omit= prune the payload and the query behind it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        cls.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        cls.ticket = Ticket.objects.create(title='Torn cover', description='Back cover torn', created_by=cls.student, assigned_to=cls.ict)
+        Comment.objects.create(ticket=cls.ticket, author=cls.ict, message='On it')
+
+    def get(self, path):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        response = client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        return response.json()
+
+    def test_fields_and_omit_select_top_level_fields(self):
+        full = self.get(f'/api/tickets/{self.ticket.id}/')
+        cases = {
+            '?fields=id,title': {'id', 'title'},
+            '?fields= id , status,unknown': {'id', 'status'},
+            '?omit=description,screenshot': set(full) - {'description', 'screenshot'},
+            '?fields=id,title,assigned_to&omit=title': {'id', 'assigned_to'},
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                detail = self.get(f'/api/tickets/{self.ticket.id}/{query}')
+                self.assertEqual(set(detail), expected)
+                self.assertEqual(detail, {name: full[name] for name in expected})
+                rows = self.get(f'/api/tickets/{query}')['results']
+                self.assertTrue(set(rows[0]) <= expected)
+        # Nested objects stay whole
+        self.assertEqual(self.get(f'/api/tickets/{self.ticket.id}/?fields=assigned_to')['assigned_to'], full['assigned_to'])
+
+    def test_writes_ignore_fieldsets(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        response = client.patch(f'/api/tickets/{self.ticket.id}/?fields=id', {'title': 'Torn cover again'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('title', response.json())
+
+    def test_prune_queryset(self):
+        queryset = Ticket.objects.all()
+        count = {'comments_count': Count('comments')}
+        cases = {
+            '?fields=id,title': (['id', 'title', 'created_by_id'], False, False),
+            '?fields=id,assigned_to': (['id', 'assigned_to_id', 'created_by_id'], True, False),
+            '?fields=id,comments_count': (['id', 'created_by_id'], False, True),
+            '': (['id', 'title', 'status', 'created_by_id', 'assigned_to_id', 'created_at'], True, True),
+        }
+        for query, (columns, joins, counts) in cases.items():
+            with self.subTest(query=query):
+                pruned = prune_queryset(queryset, sparse_serializer(TicketListSerializer, query), annotations=count, always=['created_by'])
+                sql = str(pruned.query)
+                selected = [field.column for field in Ticket._meta.concrete_fields if f'"tickets"."{field.column}"' in sql.split(' FROM ')[0]]
+                self.assertEqual(sorted(selected), sorted(columns))
+                self.assertEqual('JOIN "users"' in sql, joins)
+                self.assertEqual('COUNT(' in sql, counts)
+                rows = sparse_serializer(TicketListSerializer, query).to_representation(pruned)
+                self.assertEqual(len(rows), 1)
+
+    def test_untraceable_fields_load_all_columns(self):
+        serializer = sparse_serializer(TicketSerializer, '?fields=id,comments_count')
+        # A method field with neither an annotation nor sparse_requires could read anything
+        sql = str(prune_queryset(Ticket.objects.all(), serializer).query)
+        self.assertIn('"tickets"."description"', sql)
+        sql = str(prune_queryset(Ticket.objects.all(), serializer, annotations={'comments_count': Count('comments')}).query)
+        self.assertNotIn('"tickets"."description"', sql)
+
+    def test_requires_follow_relations(self):
+        serializer = sparse_serializer(CommentSerializer, '?fields=id,author_name')
+        sql = str(prune_queryset(Comment.objects.all(), serializer).query)
+        self.assertIn('JOIN "users"', sql)
+        self.assertNotIn('"comments"."message"', sql)
+        self.assertNotIn('JOIN "tickets"', sql)
+        comment = self.get(f'/api/comments/tickets/{self.ticket.id}/comments/?fields=id,author_name')['results'][0]
+        self.assertEqual(set(comment), {'id', 'author_name'})
@@ -18,23 +18,11 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 
-# Swagger/OpenAPI schema configuration
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Book Issue Tracker API",
-        default_version='v1',
-        description="A comprehensive API for managing book issue tickets with role-based access control",
-        terms_of_service="https://www.yourapi.com/terms/",
-        contact=openapi.Contact(email="admin@bookissue.com"),
-        license=openapi.License(name="MIT License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from .docs import docs_view
+from .metrics import metrics_view
+from .profiling import profile_download_view, profile_list_view
+from .slowqueries import slow_queries_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -42,12 +30,16 @@ urlpatterns = [
     path('api/tickets/', include('tickets.urls')),
     path('api/comments/', include('comments.urls')),  # Separate comments endpoint
     path('api/notifications/', include('notifications.urls')),  # Notifications endpoint
-    
-    # Swagger/OpenAPI documentation URLs
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-    path('', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),  # Default to Swagger UI
+    path('api/slow-queries/', slow_queries_view, name='slow-queries'),  # Slow query log (super admins)
+    path('api/profiles/', profile_list_view, name='profile-list'),  # Request profiles (super admins)
+    path('api/profiles/<str:profile_id>/', profile_download_view, name='profile-download'),
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape endpoint
+
+    # Swagger/OpenAPI documentation URLs (loaded on first use, see bookissue/docs.py)
+    re_path(r'^swagger(?P<format>\.json|\.yaml)$', docs_view(), name='schema-json'),
+    path('swagger/', docs_view('swagger'), name='schema-swagger-ui'),
+    path('redoc/', docs_view('redoc'), name='schema-redoc'),
+    path('', docs_view('swagger'), name='schema-swagger-ui'),  # Default to Swagger UI
 ]
 
 # Serve media files during development
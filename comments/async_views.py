@@ -0,0 +1,40 @@
+"""
+Async version of the comment thread read (see bookissue.async_api).
+Unknown tickets and permission errors are answered by CommentThreadView.
+"""
+from bookissue.async_api import async_read_view, json_response, only_params, paginate
+from bookissue.conditional import not_modified, set_validators
+from users.sideload import asideload_users
+
+from .serializers import thread_rows, thread_ticket
+from .views import CommentThreadView, can_access_ticket_row, thread_queryset, thread_validators, ticket_row_queryset
+
+
+@async_read_view(CommentThreadView.as_view())
+async def comment_thread(request, user, ticket_id):
+    """GET /api/comments/tickets/<ticket_id>/comments/thread/"""
+    if not only_params(request, ('page',)):
+        return None
+    ticket = await ticket_row_queryset(ticket_id).afirst()
+    if ticket is None or not can_access_ticket_row(ticket, user):
+        return None
+
+    etag, last_modified = thread_validators(ticket, 'thread')
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    data = await paginate(request, thread_queryset(ticket_id))
+    if data is None:
+        return None
+    users = await asideload_users(
+        [row['author_id'] for row in data['results']] + [ticket['created_by_id'], ticket['assigned_to_id']],
+        request
+    )
+    data = {
+        'ticket': thread_ticket(ticket),
+        **data,
+        'results': thread_rows(data['results']),
+        'included': {'users': users},
+    }
+    return set_validators(json_response(data), etag, last_modified)
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:07
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created_at(apps, schema_editor):
+    """Existing comments were last edited when they were written"""
+    Comment = apps.get_model('comments', 'Comment')
+    Comment.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='When this comment was last edited'),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
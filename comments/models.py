@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.conf import settings
 
 
@@ -25,12 +27,20 @@ class Comment(models.Model):
         auto_now_add=True,
         help_text="When this comment was created"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When this comment was last edited"
+    )
 
     class Meta:
         db_table = 'comments'
         verbose_name = 'Comment'
         verbose_name_plural = 'Comments'
         ordering = ['-created_at']  # Show newest comments first
+        indexes = [
+            # Keyset order of the changes feed
+            models.Index(fields=['updated_at', 'id'], name='comments_updated_at_id_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.full_name} on {self.ticket.title}"
@@ -44,3 +54,22 @@ class Comment(models.Model):
     def ticket_title(self):
         """Get the title of the associated ticket"""
         return self.ticket.title
+
+    @classmethod
+    def latest_for_tickets(cls, limit):
+        """
+        The newest `limit` comments of every ticket, with their authors.
+
+        Ranked with ROW_NUMBER() OVER (PARTITION BY ticket_id), so used as a
+        Prefetch queryset it loads the previews of a whole page in one query.
+        """
+        return (
+            cls.objects.select_related('author')
+            .annotate(position=Window(
+                RowNumber(),
+                partition_by=F('ticket_id'),
+                order_by=[F('created_at').desc(), F('id').desc()]
+            ))
+            .filter(position__lte=limit)
+            .order_by('ticket_id', 'position')
+        )
@@ -1,15 +1,22 @@
 from rest_framework import serializers
+from rest_framework.fields import DateTimeField
 from .models import Comment
+from bookissue.fieldsets import SparseFieldsMixin
 from users.serializers import UserListSerializer
 
+THREAD_FIELDS = ('id', 'author_id', 'message', 'created_at')
 
-class CommentSerializer(serializers.ModelSerializer):
+_datetime = DateTimeField()
+
+
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Comment model
     """
     author_name = serializers.ReadOnlyField()
     ticket_title = serializers.ReadOnlyField()
     author_details = UserListSerializer(source='author', read_only=True)
+    sparse_requires = {'author_name': ['author.first_name'], 'ticket_title': ['ticket.title']}
 
     class Meta:
         model = Comment
@@ -32,6 +39,33 @@ class CommentSerializer(serializers.ModelSerializer):
         return value.strip()
 
 
+class CommentPreviewSerializer(serializers.ModelSerializer):
+    """
+    Serializer for comments embedded in tickets (latest comments preview)
+    """
+    author_name = serializers.ReadOnlyField()
+    author_details = UserListSerializer(source='author', read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'author', 'author_name', 'author_details', 'message', 'created_at']
+
+
+class CommentCompactSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for comments in compact lists (author side-loaded by id)
+    """
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'ticket', 'author', 'message', 'created_at']
+
+    def user_ids(self, comments):
+        if 'author' not in self.fields:
+            return set()
+        return {comment.author_id for comment in comments}
+
+
 class CommentCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating comments (simplified)
@@ -45,3 +79,32 @@ class CommentCreateSerializer(serializers.ModelSerializer):
         if not value or not value.strip():
             raise serializers.ValidationError("Comment message cannot be empty.")
         return value.strip()
+
+
+def thread_ticket(row):
+    """Ticket metadata sent once at the top of a thread"""
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'status': row['status'],
+        'created_by': row['created_by_id'],
+        'assigned_to': row['assigned_to_id'],
+        'created_at': _datetime.to_representation(row['created_at']),
+        'updated_at': _datetime.to_representation(row['updated_at']),
+    }
+
+
+def thread_rows(rows):
+    """
+    Serialize comment values() rows (THREAD_FIELDS) for the thread
+    endpoint; authors are referenced by id and side-loaded separately
+    """
+    return [
+        {
+            'id': row['id'],
+            'author': row['author_id'],
+            'message': row['message'],
+            'created_at': _datetime.to_representation(row['created_at']),
+        }
+        for row in rows
+    ]
@@ -1,3 +1,249 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from bookissue.budgets import budget_for_view
+from bookissue.testing import QueryBudgetAssertions, seed_helpdesk
+from comments.models import Comment
+from tickets.models import Ticket
+from users.models import User
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class CommentQueryBudgetTests(QueryBudgetAssertions, TestCase):
+    """Comment endpoints stay within their query budgets whatever the thread holds"""
+
+    def setUp(self):
+        self.users = seed_helpdesk(tickets=1, comments=2)
+        self.ticket = Ticket.objects.filter(created_by=self.users['student']).order_by('id').first()
+        self.path = f'/api/comments/tickets/{self.ticket.id}/comments/'
+
+    def grow(self):
+        for index in range(10):
+            author = self.users['ict'] if index % 2 else self.users['student']
+            self.ticket.comments.create(author=author, message=f'More {index}')
+
+    def test_read_endpoints(self):
+        for path in [self.path, f'{self.path}?compact=1', f'{self.path}thread/']:
+            for role in ('student', 'ict'):
+                with self.subTest(path=path, role=role):
+                    self.assertWithinBudget(self.users[role], path)
+        comment = self.ticket.comments.order_by('id').first()
+        self.assertWithinBudget(self.users['ict'], f'/api/comments/{comment.id}/')
+        self.grow()
+        for path in [self.path, f'{self.path}?compact=1', f'{self.path}thread/']:
+            with self.subTest(path=path, grown=True):
+                self.assertWithinBudget(self.users['student'], path)
+
+    def post_comment(self, user):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_as(user, self.path, {'message': 'Any news on this?'})
+        self.assertEqual(response.status_code, 201, response.content)
+        return len(queries)
+
+    def test_create_does_not_grow_with_ict_team(self):
+        # Staff commenting on a student's ticket notifies every ICT user
+        budget = budget_for_view(resolve(self.path).func, 'POST')
+        before = self.post_comment(self.users['staff'])
+        self.assertLessEqual(before, budget)
+
+        for index in range(5):
+            User.objects.create(email=f'ict{index}@example.org', username=f'ict-{index}', role='ict')
+        self.assertEqual(self.post_comment(self.users['staff']), before)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class ConditionalCommentReadTests(TestCase):
+    """Editing or deleting a comment invalidates the thread and ticket validators"""
+
+    def setUp(self):
+        self.users = seed_helpdesk(tickets=1, comments=2)
+        self.ticket = Ticket.objects.filter(created_by=self.users['student']).order_by('id').first()
+        self.comment = self.ticket.comments.filter(author=self.users['student']).first()
+        # An hour back, so changes made now get a later Last-Modified second
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Ticket.objects.filter(pk=self.ticket.pk).update(updated_at=hour_ago, created_at=hour_ago)
+        Comment.objects.update(updated_at=hour_ago, created_at=hour_ago)
+        User = type(self.users['student'])
+        User.objects.update(updated_at=hour_ago)
+        base = f'/api/comments/tickets/{self.ticket.id}/comments/'
+        self.paths = [base, f'{base}?compact=1', f'{base}thread/', f'/api/tickets/{self.ticket.id}/?include=latest_comments:3']
+
+    def request(self, method, path, role='student', **kwargs):
+        token = AccessToken.for_user(self.users[role])
+        return getattr(self.client, method)(path, HTTP_AUTHORIZATION=f'Bearer {token}', **kwargs)
+
+    def validators(self):
+        validators = {}
+        for path in self.paths:
+            response = self.request('get', path)
+            self.assertEqual(response.status_code, 200, path)
+            validators[path] = response['ETag'], response['Last-Modified']
+        return validators
+
+    def assertRefetched(self, validators, header):
+        for path, (etag, last_modified) in validators.items():
+            with self.subTest(path=path, header=header):
+                value = etag if header == 'If-None-Match' else last_modified
+                response = self.request('get', path, headers={header: value})
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual((response['ETag'], response['Last-Modified']), (etag, last_modified))
+
+    def test_edit_changes_validators(self):
+        validators = self.validators()
+        for path, (etag, _) in validators.items():
+            self.assertEqual(self.request('get', path, headers={'If-None-Match': etag}).status_code, 304)
+
+        response = self.request(
+            'patch', f'/api/comments/{self.comment.id}/', role='ict',
+            data={'message': 'Edited'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertRefetched(validators, 'If-None-Match')
+        self.assertRefetched(validators, 'If-Modified-Since')
+        self.assertIn(b'Edited', self.request('get', self.paths[2]).content)
+
+    def test_delete_changes_validators(self):
+        validators = self.validators()
+        for path, (_, last_modified) in validators.items():
+            self.assertEqual(self.request('get', path, headers={'If-Modified-Since': last_modified}).status_code, 304)
+
+        self.assertEqual(self.request('delete', f'/api/comments/{self.comment.id}/', role='ict').status_code, 204)
+        self.assertRefetched(validators, 'If-None-Match')
+        self.assertRefetched(validators, 'If-Modified-Since')
+
+    def test_ticket_delete_does_not_touch_per_comment(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.ticket.delete()
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class LatestCommentsTests(TestCase):
+    """latest_for_tickets ranks comments per ticket, newest first, in one query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        cls.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        cls.quiet, cls.short, cls.busy = [
+            Ticket.objects.create(title=title, description='x', created_by=cls.student, assigned_to=cls.ict)
+            for title in ('Quiet', 'Short', 'Busy')
+        ]
+        start = timezone.now() - timedelta(days=1)
+        for ticket, count in ((cls.short, 2), (cls.busy, 6)):
+            for index in range(count):
+                comment = Comment.objects.create(ticket=ticket, author=cls.ict, message=f'{ticket.title} {index}')
+                # The last two of the busy ticket share a timestamp: the higher id is newer
+                minutes = min(index, 4) if ticket is cls.busy else index
+                Comment.objects.filter(pk=comment.pk).update(created_at=start + timedelta(minutes=minutes))
+
+    def newest(self, ticket, limit):
+        return list(ticket.comments.order_by('-created_at', '-id').values_list('id', flat=True)[:limit])
+
+    def test_newest_n_per_ticket(self):
+        for limit in (1, 3, 10):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(1):
+                    comments = list(Comment.latest_for_tickets(limit))
+                by_ticket = {}
+                for comment in comments:
+                    by_ticket.setdefault(comment.ticket_id, []).append(comment.id)
+                    self.assertEqual(comment.author.email, 'ict@example.com')
+                self.assertEqual(by_ticket, {
+                    self.short.id: self.newest(self.short, limit),
+                    self.busy.id: self.newest(self.busy, limit),
+                })
+        # The timestamp tie is broken by id
+        self.assertEqual(
+            [c.message for c in Comment.latest_for_tickets(2) if c.ticket_id == self.busy.id],
+            ['Busy 5', 'Busy 4']
+        )
+
+    def test_ticket_list_embeds_previews(self):
+        token = AccessToken.for_user(self.student)
+        response = self.client.get('/api/tickets/?include=latest_comments:2', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        previews = {row['id']: [c['id'] for c in row['latest_comments']] for row in response.json()['results']}
+        self.assertEqual(previews, {
+            self.quiet.id: [],
+            self.short.id: self.newest(self.short, 2),
+            self.busy.id: self.newest(self.busy, 2),
+        })
+
+        detail = self.client.get(f'/api/tickets/{self.busy.id}/?include=latest_comments', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual([c['id'] for c in detail.json()['latest_comments']], self.newest(self.busy, 3))
+        self.assertNotIn('latest_comments', self.client.get(f'/api/tickets/{self.busy.id}/', HTTP_AUTHORIZATION=f'Bearer {token}').json())
+        for include in ('latest_comments:0', 'latest_comments:x'):
+            with self.subTest(include=include):
+                response = self.client.get(f'/api/tickets/?include={include}', HTTP_AUTHORIZATION=f'Bearer {token}')
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class CommentThreadPaginationTests(TestCase):
+    """The thread pages a ticket's comments newest first, side-loading each page's authors"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        cls.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        cls.staff = User.objects.create_user(email='staff@example.com', username='staff', password='x', role='staff')
+        cls.ticket = Ticket.objects.create(title='Torn cover', description='x', created_by=cls.student, assigned_to=cls.ict)
+        start = timezone.now() - timedelta(days=1)
+        # 45 comments, staff only among the oldest five, timestamps shared in pairs
+        for index in range(45):
+            comment = Comment.objects.create(
+                ticket=cls.ticket, author=cls.staff if index < 5 else cls.ict, message=f'Comment {index}'
+            )
+            Comment.objects.filter(pk=comment.pk).update(created_at=start + timedelta(minutes=index // 2))
+        cls.path = f'/api/comments/tickets/{cls.ticket.id}/comments/thread/'
+
+    def get(self, query=''):
+        token = AccessToken.for_user(self.student)
+        return self.client.get(f'{self.path}{query}', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_pages_cover_thread_newest_first(self):
+        newest_first = list(self.ticket.comments.order_by('-created_at', '-id').values_list('id', flat=True))
+        ids, pages = [], []
+        for number in (1, 2, 3):
+            response = self.get(f'?page={number}')
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            pages.append(page)
+            ids += [row['id'] for row in page['results']]
+            self.assertEqual(page['count'], 45)
+            self.assertEqual(page['ticket']['id'], self.ticket.id)
+            authors = {row['author'] for row in page['results']} | {self.student.id, self.ict.id}
+            self.assertEqual({int(pk) for pk in page['included']['users']}, authors)
+        self.assertEqual(ids, newest_first)
+        self.assertEqual([len(page['results']) for page in pages], [20, 20, 5])
+
+        self.assertIsNone(pages[0]['previous'])
+        self.assertTrue(pages[0]['next'].endswith(f'{self.path}?page=2'))
+        self.assertTrue(pages[1]['previous'].endswith(self.path))
+        self.assertTrue(pages[2]['previous'].endswith(f'{self.path}?page=2'))
+        self.assertIsNone(pages[2]['next'])
+        self.assertEqual(self.get().content, self.get('?page=1').content)
+
+    def test_async_and_sync_paths_agree(self):
+        for query in ('', '?page=2', '?page=3'):
+            with self.subTest(query=query):
+                fast = self.get(query)
+                with mock.patch('comments.async_views.only_params', return_value=False):
+                    regular = self.get(query)
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.json(), regular.json())
+        self.assertEqual(self.get('?page=2&format=json').json()['results'], self.get('?page=2').json()['results'])
+
+    def test_pages_out_of_range(self):
+        # Declined by the async view and answered by DRF, within the same query budget
+        for query in ('?page=4', '?page=0', '?page=last2', '?page=-1'):
+            with self.subTest(query=query):
+                self.assertEqual(self.get(query).status_code, 404)
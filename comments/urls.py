@@ -1,10 +1,11 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'comments'
 
 urlpatterns = [
     # Comments for specific tickets
     path('tickets/<int:ticket_id>/comments/', views.CommentListCreateView.as_view(), name='ticket_comments'),
+    path('tickets/<int:ticket_id>/comments/thread/', async_views.comment_thread, name='ticket_comment_thread'),
     path('<int:pk>/', views.CommentDetailView.as_view(), name='comment_detail'),
 ]
@@ -1,15 +1,103 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from django.db.models import Count, Max
+from django.http import Http404
+from bookissue.docs import openapi, swagger_auto_schema
 
 from .models import Comment
-from .serializers import CommentSerializer, CommentCreateSerializer
+from .serializers import (
+    CommentSerializer,
+    CommentCreateSerializer,
+    CommentCompactSerializer,
+    THREAD_FIELDS,
+    thread_rows,
+    thread_ticket
+)
 from users.permissions import IsOwnerOrStaffOrICT
+from users.sideload import compact_list_response, compact_requested, sideload_users
+from bookissue.budgets import query_budget
+from bookissue.conditional import latest, make_etag, not_modified, set_validators
+from bookissue.fieldsets import prune_queryset
 
 
-class CommentListCreateView(generics.ListCreateAPIView):
+def ticket_row_queryset(ticket_id):
+    """
+    The ticket's ids and thread validators in one values() row: what the
+    permission check and the ETag need
+    """
+    from django.apps import apps
+    Ticket = apps.get_model('tickets', 'Ticket')
+
+    return (
+        Ticket.objects.filter(pk=ticket_id)
+        .annotate(
+            comment_count=Count('comments'),
+            last_comment_id=Max('comments__id'),
+            last_comment_at=Max('comments__created_at'),
+            last_comment_update=Max('comments__updated_at'),
+            last_author_update=Max('comments__author__updated_at'),
+        )
+        .values(
+            'id', 'title', 'status', 'created_by_id', 'assigned_to_id',
+            'created_at', 'updated_at', 'comment_count', 'last_comment_id',
+            'last_comment_at', 'last_comment_update', 'last_author_update'
+        )
+    )
+
+
+def can_access_ticket_row(row, user):
+    """Ticket creator, assignee, staff and ICT can read and comment"""
+    return user.id in (row['created_by_id'], row['assigned_to_id']) or user.can_manage_tickets()
+
+
+def thread_validators(row, prefix):
+    """
+    ETag and Last-Modified for the comment thread, derived from the
+    comment count, latest comment id and latest edit. Ticket title and
+    author details are part of the payload, so their updated_at count
+    too; deleting a comment touches the ticket's (see tickets.signals).
+    """
+    etag = make_etag(
+        prefix, row['id'], row['updated_at'], row['comment_count'],
+        row['last_comment_id'], row['last_comment_update'], row['last_author_update']
+    )
+    return etag, latest(
+        row['updated_at'], row['last_comment_at'], row['last_comment_update'], row['last_author_update']
+    )
+
+
+def thread_queryset(ticket_id):
+    return (
+        Comment.objects.filter(ticket_id=ticket_id)
+        .order_by('-created_at', '-id')
+        .values(*THREAD_FIELDS)
+    )
+
+
+class TicketCommentsMixin:
+    """
+    Ticket lookup shared by the comment list/create and thread views: one
+    query returns the ids needed for the permission check together with
+    the thread validators, and is reused for the rest of the request.
+    """
+
+    def get_ticket_row(self):
+        if not hasattr(self, '_ticket_row'):
+            self._ticket_row = ticket_row_queryset(self.kwargs['ticket_id']).first()
+        if self._ticket_row is None:
+            raise Http404('Ticket not found')
+        return self._ticket_row
+
+    def can_access_ticket(self):
+        return can_access_ticket_row(self.get_ticket_row(), self.request.user)
+
+    def get_validators(self, prefix='comments'):
+        if not self.can_access_ticket():
+            return None, None
+        return thread_validators(self.get_ticket_row(), prefix)
+
+
+class CommentListCreateView(TicketCommentsMixin, generics.ListCreateAPIView):
     """
     GET: List all comments for a specific ticket
     POST: Create a new comment for a specific ticket
@@ -22,24 +110,22 @@ class CommentListCreateView(generics.ListCreateAPIView):
         return CommentSerializer
 
     def get_queryset(self):
-        from django.apps import apps
-        Ticket = apps.get_model('tickets', 'Ticket')
-        
-        ticket_id = self.kwargs['ticket_id']
-        ticket = get_object_or_404(Ticket, id=ticket_id)
-        
         # Check if user can view this ticket's comments
-        if (ticket.created_by == self.request.user or 
-            ticket.assigned_to == self.request.user or
-            self.request.user.can_manage_tickets()):
-            return Comment.objects.filter(ticket=ticket).select_related('author', 'ticket')
+        if self.can_access_ticket():
+            comments = Comment.objects.filter(ticket_id=self.kwargs['ticket_id'])
+            if self.request.method != 'GET':
+                return comments
+            if compact_requested(self.request):
+                return prune_queryset(comments, CommentCompactSerializer(context=self.get_serializer_context()))
+            return prune_queryset(comments, self.get_serializer())
         else:
             return Comment.objects.none()
 
     @swagger_auto_schema(
         operation_description="Get all comments for a specific ticket",
         manual_parameters=[
-            openapi.Parameter('ticket_id', openapi.IN_PATH, description="ID of the ticket", type=openapi.TYPE_INTEGER)
+            openapi.Parameter('ticket_id', openapi.IN_PATH, description="ID of the ticket", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('compact', openapi.IN_QUERY, description="Return author ids in rows and each author once under included.users", type=openapi.TYPE_BOOLEAN)
         ],
         responses={
             200: CommentSerializer(many=True),
@@ -47,8 +133,18 @@ class CommentListCreateView(generics.ListCreateAPIView):
             403: "Permission denied"
         }
     )
+    @query_budget(5)
     def get(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        compact = compact_requested(request)
+        etag, last_modified = self.get_validators(prefix='comments-compact' if compact else 'comments')
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        if compact:
+            response = compact_list_response(self, self.get_queryset(), CommentCompactSerializer)
+        else:
+            response = super().list(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
 
     @swagger_auto_schema(
         operation_description="Create a new comment for a specific ticket",
@@ -63,23 +159,16 @@ class CommentListCreateView(generics.ListCreateAPIView):
             403: "Permission denied"
         }
     )
+    @query_budget(8)
     def post(self, request, *args, **kwargs):
-        return super().create(request, *args, **kwargs)
+        return self.create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        from django.apps import apps
-        Ticket = apps.get_model('tickets', 'Ticket')
-        
-        ticket_id = self.kwargs['ticket_id']
-        ticket = get_object_or_404(Ticket, id=ticket_id)
-        
         # Check if user can comment on this ticket
-        if (ticket.created_by == self.request.user or 
-            ticket.assigned_to == self.request.user or
-            self.request.user.can_manage_tickets()):
+        if self.can_access_ticket():
             serializer.save(
                 author=self.request.user,
-                ticket=ticket
+                ticket_id=self.get_ticket_row()['id']
             )
         else:
             from rest_framework.exceptions import PermissionDenied
@@ -95,6 +184,78 @@ class CommentListCreateView(generics.ListCreateAPIView):
         return Response(comment_serializer.data, status=status.HTTP_201_CREATED)
 
 
+class CommentThreadView(TicketCommentsMixin, generics.GenericAPIView):
+    """
+    GET: A page of a ticket's comments with the ticket sent once and the
+    authors side-loaded, serialized straight from values() rows
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return thread_queryset(self.kwargs['ticket_id'])
+
+    @swagger_auto_schema(
+        operation_description="Get a ticket's comment thread: ticket metadata once, comments with author ids, authors under included.users",
+        manual_parameters=[
+            openapi.Parameter('ticket_id', openapi.IN_PATH, description="ID of the ticket", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('page', openapi.IN_QUERY, description="Page number", type=openapi.TYPE_INTEGER)
+        ],
+        responses={
+            200: openapi.Response(
+                description="Comment thread",
+                examples={
+                    "application/json": {
+                        "ticket": {
+                            "id": 3, "title": "Cannot log in", "status": "IN_PROGRESS",
+                            "created_by": 7, "assigned_to": 2,
+                            "created_at": "2025-08-01T09:00:00Z", "updated_at": "2025-08-01T10:00:00Z"
+                        },
+                        "count": 1,
+                        "next": None,
+                        "previous": None,
+                        "results": [
+                            {"id": 12, "author": 2, "message": "Looking into it", "created_at": "2025-08-01T10:00:00Z"}
+                        ],
+                        "included": {
+                            "users": {
+                                "2": {"id": 2, "email": "ict@example.com", "full_name": "ICT Officer", "role": "ict"}
+                            }
+                        }
+                    }
+                }
+            ),
+            404: "Ticket not found",
+            403: "Permission denied"
+        }
+    )
+    @query_budget(5)
+    def get(self, request, *args, **kwargs):
+        if not self.can_access_ticket():
+            return Response(
+                {'error': "You don't have permission to view this ticket's comments."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        etag, last_modified = self.get_validators(prefix='thread')
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        ticket = self.get_ticket_row()
+        page = self.paginate_queryset(self.get_queryset())
+        users = sideload_users(
+            [row['author_id'] for row in page] + [ticket['created_by_id'], ticket['assigned_to_id']],
+            request
+        )
+        response = self.get_paginated_response(thread_rows(page))
+        response.data = {
+            'ticket': thread_ticket(ticket),
+            **response.data,
+            'included': {'users': users},
+        }
+        return set_validators(response, etag, last_modified)
+
+
 class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     GET: Retrieve a specific comment
@@ -105,6 +266,8 @@ class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrStaffOrICT]
 
     def get_queryset(self):
+        if self.request.method == 'GET':
+            return prune_queryset(Comment.objects.all(), self.get_serializer())
         return Comment.objects.select_related('author', 'ticket')
 
     @swagger_auto_schema(
@@ -115,6 +278,7 @@ class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
             403: "Permission denied"
         }
     )
+    @query_budget(2)
     def get(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
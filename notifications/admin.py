@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from bookissue.cache import bump_on_commit
 from .models import Notification
 
 
@@ -43,10 +45,12 @@ class NotificationAdmin(admin.ModelAdmin):
     
     def mark_as_read(self, request, queryset):
         updated = queryset.update(is_read=True)
+        bump_on_commit('notifications')
         self.message_user(request, f'{updated} notifications marked as read.')
     mark_as_read.short_description = "Mark selected notifications as read"
     
     def mark_as_unread(self, request, queryset):
         updated = queryset.update(is_read=False)
+        bump_on_commit('notifications')
         self.message_user(request, f'{updated} notifications marked as unread.')
     mark_as_unread.short_description = "Mark selected notifications as unread"
@@ -0,0 +1,49 @@
+"""
+Async versions of the notification list and unread count (see
+bookissue.async_api), the endpoints clients poll most. Compact lists and
+other parameters are left to NotificationViewSet.
+"""
+from bookissue.async_api import async_read_view, compiled, json_response, only_params, paginate
+from bookissue.conditional import not_modified, set_validators
+
+from .models import Notification
+from .serializers import NotificationListSerializer
+from .views import LIST_STATE, NotificationViewSet, list_etag
+
+LIST_PARAMS = ('page', 'is_read', 'type')
+
+list_view = NotificationViewSet.as_view({'get': 'list'}, cached_actions={})
+unread_count_view = NotificationViewSet.as_view({'get': 'unread_count'}, cached_actions={})
+
+
+@async_read_view(list_view)
+async def notification_list(request, user):
+    """GET /api/notifications/"""
+    if not only_params(request, LIST_PARAMS):
+        return None
+    queryset = Notification.objects.filter(user=user)
+    etag = list_etag(user.id, False, await queryset.aaggregate(**LIST_STATE))
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    # Same filtering as NotificationViewSet.list()
+    is_read = request.GET.get('is_read')
+    notification_type = request.GET.get('type')
+    if is_read is not None:
+        queryset = queryset.filter(is_read=is_read.lower() in ('true', '1', 'yes'))
+    if notification_type:
+        queryset = queryset.filter(notification_type=notification_type)
+
+    serializer = compiled(NotificationListSerializer)
+    data = await paginate(request, queryset.values_list(*serializer.paths), serializer.render)
+    if data is None:
+        return None
+    return set_validators(json_response(data), etag)
+
+
+@async_read_view(unread_count_view)
+async def unread_count(request, user):
+    """GET /api/notifications/unread_count/"""
+    count = await Notification.objects.filter(user=user, is_read=False).acount()
+    return json_response({'count': count})
@@ -38,6 +38,9 @@ class Notification(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
+        indexes = [
+            models.Index(fields=['user', 'is_read'], name='notif_user_is_read_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.title} ({'Read' if self.is_read else 'Unread'})"
@@ -56,6 +59,24 @@ class Notification(models.Model):
             comment_id=comment_id
         )
 
+    @classmethod
+    def notify_users(cls, users, title, message, notification_type='general', ticket_id=None, comment_id=None):
+        """
+        create_notification() for several users with one INSERT. bulk_create()
+        sends no post_save, so callers bump the response cache themselves.
+        """
+        return cls.objects.bulk_create([
+            cls(
+                user=user,
+                title=title,
+                message=message,
+                notification_type=notification_type,
+                ticket_id=ticket_id,
+                comment_id=comment_id
+            )
+            for user in users
+        ])
+
     @classmethod
     def create_ticket_status_notification(cls, user, ticket, old_status, new_status):
         """
@@ -89,27 +110,31 @@ class Notification(models.Model):
         )
 
     @classmethod
-    def create_comment_notification(cls, user, comment, commenter):
-        """
-        Create notification when new comment is added
-        """
+    def comment_notification_fields(cls, comment, commenter):
+        """Title, message and links of a new comment notification"""
         ticket = comment.ticket
-        
+
         if commenter.role == 'ict':
             title = f"ICT Replied to Ticket #{ticket.id}"
             message = f"ICT has replied to your ticket '{ticket.title}'."
         else:
             title = f"New Comment on Ticket #{ticket.id}"
             message = f"{commenter.get_full_name()} has added a comment to ticket '{ticket.title}'."
-        
-        return cls.create_notification(
-            user=user,
-            title=title,
-            message=message,
-            notification_type='new_comment',
-            ticket_id=ticket.id,
-            comment_id=comment.id
-        )
+
+        return {
+            'title': title,
+            'message': message,
+            'notification_type': 'new_comment',
+            'ticket_id': ticket.id,
+            'comment_id': comment.id,
+        }
+
+    @classmethod
+    def create_comment_notification(cls, user, comment, commenter):
+        """
+        Create notification when new comment is added
+        """
+        return cls.create_notification(user=user, **cls.comment_notification_fields(comment, commenter))
 
     @classmethod
     def create_assignment_notification(cls, user, ticket, assigned_by):
@@ -1,13 +1,22 @@
+from django.utils import timezone
+from django.utils.timesince import timesince
 from rest_framework import serializers
 from .models import Notification
+from bookissue.fieldsets import SparseFieldsMixin
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+def format_time_ago(created_at):
+    """Human-readable age of a notification"""
+    return timesince(created_at, timezone.now())
+
+
+class NotificationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for notification data
     """
     user_name = serializers.CharField(source='user.full_name', read_only=True)
     time_ago = serializers.SerializerMethodField()
+    sparse_requires = {'time_ago': ['created_at']}
 
     class Meta:
         model = Notification
@@ -21,17 +30,16 @@ class NotificationSerializer(serializers.ModelSerializer):
         """
         Return human-readable time difference
         """
-        from django.utils import timezone
-        from django.utils.timesince import timesince
-        
-        return timesince(obj.created_at, timezone.now())
+        return format_time_ago(obj.created_at)
 
 
-class NotificationListSerializer(serializers.ModelSerializer):
+class NotificationListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Lightweight serializer for listing notifications
     """
     time_ago = serializers.SerializerMethodField()
+    sparse_requires = {'time_ago': ['created_at']}
+    compiled_fields = {'time_ago': (['created_at'], format_time_ago)}
 
     class Meta:
         model = Notification
@@ -44,10 +52,21 @@ class NotificationListSerializer(serializers.ModelSerializer):
         """
         Return human-readable time difference
         """
-        from django.utils import timezone
-        from django.utils.timesince import timesince
-        
-        return timesince(obj.created_at, timezone.now())
+        return format_time_ago(obj.created_at)
+
+
+class NotificationCompactSerializer(NotificationListSerializer):
+    """
+    Serializer for compact notification lists (user side-loaded by id)
+    """
+
+    class Meta(NotificationListSerializer.Meta):
+        fields = NotificationListSerializer.Meta.fields + ['user']
+
+    def user_ids(self, notifications):
+        if 'user' not in self.fields:
+            return set()
+        return {notification.user_id for notification in notifications}
 
 
 class MarkNotificationReadSerializer(serializers.Serializer):
@@ -1,14 +1,38 @@
-from django.db.models.signals import post_save, pre_save
-from django.dispatch import receiver
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from tickets.models import Ticket
-from comments.models import Comment
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from bookissue.cache import bump_on_commit
+
 from .models import Notification
 
-User = get_user_model()
+_state = threading.local()
+
+
+@contextmanager
+def suppress_notifications():
+    """
+    Disable notification fan-out in the current thread, e.g. while
+    bulk loading legacy data that must not notify anybody.
+    """
+    previous = getattr(_state, 'suppressed', False)
+    _state.suppressed = True
+    try:
+        yield
+    finally:
+        _state.suppressed = previous
+
+
+def notifications_suppressed():
+    """Return True while inside suppress_notifications()"""
+    return getattr(_state, 'suppressed', False)
 
 
-@receiver(post_save, sender=Ticket)
+@receiver(post_save, sender='tickets.Ticket')
 def create_ticket_notifications(sender, instance, created, **kwargs):
     """
     Create notifications when:
@@ -16,112 +40,89 @@ def create_ticket_notifications(sender, instance, created, **kwargs):
     2. A ticket status changes (notify ticket creator)
     3. A ticket is assigned (notify assigned ICT member)
     """
+    if notifications_suppressed():
+        return
+
     if created:
-        # 1. Notify ICT team about new ticket
-        ict_users = User.objects.filter(role='ict')
-        for ict_user in ict_users:
-            Notification.create_notification(
-                user=ict_user,
-                title=f"New Ticket #{instance.id}",
-                message=f"New ticket '{instance.title}' has been submitted by {instance.created_by.get_full_name()}.",
-                notification_type='new_ticket',
-                ticket_id=instance.id
-            )
-        
-        # Also notify super admin about new ticket
-        super_admins = User.objects.filter(role='super_admin')
-        for super_admin in super_admins:
-            Notification.create_notification(
-                user=super_admin,
+        # 1. Notify ICT team about new ticket, and super admins as well
+        recipients = list(get_user_model().objects.filter(role__in=['ict', 'super_admin']).order_by('id'))
+        recipients.sort(key=lambda user: user.role != 'ict')
+        if recipients:
+            Notification.notify_users(
+                recipients,
                 title=f"New Ticket #{instance.id}",
                 message=f"New ticket '{instance.title}' has been submitted by {instance.created_by.get_full_name()}.",
                 notification_type='new_ticket',
                 ticket_id=instance.id
             )
+            bump_on_commit('notifications')
     else:
-        # Check if status changed
-        try:
-            old_instance = Ticket.objects.get(pk=instance.pk)
-            # Get the previous state from the database
-            if hasattr(instance, '_old_status') and instance._old_status != instance.status:
-                # 2. Notify ticket creator about status change
-                status_display = instance.get_status_display()
-                Notification.create_ticket_status_notification(
-                    user=instance.created_by,
+        # Previous values are stored on the instance by tickets.signals,
+        # no need to load the row again
+        if hasattr(instance, '_old_status') and instance._old_status != instance.status:
+            # 2. Notify ticket creator about status change
+            Notification.create_ticket_status_notification(
+                user=instance.created_by,
+                ticket=instance,
+                old_status=instance._old_status,
+                new_status=instance.status
+            )
+
+        # Check if assignment changed
+        if hasattr(instance, '_old_assigned_to_id') and instance._old_assigned_to_id != instance.assigned_to_id:
+            if instance.assigned_to:
+                # 4. Notify assigned ICT member
+                Notification.create_assignment_notification(
+                    user=instance.assigned_to,
                     ticket=instance,
-                    old_status=instance._old_status,
-                    new_status=instance.status
+                    assigned_by=None  # We don't track who assigned it in this context
                 )
-            
-            # Check if assignment changed
-            if hasattr(instance, '_old_assigned_to') and instance._old_assigned_to != instance.assigned_to:
-                if instance.assigned_to:
-                    # 4. Notify assigned ICT member
-                    Notification.create_assignment_notification(
-                        user=instance.assigned_to,
-                        ticket=instance,
-                        assigned_by=None  # We don't track who assigned it in this context
-                    )
-        except Ticket.DoesNotExist:
-            pass
-
-
-@receiver(pre_save, sender=Ticket)
-def store_old_ticket_values(sender, instance, **kwargs):
-    """Store old values before saving to detect changes"""
-    if instance.pk:
-        try:
-            old_instance = Ticket.objects.get(pk=instance.pk)
-            instance._old_status = old_instance.status
-            instance._old_assigned_to = old_instance.assigned_to
-        except Ticket.DoesNotExist:
-            pass
-
-
-@receiver(post_save, sender=Comment)
+
+
+@receiver(post_save, sender='comments.Comment')
 def create_comment_notifications(sender, instance, created, **kwargs):
     """
     Create notifications when:
     3. A comment is added to a ticket
     """
+    if notifications_suppressed():
+        return
+
     if created:
         ticket = instance.ticket
-        comment_author = instance.author_details
-        
+        comment_author = instance.author
+        recipients = []
+
         # If ICT comments, notify ticket creator
-        if comment_author.role == 'ict' and comment_author != ticket.created_by:
-            Notification.create_comment_notification(
-                user=ticket.created_by,
-                comment=instance,
-                commenter=comment_author
-            )
-        
+        if comment_author.role == 'ict' and comment_author.pk != ticket.created_by_id:
+            recipients.append(ticket.created_by_id)
+
         # If Student/Staff comments, notify ICT team
-        elif comment_author.role in ['student', 'staff'] and comment_author != ticket.created_by:
-            ict_users = User.objects.filter(role='ict')
-            for ict_user in ict_users:
-                if ict_user != comment_author:  # Don't notify the commenter
-                    Notification.create_comment_notification(
-                        user=ict_user,
-                        comment=instance,
-                        commenter=comment_author
-                    )
-        
+        elif comment_author.role in ['student', 'staff'] and comment_author.pk != ticket.created_by_id:
+            ict_users = get_user_model().objects.filter(role='ict').exclude(pk=comment_author.pk)
+            recipients.extend(ict_users.order_by('id').values_list('id', flat=True))
+
         # Also notify ticket creator if they didn't write the comment
-        if comment_author != ticket.created_by:
-            Notification.create_comment_notification(
-                user=ticket.created_by,
-                comment=instance,
-                commenter=comment_author
+        if comment_author.pk != ticket.created_by_id:
+            recipients.append(ticket.created_by_id)
+
+        if recipients:
+            Notification.notify_users(
+                [get_user_model()(pk=user_id) for user_id in recipients],
+                **Notification.comment_notification_fields(instance, comment_author)
             )
+            bump_on_commit('notifications')
 
 
-@receiver(post_save, sender=User)
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_user_notifications(sender, instance, created, **kwargs):
     """
     Create notifications when:
     5. A new user is created by Super Admin
     """
+    if notifications_suppressed():
+        return
+
     if created:
         # 5. Notify new user about account creation
         Notification.create_notification(
@@ -1,3 +1,139 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from bookissue.compiled import compile_serializer
+from bookissue.testing import QueryBudgetAssertions, seed_helpdesk
+from tickets.models import Ticket
+from users.models import User
+from .models import Notification
+from .serializers import NotificationListSerializer
+
+
+class CompiledNotificationSerializerTests(TestCase):
+    """Golden tests: the compiled list path renders byte-identical output"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='student@example.com', username='student', password='x',
+            first_name='Jane', last_name='Doe'
+        )
+        for i, kind in enumerate(['ticket_status', 'new_comment', 'assignment', 'general']):
+            Notification.create_notification(
+                cls.user, f'Title {i}', 'Message with "quotes"\nand a newline',
+                notification_type=kind, ticket_id=i or None
+            )
+        Notification.objects.filter(title='Title 0').update(is_read=True)
+        Notification.objects.filter(title='Title 1').update(created_at=timezone.now() - timedelta(days=3, hours=2))
+
+    def test_notification_list_matches_serializer(self):
+        queryset = Notification.objects.order_by('id')
+        compiled = compile_serializer(NotificationListSerializer())
+        expected = JSONRenderer().render(NotificationListSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(compiled.render(queryset.values_list(*compiled.paths)))
+        self.assertEqual(expected, actual)
+
+    def test_endpoints_match_regular_path(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for url in ['/api/notifications/', '/api/notifications/unread/', '/api/notifications/?fields=id,time_ago&is_read=false']:
+            compiled = client.get(url)
+            with mock.patch('notifications.views.compiled_list_response', return_value=None):
+                regular = client.get(url)
+            self.assertEqual(compiled.status_code, 200)
+            self.assertEqual(compiled.content, regular.content, url)
+
+    def test_long_unread_list_streamed(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for url in ['/api/notifications/unread/', '/api/notifications/unread/?compact=1']:
+            expected = client.get(url)
+            with override_settings(STREAM_LIST_THRESHOLD=1, STREAM_CHUNK_SIZE=1):
+                streamed = client.get(url)
+            self.assertTrue(streamed.streaming)
+            self.assertEqual(b''.join(streamed.streaming_content), expected.content, url)
+            self.assertEqual(streamed['ETag'], expected['ETag'])
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class NotificationQueryBudgetTests(QueryBudgetAssertions, TestCase):
+    """Notification endpoints stay within their query budgets whatever the page holds"""
+
+    def test_read_endpoints(self):
+        users = seed_helpdesk(tickets=1)
+        for path in ['/api/notifications/', '/api/notifications/?compact=1', '/api/notifications/unread/',
+                     '/api/notifications/unread/?compact=1', '/api/notifications/unread_count/']:
+            with self.subTest(path=path):
+                self.assertWithinBudget(users['ict'], path, grow=lambda: seed_helpdesk(tickets=4, prefix='more'))
+
+    def test_new_ticket_fan_out_does_not_grow_with_ict_team(self):
+        users = seed_helpdesk(tickets=0)
+
+        def create_ticket(title):
+            with CaptureQueriesContext(connection) as queries:
+                ticket = Ticket.objects.create(title=title, description='The spine is broken', created_by=users['student'])
+            notified = set(Notification.objects.filter(ticket_id=ticket.id).values_list('user__email', flat=True))
+            return len(queries), notified
+
+        before, notified = create_ticket('Broken spine')
+        self.assertEqual(notified, {'ict@example.com', 'ict2@example.com', 'super_admin@example.com'})
+        for index in range(5):
+            User.objects.create(email=f'ict{index}@example.org', username=f'ict-{index}', role='ict')
+        after, notified = create_ticket('Broken spine again')
+        self.assertEqual(after, before)
+        self.assertEqual(len(notified), 8)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+@mock.patch('notifications.views.time.time', return_value=1_700_000_000)
+class ConditionalNotificationReadTests(TestCase):
+    """Notification lists answer unchanged reads with 304 and change their ETag on writes"""
+
+    urls = ['/api/notifications/', '/api/notifications/unread/', '/api/notifications/?compact=1']
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='student@example.com', username='student', password='x')
+        self.other = User.objects.create_user(email='other@example.com', username='other', password='x')
+        self.first = Notification.create_notification(self.user, 'Assigned', 'Your ticket was assigned')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, etag=None):
+        return self.client.get(url, **({'HTTP_IF_NONE_MATCH': etag} if etag else {}))
+
+    def test_unchanged_lists_not_modified(self, _):
+        etags = set()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                etags.add(response['ETag'])
+                self.assertEqual(self.get(url, response['ETag']).status_code, 304)
+                # Someone else's notifications leave this user's lists alone
+                Notification.create_notification(self.other, 'Elsewhere', 'x')
+                self.assertEqual(self.get(url, response['ETag']).status_code, 304)
+        # Compact and full renderings never share an ETag
+        self.assertEqual(len(etags), 2)
+
+    def test_writes_change_etag(self, _):
+        writes = {
+            'new notification': lambda: Notification.create_notification(self.user, 'Commented', 'New comment'),
+            'marked read': lambda: self.client.post('/api/notifications/mark_read/', {'notification_ids': [self.first.id]}, format='json'),
+            'all marked read': lambda: self.client.post('/api/notifications/mark_all_read/'),
+            'deleted': lambda: self.first.delete(),
+        }
+        for write, apply in writes.items():
+            before = {url: self.get(url) for url in self.urls}
+            apply()
+            for url in self.urls:
+                with self.subTest(write=write, url=url):
+                    after = self.get(url, before[url]['ETag'])
+                    self.assertEqual(after.status_code, 200)
+                    self.assertNotEqual(after['ETag'], before[url]['ETag'])
@@ -1,10 +1,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from bookissue.cache import cache_response
+from . import async_views
 from .views import NotificationViewSet
 
 router = DefaultRouter()
 router.register(r'', NotificationViewSet, basename='notification')
 
 urlpatterns = [
+    # Async reads, falling back to the viewset for everything else
+    path('', async_views.notification_list, name='notification-list-async'),
+    path(
+        'unread_count/',
+        cache_response(*NotificationViewSet.cached_actions['unread_count'])(async_views.unread_count),
+        name='notification-unread-count-async'
+    ),
     path('', include(router.urls)),
 ]
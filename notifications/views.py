@@ -1,19 +1,53 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+import time
+
+from django.db.models import Count, Max, Q
+from bookissue.docs import openapi, swagger_auto_schema
 
 from .models import Notification
 from .serializers import (
     NotificationSerializer, 
     NotificationListSerializer, 
+    NotificationCompactSerializer,
     MarkNotificationReadSerializer
 )
+from bookissue.budgets import query_budget
+from bookissue.cache import CachedActionsMixin, bump_on_commit
+from bookissue.conditional import make_etag, not_modified, set_validators
+from bookissue.compiled import compiled_list_response
+from bookissue.fieldsets import prune_queryset
+from users.sideload import compact_list_response, compact_requested
+
+compact_parameter = openapi.Parameter(
+    'compact', openapi.IN_QUERY,
+    description="Return the user id in rows and the user once under included.users",
+    type=openapi.TYPE_BOOLEAN
+)
+
+
+# New notifications raise the latest id and marking read lowers the unread
+# count, so the aggregate changes whenever the lists do
+LIST_STATE = {
+    'latest_id': Max('id'),
+    'total': Count('id'),
+    'unread': Count('id', filter=Q(is_read=False)),
+}
+
+
+def list_etag(user_id, compact, state):
+    """
+    ETag for a user's notification lists from their LIST_STATE aggregate.
+    The current minute is mixed in because time_ago is rendered server-side.
+    """
+    return make_etag(
+        'notifications', user_id, compact, state['latest_id'],
+        state['total'], state['unread'], int(time.time() // 60)
+    )
 
 
-class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+class NotificationViewSet(CachedActionsMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for handling notifications
     - List user's notifications
@@ -23,12 +57,20 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     """
     serializer_class = NotificationListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cached_actions = {'unread_count': ('notifications', 'users')}
 
     def get_queryset(self):
         """
         Return notifications for the current user only
         """
-        return Notification.objects.filter(user=self.request.user)
+        queryset = Notification.objects.filter(user=self.request.user)
+        if self.action in ['list', 'unread', 'retrieve']:
+            if self.action != 'retrieve' and compact_requested(self.request):
+                serializer = NotificationCompactSerializer(context=self.get_serializer_context())
+            else:
+                serializer = self.get_serializer()
+            queryset = prune_queryset(queryset, serializer)
+        return queryset
 
     def get_serializer_class(self):
         """
@@ -38,6 +80,11 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
             return NotificationSerializer
         return NotificationListSerializer
 
+    def get_etag(self):
+        """ETag for the user's notification lists from one indexed aggregate"""
+        state = self.get_queryset().aggregate(**LIST_STATE)
+        return list_etag(self.request.user.id, compact_requested(self.request), state)
+
     @swagger_auto_schema(
         operation_description="Get count of unread notifications",
         responses={
@@ -52,6 +99,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         }
     )
     @action(detail=False, methods=['get'])
+    @query_budget(2)
     def unread_count(self, request):
         """
         Get count of unread notifications for the current user
@@ -97,6 +145,8 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = self.get_queryset().filter(is_read=False)
         
         updated_count = queryset.update(is_read=True)
+        # update() sends no signals
+        bump_on_commit('notifications')
         
         return Response({
             'message': 'Notifications marked as read successfully',
@@ -123,6 +173,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         Mark all notifications as read for the current user
         """
         updated_count = self.get_queryset().filter(is_read=False).update(is_read=True)
+        bump_on_commit('notifications')
         
         return Response({
             'message': 'All notifications marked as read successfully',
@@ -131,21 +182,42 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
 
     @swagger_auto_schema(
         operation_description="Get only unread notifications",
+        manual_parameters=[compact_parameter],
         responses={200: NotificationListSerializer(many=True)}
     )
     @action(detail=False, methods=['get'])
+    @query_budget(4)
     def unread(self, request):
         """
         Get only unread notifications for the current user
         """
+        etag = self.get_etag()
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
         unread_notifications = self.get_queryset().filter(is_read=False)
+        if compact_requested(request):
+            response = compact_list_response(self, unread_notifications, NotificationCompactSerializer, paginate=False)
+            return set_validators(response, etag)
+
+        response = compiled_list_response(self, unread_notifications, self.get_serializer(), paginate=False)
+        if response is not None:
+            return set_validators(response, etag)
         serializer = self.get_serializer(unread_notifications, many=True)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), etag)
 
+    @swagger_auto_schema(manual_parameters=[compact_parameter])
+    @query_budget(6)
     def list(self, request, *args, **kwargs):
         """
         List notifications with optional filtering
         """
+        etag = self.get_etag()
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
         queryset = self.get_queryset()
         
         # Optional filtering
@@ -159,11 +231,18 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         if notification_type:
             queryset = queryset.filter(notification_type=notification_type)
         
+        if compact_requested(request):
+            return set_validators(compact_list_response(self, queryset, NotificationCompactSerializer), etag)
+
+        response = compiled_list_response(self, queryset, self.get_serializer())
+        if response is not None:
+            return set_validators(response, etag)
+
         # Pagination
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return set_validators(self.get_paginated_response(serializer.data), etag)
         
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), etag)
@@ -0,0 +1,216 @@
+"""
+Daily ticket analytics rollups: time to resolve, time to first ICT
+response and throughput per assignee.
+
+The rollup reads tickets and the TicketEvent log in bounded day ranges,
+collects durations into flat arrays and reduces them with NumPy when it is
+installed (pure Python percentiles otherwise). Analytics endpoints only
+read the resulting TicketDailyStats rows.
+
+Resolutions and first responses are credited to whoever the log says was
+assigned when they happened, and new tickets to their first assignee, so
+reassigning a ticket later doesn't move them.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .models import RollupState, Ticket, TicketDailyStats, TicketEvent
+
+ROLLUP_NAME = 'ticket_daily_stats'
+PERCENTILES = (50, 90)
+MAX_RANGE_DAYS = 31
+# Incremental runs also re-read the events logged this long before the
+# previous run: their ids may be below its high-water mark yet they were
+# committed after it
+LOOKBACK = timedelta(minutes=10)
+
+
+def percentiles(values):
+    """p50 and p90 of a list of numbers, linearly interpolated"""
+    if np is not None:
+        return [float(value) for value in np.percentile(np.asarray(values, dtype=np.float64), PERCENTILES)]
+
+    ordered = sorted(values)
+    result = []
+    for q in PERCENTILES:
+        position = (len(ordered) - 1) * q / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        result.append(float(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)))
+    return result
+
+
+def _day(value):
+    return timezone.localtime(value).date()
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _assignee_at_event():
+    """The assignee the log records for the ticket just before an event"""
+    return Subquery(
+        TicketEvent.objects.filter(
+            ticket_id=OuterRef('ticket_id'), event=TicketEvent.ASSIGNED, id__lt=OuterRef('id')
+        ).order_by('-id').values('value')[:1]
+    )
+
+
+def _first_assignee():
+    """The first assignee the log records for a ticket"""
+    return Subquery(
+        TicketEvent.objects.filter(
+            ticket_id=OuterRef('id'), event=TicketEvent.ASSIGNED, value__isnull=False
+        ).order_by('id').values('value')[:1]
+    )
+
+
+def _day_runs(days):
+    """Split sorted dates into contiguous runs of at most MAX_RANGE_DAYS"""
+    run = []
+    for day in days:
+        if run and (day - run[-1] > timedelta(days=1) or len(run) == MAX_RANGE_DAYS):
+            yield run
+            run = []
+        run.append(day)
+    if run:
+        yield run
+
+
+def rollup_days(days):
+    """Recompute the rollup rows of the given dates. Returns rows written."""
+    written = 0
+    for run in _day_runs(sorted(set(days))):
+        written += _rollup_run(run)
+    return written
+
+
+def _rollup_run(days):
+    start = _day_start(days[0])
+    end = _day_start(days[-1] + timedelta(days=1))
+    created = defaultdict(int)
+    resolve_times = defaultdict(list)
+    response_times = defaultdict(list)
+
+    def add(bucket, day, assignee_id, value):
+        bucket[(day, None)].append(value)
+        if assignee_id:
+            bucket[(day, assignee_id)].append(value)
+
+    new_tickets = (
+        Ticket.objects.filter(created_at__gte=start, created_at__lt=end)
+        .order_by()
+        .annotate(assignee_id=_first_assignee())
+        .values_list('created_at', 'assignee_id')
+    )
+    for created_at, assignee_id in new_tickets.iterator():
+        day = _day(created_at)
+        created[(day, None)] += 1
+        if assignee_id:
+            created[(day, assignee_id)] += 1
+
+    resolutions = (
+        TicketEvent.objects.filter(
+            event=TicketEvent.STATUS_CHANGED,
+            value=TicketEvent.status_code('RESOLVED'),
+            created_at__gte=start,
+            created_at__lt=end
+        )
+        .order_by()
+        .annotate(assignee_id=_assignee_at_event())
+        .values_list('created_at', 'ticket__created_at', 'assignee_id')
+    )
+    for resolved_at, created_at, assignee_id in resolutions.iterator():
+        add(resolve_times, _day(resolved_at), assignee_id, (resolved_at - created_at).total_seconds())
+
+    ict_comments = TicketEvent.objects.filter(event=TicketEvent.COMMENTED, actor__role='ict')
+    first_responses = (
+        ict_comments.filter(
+            ticket__created_at__gte=start,
+            ticket__created_at__lt=end,
+            id=Subquery(ict_comments.filter(ticket_id=OuterRef('ticket_id')).order_by('id').values('id')[:1])
+        )
+        .order_by()
+        .annotate(assignee_id=_assignee_at_event())
+        .values_list('ticket__created_at', 'created_at', 'assignee_id')
+    )
+    for created_at, responded_at, assignee_id in first_responses.iterator():
+        add(response_times, _day(created_at), assignee_id, (responded_at - created_at).total_seconds())
+
+    rows = []
+    for key in set(created) | set(resolve_times) | set(response_times):
+        day, assignee_id = key
+        row = TicketDailyStats(
+            day=day,
+            assignee_id=assignee_id,
+            created_count=created.get(key, 0),
+            resolved_count=len(resolve_times.get(key, ())),
+            response_count=len(response_times.get(key, ())),
+        )
+        if resolve_times.get(key):
+            row.resolve_p50, row.resolve_p90 = percentiles(resolve_times[key])
+        if response_times.get(key):
+            row.response_p50, row.response_p90 = percentiles(response_times[key])
+        rows.append(row)
+
+    with transaction.atomic():
+        TicketDailyStats.objects.filter(day__gte=days[0], day__lte=days[-1]).delete()
+        TicketDailyStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def update_rollups(full=False):
+    """
+    Bring TicketDailyStats up to date.
+
+    Incremental runs only recompute the days touched by events logged since
+    the previous run (and in the LOOKBACK before it); `full` recomputes
+    every day since the first ticket. Concurrent runs take turns on the
+    RollupState row. Returns (days recomputed, rows written).
+    """
+    RollupState.objects.get_or_create(name=ROLLUP_NAME)
+    with transaction.atomic():
+        state = RollupState.objects.select_for_update().get(name=ROLLUP_NAME)
+        return _update_rollups(state, full)
+
+
+def _update_rollups(state, full):
+    last_event_id = TicketEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    if full:
+        first = Ticket.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        if first is None:
+            TicketDailyStats.objects.all().delete()
+            days = []
+        else:
+            first_day, today = _day(first), _day(timezone.now())
+            days = [first_day + timedelta(days=n) for n in range((today - first_day).days + 1)]
+    else:
+        days = set()
+        new_events = TicketEvent.objects.filter(id__gt=state.last_event_id, id__lte=last_event_id)
+        # event__in lets the (event, created_at) index serve the time range
+        late_events = TicketEvent.objects.filter(
+            event__in=[code for code, _ in TicketEvent.EVENT_TYPES],
+            created_at__gte=state.updated_at - LOOKBACK,
+            id__lte=state.last_event_id
+        ) if state.last_event_id else TicketEvent.objects.none()
+        for events in (new_events, late_events):
+            touched = events.order_by().values_list('created_at', 'ticket__created_at')
+            for event_at, ticket_created_at in touched.iterator():
+                days.add(_day(event_at))
+                days.add(_day(ticket_created_at))
+
+    written = rollup_days(days)
+    state.last_event_id = last_event_id
+    state.save()
+    return len(days), written
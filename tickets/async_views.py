@@ -0,0 +1,105 @@
+"""
+Async versions of the ticket list and detail reads (see bookissue.async_api).
+
+They serve the plain JSON requests the dashboards make (page, filters,
+ordering; no search, sparse fields, include or compact) and hand
+everything else to TicketViewSet.
+"""
+from django.db.models import Count
+
+from bookissue.async_api import async_read_view, compiled, json_response, only_params, paginate
+from bookissue.conditional import not_modified, set_validators
+from users.models import User
+
+from .models import Ticket
+from .serializers import TicketListSerializer, TicketSerializer
+from .views import TicketViewSet, ticket_validators, validator_rows
+
+LIST_PARAMS = ('page', 'status', 'assigned_to', 'created_by', 'ordering')
+STATUSES = {value for value, _ in Ticket.STATUS_CHOICES}
+
+list_view = TicketViewSet.as_view({'get': 'list', 'post': 'create'}, cached_actions={})
+detail_view = TicketViewSet.as_view(
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'},
+    cached_actions={}
+)
+
+
+def scoped_tickets(user):
+    """Same scope as TicketViewSet.get_queryset()"""
+    if user.can_manage_tickets():
+        return Ticket.objects.all()
+    return Ticket.objects.filter(created_by=user)
+
+
+async def filter_tickets(request, queryset):
+    """
+    TicketViewSet's filterset_fields and ordering applied to `queryset`;
+    None for values DjangoFilterBackend or OrderingFilter would treat
+    differently (rejected choices, unknown users or ordering fields)
+    """
+    status = request.GET.get('status', '')
+    if status:
+        if status not in STATUSES:
+            return None
+        queryset = queryset.filter(status=status)
+
+    for name in ('assigned_to', 'created_by'):
+        value = request.GET.get(name, '')
+        if not value:
+            continue
+        if not value.isdigit() or not await User.objects.filter(pk=value).aexists():
+            return None
+        queryset = queryset.filter(**{f'{name}_id': value})
+
+    ordering = [term.strip() for term in request.GET.get('ordering', '').split(',') if term.strip()]
+    for term in ordering:
+        if term.removeprefix('-') not in TicketViewSet.ordering_fields:
+            return None
+    return queryset.order_by(*(ordering or TicketViewSet.ordering))
+
+
+@async_read_view(list_view)
+async def ticket_list(request, user):
+    """GET /api/tickets/"""
+    if not only_params(request, LIST_PARAMS):
+        return None
+    queryset = await filter_tickets(request, scoped_tickets(user))
+    if queryset is None:
+        return None
+
+    serializer = compiled(TicketListSerializer)
+    rows = queryset.annotate(comments_count=Count('comments')).values_list(*serializer.paths)
+    data = await paginate(request, rows, lambda page: serializer.render(page, request))
+    if data is None:
+        return None
+    return json_response(data)
+
+
+@async_read_view(detail_view)
+async def ticket_detail(request, user, pk):
+    """GET /api/tickets/<pk>/"""
+    if request.GET:
+        return None
+    queryset = scoped_tickets(user)
+    row = await validator_rows(queryset, pk).afirst()
+    if row is None:
+        # Not found (or out of scope): the regular view answers 404
+        return None
+
+    etag, last_modified = ticket_validators(pk, '', row)
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    serializer = compiled(TicketSerializer)
+    ticket = await (
+        queryset.filter(pk=pk)
+        .annotate(comments_count=Count('comments'))
+        .values_list(*serializer.paths)
+        .afirst()
+    )
+    if ticket is None:
+        return None
+    [data] = serializer.render([ticket], request)
+    return set_validators(json_response(data), etag, last_modified)
@@ -0,0 +1,174 @@
+"""
+Helpers for loading tickets and comments in bulk (legacy imports, datasets)
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+import io
+
+from django.core.management.color import no_style
+from django.db import connection
+
+
+@contextmanager
+def preserve_timestamps(*models):
+    """
+    Keep explicit created_at/updated_at values on bulk inserts.
+
+    auto_now/auto_now_add would otherwise stamp every row with the load
+    time. Only meant for management commands: the flags are toggled on the
+    shared model fields for the duration of the block.
+    """
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = False
+                field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+def chunked(iterable, size):
+    """Yield lists of at most `size` items from any iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def copy_supported():
+    """COPY FROM STDIN is only available on PostgreSQL"""
+    return connection.vendor == 'postgresql'
+
+
+def load_rows(model, columns, rows, batch_size=5000):
+    """
+    Insert `rows` (tuples ordered like `columns`, which are field attnames
+    such as 'created_by_id') into the model's table without sending signals.
+
+    Uses COPY on PostgreSQL and chunked bulk_create elsewhere. Returns the
+    number of inserted rows.
+    """
+    total = 0
+    for chunk in chunked(rows, batch_size):
+        if copy_supported():
+            _copy_chunk(model, columns, chunk)
+        else:
+            model.objects.bulk_create(
+                [model(**dict(zip(columns, row))) for row in chunk],
+                batch_size=batch_size
+            )
+        total += len(chunk)
+    return total
+
+
+def _copy_value(value):
+    """Format one value for COPY ... (FORMAT csv); unquoted empty means NULL"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_chunk(model, columns, chunk):
+    opts = model._meta
+    db_columns = ', '.join(
+        connection.ops.quote_name(opts.get_field(name).column) for name in columns
+    )
+    sql = f'COPY {connection.ops.quote_name(opts.db_table)} ({db_columns}) FROM STDIN WITH (FORMAT csv)'
+
+    buffer = io.StringIO()
+    for row in chunk:
+        buffer.write(','.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy_expert'):
+            # psycopg2
+            raw_cursor.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def reset_sequences(*models):
+    """Move id sequences past explicitly inserted primary keys"""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def backfill_ticket_events():
+    """
+    Write activity log entries for tickets that have none (bulk loaded rows
+    never went through the save signals), in one INSERT ... SELECT.
+
+    History before the load is unknown, so this records the creation, the
+    current assignee and a single status change to the current status at
+    updated_at, plus one event per comment, in chronological order.
+    """
+    from comments.models import Comment
+    from .models import Ticket, TicketEvent
+
+    qn = connection.ops.quote_name
+    events = qn(TicketEvent._meta.db_table)
+    tickets = qn(Ticket._meta.db_table)
+    comments = qn(Comment._meta.db_table)
+    codes = TicketEvent.STATUS_CODES
+    pending = f'NOT EXISTS (SELECT 1 FROM {events} e WHERE e.ticket_id = t.id)'
+
+    sql = f"""
+        INSERT INTO {events} (ticket_id, event, actor_id, value, previous, created_at)
+        SELECT ticket_id, event, actor_id, value, previous, created_at FROM (
+            SELECT t.id AS ticket_id, {TicketEvent.CREATED} AS event,
+                   t.created_by_id AS actor_id, {codes['OPEN']} AS value,
+                   CAST(NULL AS BIGINT) AS previous, t.created_at AS created_at
+            FROM {tickets} t WHERE {pending}
+            UNION ALL
+            SELECT t.id, {TicketEvent.ASSIGNED}, NULL, t.assigned_to_id, NULL, t.created_at
+            FROM {tickets} t WHERE t.assigned_to_id IS NOT NULL AND {pending}
+            UNION ALL
+            SELECT t.id, {TicketEvent.STATUS_CHANGED}, NULL,
+                   CASE t.status WHEN 'IN_PROGRESS' THEN {codes['IN_PROGRESS']} ELSE {codes['RESOLVED']} END,
+                   {codes['OPEN']}, t.updated_at
+            FROM {tickets} t WHERE t.status <> 'OPEN' AND {pending}
+            UNION ALL
+            SELECT c.ticket_id, {TicketEvent.COMMENTED}, c.author_id, c.id, NULL, c.created_at
+            FROM {comments} c JOIN {tickets} t ON t.id = c.ticket_id WHERE {pending}
+        ) backfill
+        ORDER BY created_at, event
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        return cursor.rowcount
+
+
+def finish_bulk_load():
+    """
+    Rebuild everything that normal saves keep up to date but bulk inserts
+    bypass. Call once at the end of a load, inside its transaction.
+    """
+    from bookissue.cache import bump_on_commit
+    from comments.models import Comment
+    from .models import Ticket
+    from .workload import refresh_workload
+
+    reset_sequences(Ticket, Comment)
+    backfill_ticket_events()
+    refresh_workload(concurrently=False)
+    bump_on_commit('tickets', 'comments')
@@ -0,0 +1,335 @@
+"""
+Generate a synthetic helpdesk dataset for benchmarking.
+
+Usage:
+    python manage.py generate_dataset                 # ~140k rows
+    python manage.py generate_dataset --scale 8       # ~1.1M rows
+    python manage.py generate_dataset --scale 0.1 --seed 7 --until 2025-06-30
+
+Every scale unit adds 1,000 users (students and staff), 5,000 tickets and
+their comments, plus the notifications the signals would have sent for
+them: new tickets to the ICT team and super admins, assignments, status
+changes and ICT replies. The ICT team (15) and the super admins (5) stop
+growing at scale 1, so every ticket sends at most 20 new ticket
+notifications and the row count grows linearly, most of it
+notifications. A few users open most tickets and a few ICT members get
+most assignments; older tickets are more likely resolved and their
+notifications read.
+
+The same --seed, --scale and --until always produce the same rows.
+Rows are bulk loaded like import_tickets (COPY on PostgreSQL, chunked
+bulk_create elsewhere) with notifications suppressed, then the activity
+log, workload and analytics rollups are rebuilt. Generated users have
+@dataset.example emails and share one password (default password123);
+existing rows are never touched.
+"""
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from bookissue.cache import bump_on_commit
+from comments.models import Comment
+from notifications.models import Notification
+from notifications.signals import suppress_notifications
+from tickets.analytics import update_rollups
+from tickets.bulk import finish_bulk_load, load_rows, preserve_timestamps, reset_sequences
+from tickets.models import Ticket
+from users.models import User
+
+EMAIL_DOMAIN = 'dataset.example'
+
+USERS_PER_SCALE = 1000
+TICKETS_PER_USER = 5
+# Share of the users in each role; every role gets at least one user
+ROLE_SHARES = (('student', 0.88), ('staff', 0.10), ('ict', 0.015), ('super_admin', 0.005))
+# The ICT team and the super admins stop growing at their scale 1 size (every
+# new ticket notifies all of them); students make up the difference
+TEAM_SIZES = {'ict': 15, 'super_admin': 5}
+
+MEAN_TICKET_AGE_DAYS = 90
+MAX_TICKET_AGE_DAYS = 720
+# Half of the tickets are resolved within this many days of being opened
+RESOLUTION_HALF_LIFE_DAYS = 7
+MEAN_COMMENTS = {'OPEN': 1, 'IN_PROGRESS': 3, 'RESOLVED': 4}
+MAX_COMMENTS = 40
+# Notifications older than this are mostly read
+READ_AFTER_DAYS = 14
+
+USER_COLUMNS = (
+    'id', 'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email',
+    'is_staff', 'is_active', 'date_joined', 'role', 'phone_number', 'student_id',
+    'department', 'profile_picture', 'created_at', 'updated_at'
+)
+TICKET_COLUMNS = (
+    'id', 'title', 'description', 'status', 'created_by_id',
+    'assigned_to_id', 'created_at', 'updated_at'
+)
+COMMENT_COLUMNS = ('id', 'ticket_id', 'author_id', 'message', 'created_at', 'updated_at')
+NOTIFICATION_COLUMNS = (
+    'user_id', 'title', 'message', 'notification_type', 'is_read',
+    'created_at', 'ticket_id', 'comment_id'
+)
+
+FIRST_NAMES = (
+    'Alice', 'Bob', 'Carol', 'Daniel', 'Esther', 'Felix', 'Grace', 'Hassan', 'Irene', 'James',
+    'Khadija', 'Liam', 'Maria', 'Neema', 'Omar', 'Priya', 'Quentin', 'Rehema', 'Samuel', 'Tariq',
+    'Uma', 'Victor', 'Wanjiru', 'Xavier', 'Yusuf', 'Zawadi',
+)
+LAST_NAMES = (
+    'Johnson', 'Smith', 'Williams', 'Brown', 'Davis', 'Wilson', 'Miller', 'Garcia', 'Mwangi',
+    'Okafor', 'Mensah', 'Patel', 'Khan', 'Nguyen', 'Kimaro', 'Hassan', 'Lopez', 'Taylor',
+    'Moshi', 'Banda', 'Ali', 'Chen', 'Ochieng', 'Silva',
+)
+DEPARTMENTS = {
+    'student': ('Computer Science', 'Information Technology', 'Software Engineering',
+                'Mathematics', 'Business Administration', 'Education', 'Law'),
+    'staff': ('Library Services', 'Academic Support', 'Student Services', 'Registry'),
+    'ict': ('IT Department', 'IT Support'),
+    'super_admin': ('Administration',),
+}
+BOOKS = (
+    'Introduction to Algorithms', 'Clean Code', 'Database System Concepts', 'Operating Systems',
+    'Calculus: Early Transcendentals', 'Principles of Economics', 'Computer Networks',
+    'Linear Algebra Done Right', 'The Pragmatic Programmer', 'Organic Chemistry',
+    'Constitutional Law', 'Research Methods in Education', 'Discrete Mathematics',
+)
+ISSUES = (
+    ('Missing pages in {book}', "Pages {page}-{end} are missing from the copy of {book} I borrowed."),
+    ('Damaged copy of {book}', "The copy of {book} has a torn spine and water damage from page {page}."),
+    ('Cannot open e-book {book}', "The library portal shows an error when I open the e-book version of {book}."),
+    ('Wrong edition of {book} issued', "I was issued an older edition of {book}; my course needs the latest one."),
+    ('Overdue fine for {book}', "I returned {book} on time but the system still charges an overdue fine."),
+    ('Barcode not scanning on {book}', "The self-checkout kiosk can't read the barcode on {book}."),
+    ('Reservation for {book} not working', "My reservation for {book} disappeared from my account."),
+)
+REPLIES = (
+    "Thanks for reporting this, we're looking into it.",
+    "Could you share the accession number printed inside the cover?",
+    "A replacement copy has been requested from the store.",
+    "The fine has been waived, please check your account again.",
+    "Please try again after clearing your browser cache.",
+    "We have fixed the record, it should work now.",
+)
+FOLLOW_UPS = (
+    "Any update on this?",
+    "The accession number is {page}.",
+    "It works now, thank you!",
+    "I still see the same problem.",
+    "I need this for an exam next week, please help.",
+)
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset of users, tickets, comments and notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=float, default=1,
+            help='Size of the dataset; 1 is 1,000 users and 5,000 tickets (default: 1)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument(
+            '--until', help='Date the dataset ends at, YYYY-MM-DD (default: today); '
+                            'pass it for the same timestamps on every run'
+        )
+        parser.add_argument('--password', default='password123', help='Password of every generated user')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per insert (default: 5000)')
+
+    def handle(self, *args, **options):
+        if options['scale'] <= 0:
+            raise CommandError('--scale must be positive.')
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive.')
+        until = timezone.now().date()
+        if options['until']:
+            until = parse_date(options['until'])
+            if until is None:
+                raise CommandError('--until must be a date (YYYY-MM-DD).')
+        if User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').exists():
+            raise CommandError(
+                f'A generated dataset (@{EMAIL_DOMAIN} users) is already loaded; start from an empty database.'
+            )
+
+        self.rng = random.Random(options['seed'])
+        self.end = datetime.combine(until, dt_time.min, tzinfo=dt_timezone.utc)
+        self.batch_size = options['batch_size']
+        # Hashing is deliberately slow: hash once for every user
+        self.password = make_password(options['password'])
+        self.counts = dict.fromkeys(('users', 'tickets', 'comments', 'notifications'), 0)
+
+        started = time.monotonic()
+        with transaction.atomic(), suppress_notifications(), \
+                preserve_timestamps(User, Ticket, Comment, Notification):
+            self.counts['users'] = load_rows(
+                User, USER_COLUMNS, self.user_rows(options['scale']), batch_size=self.batch_size
+            )
+            self.load_tickets(round(options['scale'] * USERS_PER_SCALE * TICKETS_PER_USER))
+            reset_sequences(User)
+            finish_bulk_load()
+            update_rollups(full=True)
+            bump_on_commit('users', 'notifications')
+
+        elapsed = time.monotonic() - started
+        counts = self.counts
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {counts['users']} users, {counts['tickets']} tickets, {counts['comments']} comments "
+            f"and {counts['notifications']} notifications in {elapsed:.1f}s (seed {options['seed']})"
+        ))
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+    def user_rows(self, scale):
+        rng = self.rng
+        total = max(round(scale * USERS_PER_SCALE), len(ROLE_SHARES))
+        user_id = self.next_id(User)
+        self.user_ids = {role: [] for role, _ in ROLE_SHARES}
+        self.user_joined = {}
+        self.user_names = {}
+
+        sizes = {
+            role: max(min(round(total * share), TEAM_SIZES.get(role, total)), 1)
+            for role, share in ROLE_SHARES
+        }
+        sizes['student'] += total - sum(sizes.values())
+        for role, _ in ROLE_SHARES:
+            for number in range(1, sizes[role] + 1):
+                first_name = rng.choice(FIRST_NAMES)
+                last_name = rng.choice(LAST_NAMES)
+                username = f'ds_{role}_{number}'
+                # Staff accounts tend to be older than student ones
+                days = rng.uniform(30, 730) if role == 'student' else rng.uniform(365, 1500)
+                joined = self.end - timedelta(days=days)
+
+                self.user_ids[role].append(user_id)
+                self.user_joined[user_id] = joined
+                self.user_names[user_id] = f'{first_name} {last_name}'
+                yield (
+                    user_id, self.password, False, username, first_name, last_name,
+                    f'{username}@{EMAIL_DOMAIN}', role != 'student', True, joined, role,
+                    f'+2557{rng.randrange(10 ** 8):08d}',
+                    f'DS{number:08d}' if role == 'student' else None,
+                    rng.choice(DEPARTMENTS[role]), '', joined, joined,
+                )
+                user_id += 1
+
+    def skewed(self, population, k):
+        """k picks from population, a few members getting most of them"""
+        weights = [self.rng.paretovariate(1.2) for _ in population]
+        return self.rng.choices(population, weights=weights, k=k)
+
+    def load_tickets(self, total):
+        rng = self.rng
+        ict_ids = self.user_ids['ict']
+        # New tickets notify the ICT team, then the super admins
+        fan_out = ict_ids + self.user_ids['super_admin']
+        creators = self.skewed(self.user_ids['student'] + self.user_ids['staff'], total)
+        assignees = self.skewed(ict_ids, total)
+
+        self.pending = {Ticket: [], Comment: [], Notification: []}
+        ticket_id = self.next_id(Ticket)
+        self.comment_id = self.next_id(Comment)
+
+        for creator_id, assignee_id in zip(creators, assignees):
+            age = min(rng.expovariate(1 / MEAN_TICKET_AGE_DAYS), MAX_TICKET_AGE_DAYS)
+            created_at = max(self.end - timedelta(days=age), self.user_joined[creator_id] + timedelta(hours=1))
+            age = (self.end - created_at).total_seconds() / 86400
+
+            if rng.random() < 1 - 0.5 ** (age / RESOLUTION_HALF_LIFE_DAYS):
+                status = 'RESOLVED'
+            else:
+                status = 'IN_PROGRESS' if rng.random() < 0.4 else 'OPEN'
+            if status == 'OPEN' and rng.random() >= 0.3:
+                assignee_id = None
+            # Status changes happen within days, never after the dataset ends
+            worked = 0 if status == 'OPEN' else min(rng.expovariate(1 / 3), age)
+            updated_at = created_at + timedelta(days=worked)
+
+            book = rng.choice(BOOKS)
+            page = rng.randrange(10, 400)
+            title, description = rng.choice(ISSUES)
+            title = title.format(book=book)
+            self.pending[Ticket].append((
+                ticket_id, title[:200], description.format(book=book, page=page, end=page + rng.randrange(2, 30)),
+                status, creator_id, assignee_id, created_at, updated_at,
+            ))
+            self.counts['tickets'] += 1
+
+            creator_name = self.user_names[creator_id]
+            self.notify(
+                fan_out, created_at, f"New Ticket #{ticket_id}",
+                f"New ticket '{title}' has been submitted by {creator_name}.", 'new_ticket', ticket_id
+            )
+            if assignee_id is not None:
+                self.notify(
+                    [assignee_id], created_at, f"Ticket #{ticket_id} Assigned to You",
+                    f"You have been assigned to ticket '{title}' created by {creator_name}.",
+                    'assignment', ticket_id
+                )
+            if status == 'IN_PROGRESS':
+                self.notify(
+                    [creator_id], updated_at, f"Ticket #{ticket_id} In Progress",
+                    f"Your ticket '{title}' is now being worked on.", 'ticket_status', ticket_id
+                )
+            elif status == 'RESOLVED':
+                self.notify(
+                    [creator_id], updated_at, f"Ticket #{ticket_id} Resolved",
+                    f"Your ticket '{title}' has been resolved.", 'ticket_status', ticket_id
+                )
+
+            self.add_comments(ticket_id, title, status, creator_id, assignee_id or rng.choice(ict_ids),
+                              created_at, updated_at if status == 'RESOLVED' else self.end, page)
+            ticket_id += 1
+            self.flush()
+        self.flush(force=True)
+
+    def add_comments(self, ticket_id, title, status, creator_id, ict_id, start, end, page):
+        rng = self.rng
+        count = min(int(rng.expovariate(1 / MEAN_COMMENTS[status])), MAX_COMMENTS)
+        span = (end - start).total_seconds()
+        for offset in sorted(rng.uniform(0, span) for _ in range(count)):
+            created_at = start + timedelta(seconds=offset)
+            comment_id = self.comment_id
+            self.comment_id += 1
+            if rng.random() < 0.55:
+                self.pending[Comment].append(
+                    (comment_id, ticket_id, ict_id, rng.choice(REPLIES), created_at, created_at)
+                )
+                self.notify(
+                    [creator_id], created_at, f"ICT Replied to Ticket #{ticket_id}",
+                    f"ICT has replied to your ticket '{title}'.", 'new_comment', ticket_id, comment_id
+                )
+            else:
+                # The creator's own comments notify nobody
+                self.pending[Comment].append(
+                    (comment_id, ticket_id, creator_id, rng.choice(FOLLOW_UPS).format(page=page), created_at, created_at)
+                )
+            self.counts['comments'] += 1
+
+    def notify(self, user_ids, created_at, title, message, notification_type, ticket_id, comment_id=None):
+        age = (self.end - created_at).total_seconds() / 86400
+        read_rate = 0.9 if age > READ_AFTER_DAYS else 0.3
+        rows = self.pending[Notification]
+        for user_id in user_ids:
+            rows.append((
+                user_id, title, message, notification_type, self.rng.random() < read_rate,
+                created_at, ticket_id, comment_id,
+            ))
+        self.counts['notifications'] += len(user_ids)
+
+    def flush(self, force=False):
+        """Load the buffered rows once any buffer holds a batch, tickets first"""
+        if not force and all(len(rows) < self.batch_size for rows in self.pending.values()):
+            return
+        columns = {Ticket: TICKET_COLUMNS, Comment: COMMENT_COLUMNS, Notification: NOTIFICATION_COLUMNS}
+        for model, rows in self.pending.items():
+            if rows:
+                load_rows(model, columns[model], rows, batch_size=self.batch_size)
+                rows.clear()
@@ -0,0 +1,266 @@
+"""
+Import tickets and comments exported from the legacy tracker.
+
+Usage:
+    python manage.py import_tickets --tickets tickets.csv --comments comments.ndjson
+
+Ticket records: id, title, description, status, created_by (email),
+assigned_to (email, optional), created_at, updated_at.
+Comment records: id (optional), ticket_id, author (email), message, created_at.
+
+Legacy ticket ids are kept so comments can reference them; sequences are
+reset afterwards. Records whose id is already taken are skipped (and
+reported) rather than failing the load, and so are the comments of every
+skipped ticket. Files may be CSV (with a header row) or NDJSON.
+"""
+import csv
+import json
+import os
+import time
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from comments.models import Comment
+from notifications.signals import suppress_notifications
+from tickets.bulk import chunked, finish_bulk_load, load_rows, preserve_timestamps
+from tickets.models import Ticket
+from users.models import User
+
+TICKET_COLUMNS = (
+    'id', 'title', 'description', 'status', 'created_by_id',
+    'assigned_to_id', 'created_at', 'updated_at'
+)
+COMMENT_COLUMNS = ('ticket_id', 'author_id', 'message', 'created_at', 'updated_at')
+
+
+def read_records(path, fmt='auto'):
+    """Yield one dict per record from a CSV or NDJSON file"""
+    if fmt == 'auto':
+        fmt = 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = 'Bulk import legacy tickets and comments (COPY on PostgreSQL, bulk_create elsewhere)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', help='CSV/NDJSON file with ticket records')
+        parser.add_argument('--comments', help='CSV/NDJSON file with comment records')
+        parser.add_argument(
+            '--format', choices=['auto', 'csv', 'ndjson'], default='auto',
+            help='Input format (default: guessed from the file extension)'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not options['tickets'] and not options['comments']:
+            raise CommandError('Nothing to import: pass --tickets and/or --comments.')
+        for key in ('tickets', 'comments'):
+            if options[key] and not os.path.exists(options[key]):
+                raise CommandError(f"File not found: {options[key]}")
+
+        self.now = timezone.now()
+        self.skipped = {}
+        # Resolve every user once instead of once per row
+        self.user_ids = {
+            email.lower(): pk for email, pk in User.objects.values_list('email', 'id')
+        }
+        # Ticket ids comments may reference, ids skipped for colliding with
+        # existing tickets, and ids found in neither
+        self.ticket_ids = set()
+        self.rejected_ticket_ids = set()
+        self.missing_ticket_ids = set()
+
+        started = time.monotonic()
+        with transaction.atomic(), suppress_notifications(), preserve_timestamps(Ticket, Comment):
+            ticket_count = comment_count = 0
+            if options['tickets']:
+                records = read_records(options['tickets'], options['format'])
+                ticket_count = self.load_tickets(records, options['batch_size'])
+            if options['comments']:
+                records = read_records(options['comments'], options['format'])
+                comment_count = self.load_comments(records, options['batch_size'])
+            finish_bulk_load()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {ticket_count} tickets and {comment_count} comments in {elapsed:.1f}s"
+        ))
+        for reason, count in sorted(self.skipped.items()):
+            self.stdout.write(self.style.WARNING(f"Skipped {count} rows: {reason}"))
+
+    def skip(self, reason, count=1):
+        if count:
+            self.skipped[reason] = self.skipped.get(reason, 0) + count
+
+    def reject(self, ticket_id, reason):
+        """Skip a ticket row; its comments are skipped too, even if a ticket with its id exists"""
+        self.skip(reason)
+        self.rejected_ticket_ids.add(ticket_id)
+
+    def resolve_user(self, email):
+        if not email:
+            return None
+        return self.user_ids.get(email.strip().lower())
+
+    def parse_timestamp(self, value):
+        if not value:
+            return self.now
+        parsed = parse_datetime(value)
+        if parsed is None:
+            return None
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, dt_timezone.utc)
+        return parsed
+
+    def load_tickets(self, records, batch_size):
+        total = 0
+        for chunk in chunked(self.ticket_rows(records), batch_size):
+            # One query per chunk for legacy ids already taken by other tickets
+            taken = set(Ticket.objects.filter(pk__in=[row[0] for row in chunk]).values_list('pk', flat=True))
+            rows = []
+            for row in chunk:
+                if row[0] in taken:
+                    self.reject(row[0], 'ticket id already exists')
+                else:
+                    rows.append(row)
+                    self.ticket_ids.add(row[0])
+            total += load_rows(Ticket, TICKET_COLUMNS, rows, batch_size=batch_size)
+        return total
+
+    def ticket_rows(self, records):
+        statuses = {choice for choice, _ in Ticket.STATUS_CHOICES}
+        seen = set()
+        for record in records:
+            try:
+                ticket_id = int(record['id'])
+            except (KeyError, TypeError, ValueError):
+                self.skip('ticket without a numeric id')
+                continue
+
+            if ticket_id in seen:
+                self.reject(ticket_id, 'duplicate ticket id')
+                continue
+
+            created_by_id = self.resolve_user(record.get('created_by'))
+            if created_by_id is None:
+                self.reject(ticket_id, 'ticket creator email not found')
+                continue
+
+            status = (record.get('status') or 'OPEN').upper()
+            if status not in statuses:
+                self.reject(ticket_id, 'unknown ticket status')
+                continue
+
+            assigned_to_id = self.resolve_user(record.get('assigned_to'))
+            if record.get('assigned_to') and assigned_to_id is None:
+                self.skip('assignee email not found (imported unassigned)')
+
+            created_at = self.parse_timestamp(record.get('created_at'))
+            updated_at = self.parse_timestamp(record.get('updated_at') or record.get('created_at'))
+            if created_at is None or updated_at is None:
+                self.reject(ticket_id, 'invalid ticket timestamp')
+                continue
+
+            seen.add(ticket_id)
+            yield (
+                ticket_id,
+                (record.get('title') or '').strip()[:200],
+                record.get('description') or '',
+                status,
+                created_by_id,
+                assigned_to_id,
+                created_at,
+                updated_at,
+            )
+
+    def load_comments(self, records, batch_size):
+        records = iter(records)
+        first = next(records, None)
+        if first is None:
+            return 0
+
+        # Keep legacy comment ids only when the export has them
+        columns = COMMENT_COLUMNS
+        if first.get('id') not in (None, ''):
+            columns = ('id',) + COMMENT_COLUMNS
+
+        total = 0
+        seen = set()
+        for chunk in chunked(_prepend(first, records), batch_size):
+            self.find_tickets(chunk)
+            rows = list(self.comment_rows(columns, chunk, seen))
+            if columns[0] == 'id':
+                # One query per chunk for legacy ids already taken by other comments
+                taken = set(Comment.objects.filter(pk__in=[row[0] for row in rows]).values_list('pk', flat=True))
+                kept = [row for row in rows if row[0] not in taken]
+                self.skip('comment id already exists', len(rows) - len(kept))
+                rows = kept
+            total += load_rows(Comment, columns, rows, batch_size=batch_size)
+        return total
+
+    def find_tickets(self, records):
+        """Look up, in one query, the tickets a chunk of comments references that aren't known yet"""
+        referenced = set()
+        for record in records:
+            try:
+                referenced.add(int(record['ticket_id']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        unknown = referenced - self.ticket_ids - self.rejected_ticket_ids - self.missing_ticket_ids
+        if unknown:
+            found = set(Ticket.objects.filter(pk__in=unknown).values_list('pk', flat=True))
+            self.ticket_ids |= found
+            self.missing_ticket_ids |= unknown - found
+
+    def comment_rows(self, columns, records, seen):
+        with_ids = columns[0] == 'id'
+        for record in records:
+            try:
+                ticket_id = int(record['ticket_id'])
+                comment_id = int(record['id']) if with_ids else None
+            except (KeyError, TypeError, ValueError):
+                self.skip('comment without numeric ticket_id/id')
+                continue
+
+            if ticket_id in self.rejected_ticket_ids:
+                self.skip('comment references a ticket that was not imported')
+                continue
+            if ticket_id not in self.ticket_ids:
+                self.skip('comment references unknown ticket')
+                continue
+            if with_ids:
+                if comment_id in seen:
+                    self.skip('duplicate comment id')
+                    continue
+                seen.add(comment_id)
+
+            author_id = self.resolve_user(record.get('author'))
+            if author_id is None:
+                self.skip('comment author email not found')
+                continue
+
+            created_at = self.parse_timestamp(record.get('created_at'))
+            if created_at is None:
+                self.skip('invalid comment timestamp')
+                continue
+
+            row = (ticket_id, author_id, record.get('message') or '', created_at, created_at)
+            yield (comment_id,) + row if with_ids else row
+
+
+def _prepend(first, iterator):
+    yield first
+    yield from iterator
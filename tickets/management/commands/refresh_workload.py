@@ -0,0 +1,29 @@
+"""
+Refresh the per-assignee workload summary.
+
+Usage (e.g. from cron every minute on PostgreSQL):
+    python manage.py refresh_workload
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from tickets.workload import refresh_workload, uses_materialized_view
+
+
+class Command(BaseCommand):
+    help = 'Refresh the ticket_workload materialized view (or rebuild the table on other databases)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--blocking', action='store_true',
+            help='Plain REFRESH instead of CONCURRENTLY (faster, but blocks readers)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        refresh_workload(concurrently=not options['blocking'])
+        kind = 'materialized view' if uses_materialized_view() else 'table'
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed workload {kind} in {time.monotonic() - started:.2f}s"
+        ))
@@ -0,0 +1,30 @@
+"""
+Refresh the daily ticket analytics rollups.
+
+Usage:
+    python manage.py rollup_ticket_stats          # incremental, e.g. every few minutes
+    python manage.py rollup_ticket_stats --full   # nightly rebuild of all days
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from tickets.analytics import update_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute TicketDailyStats rows from tickets and the ticket activity log'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Recompute every day instead of only the days touched since the last run'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        days, rows = update_rollups(full=options['full'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {days} days ({rows} rollup rows) in {elapsed:.2f}s"
+        ))
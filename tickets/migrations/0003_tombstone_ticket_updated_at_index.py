@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0002_ticket_screenshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('ticket', 'Ticket'), ('comment', 'Comment')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('ticket_id', models.BigIntegerField(help_text='Deleted ticket, or the ticket of a deleted comment')),
+                ('owner_id', models.BigIntegerField(blank=True, help_text='Creator of a deleted ticket, used to scope the changes feed', null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Tombstone',
+                'verbose_name_plural': 'Tombstones',
+                'db_table': 'tombstones',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['updated_at', 'id'], name='tickets_updated_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0003_tombstone_ticket_updated_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.PositiveSmallIntegerField(choices=[(1, 'Created'), (2, 'Status Changed'), (3, 'Assigned'), (4, 'Commented')])),
+                ('value', models.BigIntegerField(blank=True, help_text='New status code, assignee id or comment id, depending on the event', null=True)),
+                ('previous', models.BigIntegerField(blank=True, help_text='Previous status code or assignee id', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('ticket', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='tickets.ticket')),
+            ],
+            options={
+                'verbose_name': 'Ticket Event',
+                'verbose_name_plural': 'Ticket Events',
+                'db_table': 'ticket_events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['ticket', 'id'], name='ticket_events_timeline_idx')],
+            },
+        ),
+    ]
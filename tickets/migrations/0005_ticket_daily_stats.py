@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_ticketevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'rollup_state',
+            },
+        ),
+        migrations.CreateModel(
+            name='TicketDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('resolved_count', models.PositiveIntegerField(default=0)),
+                ('resolve_p50', models.FloatField(blank=True, null=True)),
+                ('resolve_p90', models.FloatField(blank=True, null=True)),
+                ('response_count', models.PositiveIntegerField(default=0)),
+                ('response_p50', models.FloatField(blank=True, null=True)),
+                ('response_p90', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Ticket Daily Stats',
+                'verbose_name_plural': 'Ticket Daily Stats',
+                'db_table': 'ticket_daily_stats',
+                'ordering': ['day'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['created_at'], name='tickets_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticketevent',
+            index=models.Index(fields=['event', 'created_at'], name='ticket_events_event_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='ticketdailystats',
+            name='assignee',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_ticket_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='ticketdailystats',
+            index=models.Index(fields=['day', 'assignee'], name='ticket_daily_stats_day_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+WORKLOAD_VIEW_SQL = """
+    CREATE MATERIALIZED VIEW ticket_workload AS
+    SELECT assigned_to_id AS assignee_id,
+           COUNT(*) FILTER (WHERE status = 'OPEN') AS open_count,
+           COUNT(*) FILTER (WHERE status = 'IN_PROGRESS') AS in_progress_count,
+           COUNT(*) FILTER (WHERE status = 'RESOLVED') AS resolved_count,
+           MIN(created_at) FILTER (WHERE status <> 'RESOLVED') AS oldest_open_at
+    FROM tickets
+    WHERE assigned_to_id IS NOT NULL
+    GROUP BY assigned_to_id
+"""
+
+
+def create_workload(apps, schema_editor):
+    """Materialized view on PostgreSQL, a plain table filled from tickets elsewhere"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(WORKLOAD_VIEW_SQL)
+        # Unique index required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+        schema_editor.execute('CREATE UNIQUE INDEX ticket_workload_assignee_idx ON ticket_workload (assignee_id)')
+        return
+
+    AssigneeWorkload = apps.get_model('tickets', 'AssigneeWorkload')
+    schema_editor.create_model(AssigneeWorkload)
+    schema_editor.execute("""
+        INSERT INTO ticket_workload (assignee_id, open_count, in_progress_count, resolved_count, oldest_open_at)
+        SELECT assigned_to_id,
+               SUM(CASE WHEN status = 'OPEN' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'IN_PROGRESS' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'RESOLVED' THEN 1 ELSE 0 END),
+               MIN(CASE WHEN status <> 'RESOLVED' THEN created_at END)
+        FROM tickets
+        WHERE assigned_to_id IS NOT NULL
+        GROUP BY assigned_to_id
+    """)
+
+
+def drop_workload(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP MATERIALIZED VIEW IF EXISTS ticket_workload')
+    else:
+        schema_editor.delete_model(apps.get_model('tickets', 'AssigneeWorkload'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_ticket_daily_stats'),
+        ('users', '0003_user_profile_picture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssigneeWorkload',
+            fields=[
+                ('assignee', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('open_count', models.PositiveIntegerField(default=0)),
+                ('in_progress_count', models.PositiveIntegerField(default=0)),
+                ('resolved_count', models.PositiveIntegerField(default=0)),
+                ('oldest_open_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Assignee Workload',
+                'verbose_name_plural': 'Assignee Workloads',
+                'db_table': 'ticket_workload',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_workload, drop_workload),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_assignee_workload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tombstone',
+            name='recipient_id',
+            field=models.BigIntegerField(blank=True, help_text="Set when the ticket still exists but left this user's scope: only their feed gets it", null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def drop_duplicate_rows(apps, schema_editor):
+    """Keep the newest rollup row of each (day, assignee) written by racing runs"""
+    TicketDailyStats = apps.get_model('tickets', 'TicketDailyStats')
+    keep = (
+        TicketDailyStats.objects.order_by()
+        .values('day', 'assignee_id')
+        .annotate(keep_id=Max('id'))
+        .values('keep_id')
+    )
+    TicketDailyStats.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_tombstone_recipient'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_rows, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='ticketdailystats',
+            name='ticket_daily_stats_day_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='ticketdailystats',
+            constraint=models.UniqueConstraint(fields=('day', 'assignee'), name='ticket_daily_stats_day_assignee_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='ticketdailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('assignee__isnull', True)), fields=('day',), name='ticket_daily_stats_team_day_uniq'),
+        ),
+    ]
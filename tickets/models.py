@@ -47,6 +47,11 @@ class Ticket(models.Model):
         verbose_name = 'Ticket'
         verbose_name_plural = 'Tickets'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset order of the changes feed
+            models.Index(fields=['updated_at', 'id'], name='tickets_updated_at_id_idx'),
+            models.Index(fields=['created_at'], name='tickets_created_at_idx'),
+        ]
 
     def __str__(self):
         return f"#{self.id} - {self.title} ({self.status})"
@@ -78,3 +83,206 @@ class Ticket(models.Model):
     def can_be_assigned_by(self, user):
         """Check if user can assign this ticket"""
         return user.can_assign_tickets()
+
+
+class Tombstone(models.Model):
+    """
+    Marker left behind when a ticket or comment is deleted, or a ticket
+    leaves a user's scope, so sync clients can drop their local copy
+    """
+    OBJECT_TYPES = [
+        ('ticket', 'Ticket'),
+        ('comment', 'Comment'),
+    ]
+
+    object_type = models.CharField(max_length=10, choices=OBJECT_TYPES)
+    object_id = models.BigIntegerField()
+    ticket_id = models.BigIntegerField(help_text='Deleted ticket, or the ticket of a deleted comment')
+    owner_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text='Creator of a deleted ticket, used to scope the changes feed'
+    )
+    recipient_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text='Set when the ticket still exists but left this user\'s scope: only their feed gets it'
+    )
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'tombstones'
+        verbose_name = 'Tombstone'
+        verbose_name_plural = 'Tombstones'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"Deleted {self.object_type} #{self.object_id}"
+
+
+class TicketEvent(models.Model):
+    """
+    Append-only activity log of a ticket.
+
+    Rows are kept small: the event kind and statuses are small integers and
+    `value`/`previous` hold ids or status codes instead of copied text, so
+    a ticket's whole timeline is one range scan on (ticket_id, id).
+    """
+    CREATED = 1
+    STATUS_CHANGED = 2
+    ASSIGNED = 3
+    COMMENTED = 4
+
+    EVENT_TYPES = [
+        (CREATED, 'Created'),
+        (STATUS_CHANGED, 'Status Changed'),
+        (ASSIGNED, 'Assigned'),
+        (COMMENTED, 'Commented'),
+    ]
+
+    # Ticket.status values stored as small integers
+    STATUS_CODES = {
+        'OPEN': 1,
+        'IN_PROGRESS': 2,
+        'RESOLVED': 3,
+    }
+
+    ticket = models.ForeignKey(
+        Ticket,
+        on_delete=models.CASCADE,
+        related_name='events',
+        db_index=False  # covered by the (ticket, id) index
+    )
+    event = models.PositiveSmallIntegerField(choices=EVENT_TYPES)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+    value = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text='New status code, assignee id or comment id, depending on the event'
+    )
+    previous = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text='Previous status code or assignee id'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'ticket_events'
+        verbose_name = 'Ticket Event'
+        verbose_name_plural = 'Ticket Events'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['ticket', 'id'], name='ticket_events_timeline_idx'),
+            # Day-range scans of the analytics rollup
+            models.Index(fields=['event', 'created_at'], name='ticket_events_event_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.ticket_id} {self.get_event_display()}"
+
+    @classmethod
+    def status_code(cls, status):
+        return cls.STATUS_CODES.get(status)
+
+    @classmethod
+    def status_name(cls, code):
+        for status, status_code in cls.STATUS_CODES.items():
+            if status_code == code:
+                return status
+        return None
+
+
+class TicketDailyStats(models.Model):
+    """
+    Daily rollup of ticket analytics, written by the rollup_ticket_stats
+    command. Rows with no assignee hold the whole team's figures.
+
+    Durations are in seconds: resolution is measured from ticket creation
+    to the resolving status change, first response from creation to the
+    first ICT comment (attributed to the day the ticket was created).
+    New tickets count for their first assignee, resolutions and first
+    responses for whoever was assigned when they happened.
+    """
+    day = models.DateField()
+    assignee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='daily_ticket_stats',
+        null=True,
+        blank=True
+    )
+    created_count = models.PositiveIntegerField(default=0)
+    resolved_count = models.PositiveIntegerField(default=0)
+    resolve_p50 = models.FloatField(null=True, blank=True)
+    resolve_p90 = models.FloatField(null=True, blank=True)
+    response_count = models.PositiveIntegerField(default=0)
+    response_p50 = models.FloatField(null=True, blank=True)
+    response_p90 = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'ticket_daily_stats'
+        verbose_name = 'Ticket Daily Stats'
+        verbose_name_plural = 'Ticket Daily Stats'
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'assignee'], name='ticket_daily_stats_day_assignee_uniq'),
+            # NULLs never collide in the constraint above
+            models.UniqueConstraint(
+                fields=['day'], condition=models.Q(assignee__isnull=True), name='ticket_daily_stats_team_day_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} ({self.assignee_id or 'team'})"
+
+
+class RollupState(models.Model):
+    """
+    Progress marker of incremental rollups: the last TicketEvent id folded in
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rollup_state'
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_event_id}"
+
+
+class AssigneeWorkload(models.Model):
+    """
+    Ticket counts by status plus the oldest unresolved ticket, per assignee.
+
+    On PostgreSQL this is a materialized view refreshed concurrently by the
+    refresh_workload command; on other databases it is a plain table that
+    tickets.signals keeps current for the affected assignees.
+    """
+    assignee = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_constraint=False,
+        related_name='+'
+    )
+    open_count = models.PositiveIntegerField(default=0)
+    in_progress_count = models.PositiveIntegerField(default=0)
+    resolved_count = models.PositiveIntegerField(default=0)
+    oldest_open_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        managed = False
+        db_table = 'ticket_workload'
+        verbose_name = 'Assignee Workload'
+        verbose_name_plural = 'Assignee Workloads'
+
+    def __str__(self):
+        return f"Workload of user #{self.assignee_id}"
@@ -12,7 +12,7 @@ class IsOwnerOrCanManageTickets(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # Owner can always access their tickets
-        if obj.created_by == request.user:
+        if obj.created_by_id == request.user.id:
             return True
         
         # Staff and ICT can manage any ticket
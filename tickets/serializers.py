@@ -1,9 +1,26 @@
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Ticket
+from .models import AssigneeWorkload, Ticket, TicketDailyStats, TicketEvent, Tombstone
+from bookissue.fieldsets import SparseFieldsMixin
 from users.serializers import UserListSerializer
+from comments.serializers import CommentCompactSerializer, CommentPreviewSerializer
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class LatestCommentsMixin:
+    """
+    Adds `latest_comments` when the view prefetched them
+    (?include=latest_comments:N)
+    """
+    latest_comments_serializer = CommentPreviewSerializer
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if hasattr(instance, 'latest_comments'):
+            data['latest_comments'] = self.latest_comments_serializer(instance.latest_comments, many=True).data
+        return data
+
+
+class TicketSerializer(SparseFieldsMixin, LatestCommentsMixin, serializers.ModelSerializer):
     """
     Serializer for Ticket model
     """
@@ -21,8 +38,14 @@ class TicketSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
 
+    # For bookissue.compiled; the async detail view annotates comments_count
+    compiled_fields = {'comments_count': (['comments_count'], None)}
+
     def get_comments_count(self, obj):
         """Get the number of comments for this ticket"""
+        if hasattr(obj, 'comments_count'):
+            # Annotated by the queryset, saves one COUNT per ticket
+            return obj.comments_count
         return obj.comments.count()
 
     def validate_assigned_to_id(self, value):
@@ -121,7 +144,7 @@ class TicketCreateSerializer(serializers.ModelSerializer):
         return value
 
 
-class TicketListSerializer(serializers.ModelSerializer):
+class TicketListSerializer(SparseFieldsMixin, LatestCommentsMixin, serializers.ModelSerializer):
     """
     Serializer for listing tickets (minimal info)
     """
@@ -135,6 +158,120 @@ class TicketListSerializer(serializers.ModelSerializer):
             'id', 'title', 'status', 'created_by', 'assigned_to', 'created_at', 'comments_count'
         ]
 
+    # For bookissue.compiled; list views annotate comments_count
+    compiled_fields = {'comments_count': (['comments_count'], None)}
+
     def get_comments_count(self, obj):
         """Get the number of comments for this ticket"""
+        if hasattr(obj, 'comments_count'):
+            # Annotated by the queryset, saves one COUNT per ticket
+            return obj.comments_count
         return obj.comments.count()
+
+
+class TicketCompactSerializer(TicketListSerializer):
+    """
+    Serializer for compact ticket lists (users side-loaded by id)
+    """
+    created_by = serializers.IntegerField(source='created_by_id', read_only=True)
+    assigned_to = serializers.IntegerField(source='assigned_to_id', read_only=True)
+    latest_comments_serializer = CommentCompactSerializer
+
+    def user_ids(self, tickets):
+        ids = set()
+        for ticket in tickets:
+            if 'created_by' in self.fields:
+                ids.add(ticket.created_by_id)
+            if 'assigned_to' in self.fields:
+                ids.add(ticket.assigned_to_id)
+            ids.update(comment.author_id for comment in getattr(ticket, 'latest_comments', ()))
+        return ids
+
+
+class TombstoneSerializer(serializers.ModelSerializer):
+    """
+    Serializer for deleted tickets/comments in the changes feed
+    """
+    class Meta:
+        model = Tombstone
+        fields = ['object_type', 'object_id', 'ticket_id', 'deleted_at']
+
+
+class TicketEventSerializer(serializers.ModelSerializer):
+    """
+    Serializer for ticket activity log entries, expanding the compact codes
+    """
+    EVENT_NAMES = {
+        TicketEvent.CREATED: 'created',
+        TicketEvent.STATUS_CHANGED: 'status_changed',
+        TicketEvent.ASSIGNED: 'assigned',
+        TicketEvent.COMMENTED: 'commented',
+    }
+
+    event = serializers.SerializerMethodField()
+    value = serializers.SerializerMethodField()
+    previous = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TicketEvent
+        fields = ['id', 'event', 'actor', 'value', 'previous', 'created_at']
+
+    def get_event(self, obj):
+        return self.EVENT_NAMES.get(obj.event)
+
+    def get_value(self, obj):
+        """Status name for status events, otherwise the referenced id"""
+        if obj.event in (TicketEvent.CREATED, TicketEvent.STATUS_CHANGED):
+            return TicketEvent.status_name(obj.value)
+        return obj.value
+
+    def get_previous(self, obj):
+        if obj.event == TicketEvent.STATUS_CHANGED:
+            return TicketEvent.status_name(obj.previous)
+        return obj.previous
+
+
+class TicketDailyStatsSerializer(serializers.ModelSerializer):
+    """
+    Serializer for team-wide daily analytics (durations in seconds)
+    """
+    class Meta:
+        model = TicketDailyStats
+        fields = [
+            'day', 'created_count', 'resolved_count', 'resolve_p50', 'resolve_p90',
+            'response_count', 'response_p50', 'response_p90'
+        ]
+
+
+class AssigneeDailyStatsSerializer(serializers.ModelSerializer):
+    """
+    Serializer for per-assignee daily throughput (durations in seconds)
+    """
+    assignee_name = serializers.CharField(source='assignee.full_name', read_only=True)
+
+    class Meta:
+        model = TicketDailyStats
+        fields = [
+            'day', 'assignee', 'assignee_name', 'resolved_count', 'resolve_p50',
+            'resolve_p90', 'response_count', 'response_p50', 'response_p90'
+        ]
+
+
+class WorkloadSerializer(serializers.ModelSerializer):
+    """
+    Serializer for an assignee's current workload
+    """
+    assignee = UserListSerializer(read_only=True)
+    oldest_open_age_seconds = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AssigneeWorkload
+        fields = [
+            'assignee', 'open_count', 'in_progress_count', 'resolved_count',
+            'oldest_open_at', 'oldest_open_age_seconds'
+        ]
+
+    def get_oldest_open_age_seconds(self, obj):
+        if obj.oldest_open_at is None:
+            return None
+        return int((timezone.now() - obj.oldest_open_at).total_seconds())
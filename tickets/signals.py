@@ -0,0 +1,176 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from comments.models import Comment
+from users.models import User
+from .bulk import chunked
+from .models import Ticket, TicketEvent, Tombstone
+from .workload import update_workload
+
+
+@receiver(pre_save, sender=Ticket)
+def store_old_ticket_values(sender, instance, **kwargs):
+    """Store old values before saving to detect changes"""
+    if instance.pk:
+        old_values = (
+            Ticket.objects.filter(pk=instance.pk)
+            .values('status', 'assigned_to_id')
+            .first()
+        )
+        if old_values is not None:
+            instance._old_status = old_values['status']
+            instance._old_assigned_to_id = old_values['assigned_to_id']
+
+
+@receiver(post_save, sender=Ticket)
+def record_ticket_events(sender, instance, created, **kwargs):
+    """
+    Append creation, status and assignment events to the ticket log.
+
+    Views set `instance._actor` to the requesting user before saving.
+    """
+    actor = getattr(instance, '_actor', None)
+    actor_id = actor.pk if actor is not None else None
+    status_code = TicketEvent.status_code(instance.status)
+    events = []
+
+    if created:
+        events.append(TicketEvent(
+            ticket=instance,
+            event=TicketEvent.CREATED,
+            actor_id=instance.created_by_id,
+            value=status_code
+        ))
+        if instance.assigned_to_id:
+            events.append(TicketEvent(
+                ticket=instance,
+                event=TicketEvent.ASSIGNED,
+                actor_id=instance.created_by_id,
+                value=instance.assigned_to_id
+            ))
+    else:
+        if hasattr(instance, '_old_status') and instance._old_status != instance.status:
+            events.append(TicketEvent(
+                ticket=instance,
+                event=TicketEvent.STATUS_CHANGED,
+                actor_id=actor_id,
+                value=status_code,
+                previous=TicketEvent.status_code(instance._old_status)
+            ))
+        if hasattr(instance, '_old_assigned_to_id') and instance._old_assigned_to_id != instance.assigned_to_id:
+            events.append(TicketEvent(
+                ticket=instance,
+                event=TicketEvent.ASSIGNED,
+                actor_id=actor_id,
+                value=instance.assigned_to_id,
+                previous=instance._old_assigned_to_id
+            ))
+
+    if events:
+        TicketEvent.objects.bulk_create(events)
+
+
+@receiver(post_save, sender=Ticket)
+def update_ticket_workload(sender, instance, created, **kwargs):
+    """Keep the workload summary of the old and new assignee current"""
+    old_status = getattr(instance, '_old_status', None)
+    old_assignee_id = getattr(instance, '_old_assigned_to_id', None)
+    if not created and old_status == instance.status and old_assignee_id == instance.assigned_to_id:
+        return
+
+    assignee_ids = {old_assignee_id, instance.assigned_to_id}
+    transaction.on_commit(lambda: update_workload(assignee_ids))
+
+
+@receiver(post_save, sender=Comment)
+def record_comment_event(sender, instance, created, **kwargs):
+    """Append a comment event to the ticket log"""
+    if created:
+        TicketEvent.objects.create(
+            ticket_id=instance.ticket_id,
+            event=TicketEvent.COMMENTED,
+            actor_id=instance.author_id,
+            value=instance.pk
+        )
+
+
+@receiver(post_delete, sender=Ticket)
+def record_ticket_tombstone(sender, instance, **kwargs):
+    """Leave a tombstone for the changes feed when a ticket is deleted"""
+    Tombstone.objects.create(
+        object_type='ticket',
+        object_id=instance.pk,
+        ticket_id=instance.pk,
+        owner_id=instance.created_by_id
+    )
+    assignee_id = instance.assigned_to_id
+    transaction.on_commit(lambda: update_workload([assignee_id]))
+
+
+def _deleted_with_ticket(origin):
+    """True when a comment is being deleted because its ticket is"""
+    return isinstance(origin, Ticket) or getattr(origin, 'model', None) is Ticket
+
+
+@receiver(pre_delete, sender=Ticket)
+def record_ticket_comment_tombstones(sender, instance, **kwargs):
+    """Leave the tombstones of a deleted ticket's comments, in one insert"""
+    Tombstone.objects.bulk_create([
+        Tombstone(object_type='comment', object_id=comment_id, ticket_id=instance.pk)
+        for comment_id in Comment.objects.filter(ticket_id=instance.pk).values_list('id', flat=True)
+    ])
+
+
+@receiver(post_delete, sender=Comment)
+def touch_ticket_on_comment_delete(sender, instance, origin=None, **kwargs):
+    """
+    Move the ticket's updated_at so Last-Modified of its detail and
+    comment thread changes: a deletion leaves no newer comment behind.
+    Skipped when the ticket itself is being deleted.
+    """
+    if _deleted_with_ticket(origin):
+        return
+    Ticket.objects.filter(pk=instance.ticket_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Comment)
+def record_comment_tombstone(sender, instance, origin=None, **kwargs):
+    """
+    Leave a tombstone for the changes feed when a comment is deleted
+    (record_ticket_comment_tombstones covers those deleted with their ticket)
+    """
+    if _deleted_with_ticket(origin):
+        return
+    Tombstone.objects.create(
+        object_type='comment',
+        object_id=instance.pk,
+        ticket_id=instance.ticket_id
+    )
+
+
+@receiver(pre_save, sender=User)
+def store_old_user_role(sender, instance, **kwargs):
+    """Store the old role to detect users losing access to other people's tickets"""
+    if instance.pk:
+        instance._old_role = User.objects.filter(pk=instance.pk).values_list('role', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def record_scope_tombstones(sender, instance, created, **kwargs):
+    """
+    Tell the sync client of a user who can no longer manage tickets to
+    drop every ticket they didn't create, addressed to them alone
+    """
+    old_role = getattr(instance, '_old_role', None)
+    if created or old_role is None or old_role == instance.role:
+        return
+    if instance.can_manage_tickets() or not User(role=old_role).can_manage_tickets():
+        return
+    ticket_ids = Ticket.objects.exclude(created_by_id=instance.pk).values_list('id', flat=True)
+    for chunk in chunked(ticket_ids.iterator(chunk_size=2000), 2000):
+        Tombstone.objects.bulk_create([
+            Tombstone(object_type='ticket', object_id=ticket_id, ticket_id=ticket_id, recipient_id=instance.pk)
+            for ticket_id in chunk
+        ])
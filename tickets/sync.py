@@ -0,0 +1,139 @@
+"""
+Changes feed ("what changed since my cursor") for offline/mobile clients.
+
+The cursor is opaque to clients: a urlsafe base64 JSON object holding the
+last (updated_at, id) of tickets and of comments, and the last tombstone
+id that were handed out. Each stream is read in keyset order, so every
+batch is an index range scan however large the backlog is, and edited
+tickets and comments come again.
+
+Timestamps and ids are taken before their transaction commits, so a row
+may become visible after later ones were handed out. The feed only hands
+out rows older than SYNC_SAFETY_WINDOW seconds, by which time everything
+stamped before them has committed; newer rows come with a later call.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from comments.models import Comment
+from .models import Tombstone
+
+DEFAULT_BATCH_SIZE = 200
+MAX_BATCH_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position):
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_key(key):
+    stamp, row_id = key
+    return [datetime.fromisoformat(stamp) if stamp else None, int(row_id)]
+
+
+def _encode_key(key):
+    return [key[0].isoformat() if key[0] else None, key[1]]
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(raw)
+        return {
+            't': _decode_key(position['t']),
+            'c': _decode_key(position['c']),
+            'd': int(position['d']),
+        }
+    except (ValueError, TypeError, KeyError, json.JSONDecodeError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+
+
+def initial_position():
+    """
+    Position for a client without local data: every ticket and comment is
+    still to come, but deletions that happened before are irrelevant.
+    """
+    last_tombstone = Tombstone.objects.order_by('-id').values_list('id', flat=True).first()
+    return {'t': [None, 0], 'c': [None, 0], 'd': last_tombstone or 0}
+
+
+def after(rows, key):
+    """`rows` past the (updated_at, id) `key` of the last one handed out, in that order"""
+    stamp, row_id = key
+    if stamp is not None:
+        rows = rows.filter(Q(updated_at__gt=stamp) | Q(updated_at=stamp, id__gt=row_id))
+    return rows.order_by('updated_at', 'id')
+
+
+def settled(rows, limit, stamp, horizon):
+    """
+    The first `limit` of `rows` (read in id order, one extra) stamped up to
+    `horizon`, stopping at the first newer row so no id is skipped; and
+    whether more settled rows follow
+    """
+    batch = []
+    for row in rows[:limit]:
+        if stamp(row) > horizon:
+            return batch, False
+        batch.append(row)
+    return batch, len(rows) > limit
+
+
+def changes_since(tickets, user, position, limit):
+    """
+    Collect one batch of changes for `tickets` (the caller's scoped ticket
+    queryset). Returns (tickets, comments, tombstones, next_position, has_more).
+    """
+    horizon = timezone.now() - timedelta(seconds=settings.SYNC_SAFETY_WINDOW)
+    changed = list(
+        after(tickets.filter(updated_at__lte=horizon), position['t'])
+        .select_related('created_by', 'assigned_to')
+        .annotate(comments_count=Count('comments'))[:limit + 1]
+    )
+
+    comments = list(
+        after(Comment.objects.filter(ticket__in=tickets.values('id'), updated_at__lte=horizon), position['c'])
+        .select_related('author', 'ticket')[:limit + 1]
+    )
+
+    # Tickets that left the user's scope are addressed to them alone
+    tombstones = Tombstone.objects.filter(id__gt=position['d'])
+    if user.can_manage_tickets():
+        tombstones = tombstones.filter(Q(recipient_id__isnull=True) | Q(recipient_id=user.id))
+    else:
+        tombstones = tombstones.filter(
+            Q(object_type='ticket', owner_id=user.id, recipient_id__isnull=True) |
+            Q(object_type='comment', ticket_id__in=tickets.values('id')) |
+            Q(recipient_id=user.id)
+        )
+    tombstones = list(tombstones.order_by('id')[:limit + 1])
+
+    has_more = len(changed) > limit or len(comments) > limit
+    changed = changed[:limit]
+    comments = comments[:limit]
+    tombstones, more_tombstones = settled(tombstones, limit, lambda tombstone: tombstone.deleted_at, horizon)
+    has_more = has_more or more_tombstones
+
+    next_position = {
+        't': _encode_key(position['t']),
+        'c': _encode_key(position['c']),
+        'd': position['d'],
+    }
+    if changed:
+        next_position['t'] = [changed[-1].updated_at.isoformat(), changed[-1].id]
+    if comments:
+        next_position['c'] = [comments[-1].updated_at.isoformat(), comments[-1].id]
+    if tombstones:
+        next_position['d'] = tombstones[-1].id
+
+    return changed, comments, tombstones, next_position, has_more
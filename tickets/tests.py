@@ -1,3 +1,1077 @@
-from django.test import TestCase
+import io
+import json
+import marshal
+import os
+import random
+import tempfile
+import threading
+import tracemalloc
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from bookissue import routers, slowqueries
+from . import analytics
+from bookissue.budgets import QueryBudgetExceeded
+from bookissue.compiled import compile_serializer
+from bookissue.profiling import ProfilingMiddleware
+from bookissue.testing import QueryBudgetAssertions, seed_helpdesk
+from comments.models import Comment
+from notifications.models import Notification
+from users.models import User
+from . import async_views
+from .management.commands import generate_dataset
+from . import views
+from .models import AssigneeWorkload, RollupState, Ticket, TicketDailyStats, TicketEvent, Tombstone
+from .serializers import TicketListSerializer
+
+
+class CompiledTicketSerializerTests(TestCase):
+    """Golden tests: the compiled list path renders byte-identical output"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ict = User.objects.create_user(
+            email='ict@example.com', username='ict', password='x',
+            first_name='Ict', last_name='Officer', role='ict', department='ICT',
+            profile_picture='profile_pictures/profile_1.png'
+        )
+        cls.student = User.objects.create_user(
+            email='student@example.com', username='student', password='x',
+            first_name='Jane', last_name='Doe "JD"'
+        )
+        for i, status in enumerate(['OPEN', 'IN_PROGRESS', 'RESOLVED', 'OPEN']):
+            ticket = Ticket.objects.create(
+                title=f'Ticket {i} ü', description='Pages missing from the book',
+                status=status, created_by=cls.student,
+                assigned_to=cls.ict if i % 2 else None
+            )
+            for _ in range(i):
+                Comment.objects.create(ticket=ticket, author=cls.ict, message='On it')
+        Ticket.objects.filter(title='Ticket 0 ü').update(created_at=timezone.now() - timedelta(days=400))
+
+    def render_both(self, queryset, request=None):
+        context = {'request': request} if request else {}
+        serializer = TicketListSerializer(context=context)
+        compiled = compile_serializer(serializer)
+        self.assertIsNotNone(compiled)
+
+        expected = JSONRenderer().render(TicketListSerializer(queryset, many=True, context=context).data)
+        actual = JSONRenderer().render(compiled.render(queryset.values_list(*compiled.paths), request))
+        return expected, actual
+
+    def test_ticket_list_matches_serializer(self):
+        queryset = Ticket.objects.annotate(comments_count=Count('comments')).order_by('id')
+        expected, actual = self.render_both(queryset)
+        self.assertEqual(expected, actual)
+
+    def test_absolute_urls_with_request(self):
+        request = Request(APIRequestFactory().get('/api/tickets/'))
+        queryset = Ticket.objects.annotate(comments_count=Count('comments')).order_by('id')
+        expected, actual = self.render_both(queryset, request)
+        self.assertIn(b'http://testserver/media/profile_pictures/profile_1.png', actual)
+        self.assertEqual(expected, actual)
+
+    def test_list_endpoint_matches_regular_path(self):
+        client = APIClient()
+        client.force_authenticate(self.ict)
+        for url in ['/api/tickets/', '/api/tickets/?fields=id,assigned_to,comments_count', '/api/tickets/?ordering=status']:
+            compiled = client.get(url)
+            with mock.patch('tickets.views.compiled_list_response', return_value=None):
+                regular = client.get(url)
+            self.assertEqual(compiled.status_code, 200)
+            self.assertEqual(compiled.content, regular.content, url)
+
+    def test_assigned_to_me_matches_regular_path(self):
+        client = APIClient()
+        client.force_authenticate(self.ict)
+        compiled = client.get('/api/tickets/assigned_to_me/')
+        with mock.patch('tickets.views.compiled_list_response', return_value=None):
+            regular = client.get('/api/tickets/assigned_to_me/')
+        self.assertEqual(compiled.content, regular.content)
+
+    def test_uncompilable_serializer_falls_back(self):
+        from comments.serializers import CommentSerializer
+        self.assertIsNone(compile_serializer(CommentSerializer()))
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+})
+class ResponseCacheTests(TestCase):
+    """Dashboard lists are served from the per-user cache until a write"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ict = User.objects.create_user(
+            email='ict@example.com', username='ict', password='x', role='ict', department='ICT'
+        )
+        cls.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        cls.ticket = Ticket.objects.create(title='Torn cover', description='Cover is torn', created_by=cls.student)
+
+    def setUp(self):
+        caches['responses'].clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def test_repeated_read_skips_database(self):
+        client = self.client_for(self.student)
+        first = client.get('/api/tickets/my_tickets/')
+        with self.assertNumQueries(0):
+            second = client.get('/api/tickets/my_tickets/')
+        self.assertEqual(first.content, second.content)
+
+    def test_cache_is_per_user(self):
+        self.client_for(self.ict).get('/api/tickets/')
+        response = self.client_for(self.student).get('/api/tickets/')
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(self.client_for(self.student).get('/api/users/').status_code, 403)
+
+    def test_comment_invalidates_ticket_lists(self):
+        client = self.client_for(self.student)
+        client.get('/api/tickets/my_tickets/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(ticket=self.ticket, author=self.ict, message='Replacing it')
+        response = client.get('/api/tickets/my_tickets/')
+        self.assertEqual(response.json()[0]['comments_count'], 1)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class AsyncReadViewTests(TestCase):
+    """The async ticket reads send what the viewset would"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ict = User.objects.create_user(
+            email='ict@example.com', username='ict', password='x', role='ict', department='ICT'
+        )
+        cls.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        for i in range(25):
+            ticket = Ticket.objects.create(
+                title=f'Ticket {i}', description='Pages missing from the book',
+                status=['OPEN', 'IN_PROGRESS', 'RESOLVED'][i % 3], created_by=cls.student,
+                assigned_to=cls.ict if i % 2 else None
+            )
+            for _ in range(i % 3):
+                Comment.objects.create(ticket=ticket, author=cls.ict, message='On it')
+        cls.ticket = Ticket.objects.first()
+
+    def assertMatchesViewset(self, user, url, viewset_view, **kwargs):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+        response = self.client.get(url, **auth)
+        expected = viewset_view(RequestFactory().get(url, **auth), **kwargs).render()
+        self.assertEqual(response.status_code, expected.status_code, url)
+        self.assertEqual(response.content, expected.content, url)
+        for header in ('Content-Type', 'ETag', 'Last-Modified', 'Allow'):
+            self.assertEqual(response.get(header), expected.get(header), f'{url} {header}')
+
+    def test_list_matches_viewset(self):
+        urls = [
+            '/api/tickets/', '/api/tickets/?page=2', '/api/tickets/?page=3',
+            '/api/tickets/?status=OPEN&ordering=-updated_at,status',
+            f'/api/tickets/?assigned_to={self.ict.id}', '/api/tickets/?status=CLOSED',
+        ]
+        for user in (self.ict, self.student):
+            for url in urls:
+                self.assertMatchesViewset(user, url, async_views.list_view)
+
+    def test_detail_matches_viewset(self):
+        url = f'/api/tickets/{self.ticket.id}/'
+        self.assertMatchesViewset(self.student, url, async_views.detail_view, pk=str(self.ticket.id))
+        self.assertMatchesViewset(self.ict, '/api/tickets/0/', async_views.detail_view, pk='0')
+
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.student)}'}
+        etag = self.client.get(url, **auth)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag, **auth).status_code, 304)
+
+    def test_other_requests_use_viewset(self):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.ict)}'}
+        self.assertEqual(self.client.get('/api/tickets/?search=Ticket 1', **auth).json()['count'], 12)
+        self.assertTrue(self.client.get('/api/tickets/', HTTP_ACCEPT='text/html', **auth)['Content-Type'].startswith('text/html'))
+        self.assertEqual(self.client.get('/api/tickets/').status_code, 401)
+
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'replica-tests'},
+    },
+    # The primary stands in for its replica; random.choice() shows when one is picked
+    DATABASE_REPLICAS=['default'],
+    RESPONSE_CACHE_TIMEOUT=0,
+)
+class ReplicaRoutingTests(TestCase):
+    """API reads go to a replica unless the user just wrote or it lags"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ict = User.objects.create_user(
+            email='ict@example.com', username='ict', password='x', role='ict', department='ICT'
+        )
+        cls.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        cls.ticket = Ticket.objects.create(title='Torn cover', description='Cover is torn', created_by=cls.student)
+
+    def setUp(self):
+        caches['responses'].clear()
+        routers._lag.clear()
+        patcher = mock.patch('bookissue.routers.random.choice', side_effect=lambda replicas: replicas[0])
+        self.choice = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, user, url='/api/tickets/'):
+        self.choice.reset_mock()
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        self.assertEqual(response.status_code, 200)
+        return self.choice.called
+
+    def test_reads_use_replica(self):
+        self.assertTrue(self.get(self.student))
+        self.assertTrue(self.get(self.ict, f'/api/comments/tickets/{self.ticket.id}/comments/'))
+
+    def test_writer_is_pinned_to_primary(self):
+        response = self.client.post(
+            f'/api/comments/tickets/{self.ticket.id}/comments/', {'message': 'Still torn'},
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.student)}'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(self.get(self.student))
+        self.assertTrue(self.get(self.ict))
+
+    def test_lagging_or_unreachable_replica_is_skipped(self):
+        for lag in (60.0, None):
+            routers._lag.clear()
+            with mock.patch('bookissue.routers.measure_lag', return_value=lag):
+                self.assertFalse(self.get(self.student))
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+@override_settings(METRICS_TOKEN='scrape-secret')
+class MetricsTests(TestCase):
+    """Requests show up in /metrics under their URL name"""
+
+    def test_route_histogram_and_query_count(self):
+        student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        self.client.get('/api/tickets/my_tickets/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(student)}')
+        body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').content.decode()
+        labels = '{route="tickets:ticket-my-tickets",method="GET",status="200"'
+        self.assertIn(f'bookissue_request_duration_seconds_bucket{labels},le="+Inf"}}', body)
+        query_lines = [line for line in body.splitlines() if line.startswith(f'bookissue_request_queries_total{labels}')]
+        self.assertEqual(len(query_lines), 1)
+        self.assertGreater(int(query_lines[0].rsplit(' ', 1)[1]), 0)
+
+    def test_access(self):
+        cases = [
+            ('scrape-secret', False, 'Bearer scrape-secret', 200),
+            ('scrape-secret', True, 'Bearer wrong', 403),
+            ('scrape-secret', True, None, 403),
+            # No token: closed unless DEBUG is on
+            ('', False, None, 403),
+            ('', False, 'Bearer anything', 403),
+            ('', True, None, 200),
+        ]
+        for token, debug, header, status in cases:
+            with self.subTest(token=token, debug=debug, header=header):
+                headers = {'Authorization': header} if header else {}
+                with self.settings(METRICS_TOKEN=token, DEBUG=debug):
+                    self.assertEqual(self.client.get('/metrics', headers=headers).status_code, status)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class SlowQueryLogTests(TestCase):
+    """Slow queries are tagged with their view and listed for super admins"""
+
+    def setUp(self):
+        slowqueries.reset()
+        self.admin = User.objects.create_user(email='admin@example.com', username='admin', password='x', role='super_admin')
+        self.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        Ticket.objects.create(title='Torn cover', description='Cover is torn', created_by=self.student)
+
+    def get(self, user, path):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def test_slow_queries_listed_with_plans(self):
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=1e-6, SLOW_QUERY_EXPLAIN_RATE=1):
+            with self.assertLogs('bookissue.slowqueries', 'WARNING') as logs:
+                self.get(self.student, '/api/tickets/my_tickets/')
+        self.assertIn('in tickets:ticket-my-tickets', logs.output[0])
+
+        report = self.get(self.admin, '/api/slow-queries/').json()
+        statement = next(row for row in report['statements'] if 'FROM "tickets"' in row['sql'])
+        self.assertEqual(statement['views'], {'tickets:ticket-my-tickets': 1})
+        self.assertTrue(any(plan['sql'] == statement['sql'] and plan['plan'] for plan in report['plans']))
+        # The report's own queries ran under the default threshold
+        self.assertFalse(any('slow-queries' in view for row in report['statements'] for view in row['views']))
+
+    def test_in_lists_fold_into_one_statement(self):
+        self.assertEqual(
+            slowqueries.fingerprint('SELECT 1 WHERE id IN (%s, %s, %s)'),
+            slowqueries.fingerprint('SELECT 1 WHERE id IN (%s, %s)')
+        )
+
+    def test_super_admin_only(self):
+        self.assertEqual(self.get(self.student, '/api/slow-queries/').status_code, 403)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0, PROFILE_INTERVAL=0.0005, CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'profiles'},
+})
+class ProfilingTests(TestCase):
+    """Super admins can profile single requests and download the result"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', username='admin', password='x', role='super_admin')
+        self.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        Ticket.objects.create(title='Torn cover', description='Cover is torn', created_by=self.student)
+        caches['responses'].clear()
+
+    def get(self, user, path, **headers):
+        return self.client.get(path, headers={'Authorization': f'Bearer {AccessToken.for_user(user)}', **headers})
+
+    def test_profile_stored_and_downloadable(self):
+        response = self.get(self.admin, '/api/tickets/', **{'X-Profile': 'cprofile'})
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+
+        listing = self.get(self.admin, '/api/profiles/').json()
+        self.assertEqual([(entry['id'], entry['path']) for entry in listing], [(profile_id, '/api/tickets/')])
+
+        folded = self.get(self.admin, f'/api/profiles/{profile_id}/')
+        self.assertIn('attachment', folded['Content-Disposition'])
+        stack, samples = folded.content.decode().splitlines()[0].rsplit(' ', 1)
+        self.assertNotIn('ProfilingMiddleware', stack)
+        self.assertGreater(int(samples), 0)
+
+        stats = marshal.loads(self.get(self.admin, f'/api/profiles/{profile_id}/?output=pstats').content)
+        # The DRF view (not the async stand-in) ran in the profiled thread
+        self.assertTrue(any(name == 'list' and path.endswith('tickets/views.py') for path, _, name in stats))
+        self.assertEqual(self.get(self.admin, f'/api/profiles/{profile_id}/?output=html').status_code, 400)
+
+    async def test_async_stack(self):
+        async def view(request):
+            return HttpResponse(threading.get_ident())
+        middleware = ProfilingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        # Unprofiled requests stay on the event loop
+        response = await middleware(RequestFactory().get('/api/tickets/', headers={'X-Profile': '1'}))
+        self.assertEqual(int(response.content), threading.get_ident())
+
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.admin)}'}
+        response = await self.async_client.get('/api/tickets/', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+
+        response = await self.async_client.get('/api/tickets/', headers={**headers, 'X-Profile': 'cprofile'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        profile = await caches['responses'].aget(f"profile:{response['X-Profile-Id']}")
+        stats = marshal.loads(profile['outputs']['pstats'])
+        # The DRF view's sync work ran in the profiled thread
+        self.assertTrue(any(name == 'list' and path.endswith('tickets/views.py') for path, _, name in stats))
+        self.assertTrue(profile['outputs']['collapsed'])
+
+    def test_only_super_admins(self):
+        response = self.get(self.student, '/api/tickets/', **{'X-Profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.get(self.student, '/api/profiles/').status_code, 403)
+        self.assertNotIn('X-Profile-Id', self.get(self.admin, '/api/tickets/'))
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class UnpaginatedListStreamingTests(TestCase):
+    """Long unpaginated lists are streamed with the same bytes, and traced when asked"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        cls.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        for number in range(5):
+            Ticket.objects.create(
+                title=f'Ticket {number}', description='Pages are missing', created_by=cls.student,
+                assigned_to=cls.ict if number % 2 else None
+            )
+
+    def get(self, path, **headers):
+        response = self.client.get(path, headers={'Authorization': f'Bearer {AccessToken.for_user(self.student)}', **headers})
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_streamed_body_matches(self):
+        for path in ['/api/tickets/my_tickets/', '/api/tickets/my_tickets/?compact=1', '/api/tickets/my_tickets/?fields=id,title']:
+            with self.subTest(path=path):
+                response, expected = self.get(path)
+                self.assertFalse(response.streaming)
+                with override_settings(STREAM_LIST_THRESHOLD=2, STREAM_CHUNK_SIZE=2):
+                    streamed, body = self.get(path)
+                self.assertTrue(streamed.streaming)
+                self.assertEqual(body, expected)
+
+    async def test_streamed_asynchronously_under_asgi(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.student)}'}
+        for path in ['/api/tickets/my_tickets/', '/api/tickets/my_tickets/?compact=1']:
+            with self.subTest(path=path):
+                expected = await self.async_client.get(path, headers=headers)
+                with override_settings(STREAM_LIST_THRESHOLD=2, STREAM_CHUNK_SIZE=2):
+                    streamed = await self.async_client.get(path, headers=headers)
+                    self.assertTrue(streamed.is_async)
+                    parts = [part async for part in streamed.streaming_content]
+                self.assertGreater(len(parts), 2)
+                self.assertEqual(b''.join(parts), expected.content)
+
+    def test_browsable_api_not_streamed(self):
+        with override_settings(STREAM_LIST_THRESHOLD=2):
+            response, _ = self.get('/api/tickets/my_tickets/', Accept='text/html')
+        self.assertFalse(response.streaming)
+
+    @override_settings(MEMORY_TRACE=True, MEMORY_TRACE_THRESHOLD=0, MEMORY_TRACE_TOP=3)
+    def test_memory_trace_reports_peak(self):
+        if not tracemalloc.is_tracing():
+            self.addCleanup(tracemalloc.stop)
+        with self.assertLogs('bookissue.memory', 'WARNING') as logs:
+            response, _ = self.get('/api/tickets/my_tickets/')
+        self.assertGreater(int(response['X-Memory-Peak']), 0)
+        self.assertIn('(tickets:ticket-my-tickets) peaked at', logs.output[0])
+
+        with override_settings(STREAM_LIST_THRESHOLD=2), self.assertLogs('bookissue.memory', 'WARNING') as logs:
+            response, _ = self.get('/api/tickets/my_tickets/')
+        self.assertNotIn('X-Memory-Peak', response)
+        self.assertEqual(len(logs.output), 1)
+
+
+class ChangesFeedTests(TestCase):
+    """The changes feed never skips rows that commit late, and drops tickets leaving a user's scope"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        cls.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        cls.other_ict = User.objects.create_user(email='ict2@example.com', username='ict2', password='x', role='ict')
+
+    def feed(self, user, cursor=None):
+        path = '/api/tickets/changes/' + (f'?cursor={cursor}' if cursor else '')
+        response = self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ticket(self, title, seconds_ago, **fields):
+        ticket = Ticket.objects.create(title=title, description='x', created_by=self.student, **fields)
+        Ticket.objects.filter(pk=ticket.pk).update(updated_at=timezone.now() - timedelta(seconds=seconds_ago))
+        return ticket
+
+    def test_late_commits_not_skipped(self):
+        self.ticket('Settled', 60)
+        self.ticket('Recent', 1)
+        batch = self.feed(self.ict)
+        self.assertEqual([ticket['title'] for ticket in batch['tickets']], ['Settled'])
+
+        # Stamped before "Recent" but committed after the first batch was read
+        self.ticket('Late', 2)
+        with override_settings(SYNC_SAFETY_WINDOW=0):
+            batch = self.feed(self.ict, batch['cursor'])
+        self.assertEqual([ticket['title'] for ticket in batch['tickets']], ['Late', 'Recent'])
+
+    def test_comment_ids_not_skipped(self):
+        ticket = self.ticket('Ticket', 60)
+        old = Comment.objects.create(ticket=ticket, author=self.student, message='Old')
+        recent = Comment.objects.create(ticket=ticket, author=self.student, message='Recent')
+        Comment.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(minutes=1))
+        batch = self.feed(self.ict)
+        self.assertEqual([comment['id'] for comment in batch['comments']], [old.pk])
+        self.assertFalse(batch['has_more'])
+
+        with override_settings(SYNC_SAFETY_WINDOW=0):
+            batch = self.feed(self.ict, batch['cursor'])
+        self.assertEqual([comment['id'] for comment in batch['comments']], [recent.pk])
+
+    @override_settings(SYNC_SAFETY_WINDOW=0)
+    def test_edited_comments_sent_again(self):
+        ticket = self.ticket('Ticket', 60)
+        comment = Comment.objects.create(ticket=ticket, author=self.student, message='Pages 3-9 missing')
+        cursor = self.feed(self.student)['cursor']
+
+        comment.message = 'Pages 3-12 missing'
+        comment.save()
+        batch = self.feed(self.student, cursor)
+        self.assertEqual([(row['id'], row['message']) for row in batch['comments']], [(comment.pk, 'Pages 3-12 missing')])
+        self.assertEqual(self.feed(self.student, batch['cursor'])['comments'], [])
+
+    def test_ticket_deletion_tombstones_comments_in_one_insert(self):
+        ticket = self.ticket('Ticket', 60)
+        comment_ids = [Comment.objects.create(ticket=ticket, author=self.student, message='x').pk for _ in range(3)]
+        with CaptureQueriesContext(connection) as queries:
+            ticket.delete()
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "tombstones"')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(
+            sorted(Tombstone.objects.filter(object_type='comment').values_list('object_id', flat=True)), comment_ids
+        )
+
+    def test_role_change_within_scope_leaves_no_tombstone(self):
+        self.ticket('Ticket', 60, assigned_to=self.ict)
+        self.ict.role = 'staff'
+        self.ict.save()
+        self.assertFalse(Tombstone.objects.exists())
+
+    @override_settings(SYNC_SAFETY_WINDOW=0)
+    def test_tickets_leaving_scope_tombstoned_for_demoted_user(self):
+        ticket = self.ticket('Ticket', 60, assigned_to=self.ict)
+        own = Ticket.objects.create(title='Own', description='x', created_by=self.ict)
+        cursors = {user: self.feed(user)['cursor'] for user in (self.ict, self.other_ict, self.student)}
+
+        self.ict.role = 'student'
+        self.ict.save()
+
+        batch = self.feed(self.ict, cursors[self.ict])
+        self.assertEqual([(row['object_type'], row['object_id']) for row in batch['deleted']], [('ticket', ticket.pk)])
+        self.assertEqual([row['id'] for row in batch['tickets']], [])
+        self.assertFalse(Tombstone.objects.filter(object_id=own.pk).exists())
+        self.assertEqual(self.feed(self.other_ict, cursors[self.other_ict])['deleted'], [])
+        self.assertEqual(self.feed(self.student, cursors[self.student])['deleted'], [])
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class TicketTimelineTests(TestCase):
+    """The activity log records each change once, in order, with who made it"""
+
+    def setUp(self):
+        self.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        self.other = User.objects.create_user(email='other@example.com', username='other', password='x')
+        self.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        self.staff = User.objects.create_user(email='staff@example.com', username='staff', password='x', role='staff')
+
+    def request(self, user, method, path, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        return getattr(client, method)(path, data, format='json')
+
+    def timeline(self, ticket_id, user=None):
+        response = self.request(user or self.student, 'get', f'/api/tickets/{ticket_id}/timeline/')
+        self.assertEqual(response.status_code, 200)
+        return [(e['event'], e['actor'], e['value'], e['previous']) for e in response.json()]
+
+    def test_timeline_contents_and_order(self):
+        self.request(self.student, 'post', '/api/tickets/', {'title': 'Torn cover', 'description': 'The back cover is torn off'})
+        ticket_id = Ticket.objects.get().id
+        self.request(self.ict, 'post', f'/api/tickets/{ticket_id}/assign/', {'assigned_to_id': self.staff.id})
+        self.request(self.staff, 'post', f'/api/tickets/{ticket_id}/update_status/', {'status': 'IN_PROGRESS'})
+        self.request(self.staff, 'post', f'/api/comments/tickets/{ticket_id}/comments/', {'message': 'On it'})
+        comment_id = Comment.objects.get().id
+        self.request(self.ict, 'post', f'/api/tickets/{ticket_id}/assign/', {'assigned_to_id': self.ict.id})
+        self.request(self.ict, 'post', f'/api/tickets/{ticket_id}/update_status/', {'status': 'RESOLVED'})
+
+        self.assertEqual(self.timeline(ticket_id), [
+            ('created', self.student.id, 'OPEN', None),
+            ('assigned', self.ict.id, self.staff.id, None),
+            ('status_changed', self.staff.id, 'IN_PROGRESS', 'OPEN'),
+            ('commented', self.staff.id, comment_id, None),
+            ('assigned', self.ict.id, self.ict.id, self.staff.id),
+            ('status_changed', self.ict.id, 'RESOLVED', 'IN_PROGRESS'),
+        ])
+        # Stored compactly: status codes, not names
+        self.assertEqual(
+            list(TicketEvent.objects.filter(ticket_id=ticket_id, event=TicketEvent.STATUS_CHANGED).values_list('value', 'previous')),
+            [(2, 1), (3, 2)]
+        )
+
+    def test_created_assigned_ticket_and_unchanged_saves(self):
+        ticket = Ticket.objects.create(title='Torn cover', description='x', created_by=self.student, assigned_to=self.ict)
+        # Saves that change neither status nor assignee log nothing
+        ticket.title = 'Torn cover and pages'
+        ticket.save()
+        self.request(self.ict, 'post', f'/api/tickets/{ticket.id}/update_status/', {'status': 'OPEN'})
+
+        self.assertEqual(self.timeline(ticket.id), [
+            ('created', self.student.id, 'OPEN', None),
+            ('assigned', self.student.id, self.ict.id, None),
+        ])
+
+    def test_timeline_follows_ticket_visibility(self):
+        ticket = Ticket.objects.create(title='Torn cover', description='x', created_by=self.student)
+        self.assertEqual(self.request(self.other, 'get', f'/api/tickets/{ticket.id}/timeline/').status_code, 404)
+        ticket_id = ticket.id
+        ticket.delete()
+        self.assertFalse(TicketEvent.objects.filter(ticket_id=ticket_id).exists())
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class WorkloadSummaryTests(TestCase):
+    """The workload summary matches a fresh aggregate after ticket changes and refreshes"""
+
+    def setUp(self):
+        self.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        self.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        self.staff = User.objects.create_user(email='staff@example.com', username='staff', password='x', role='staff')
+
+    def summary(self):
+        return {
+            row.assignee_id: (row.open_count, row.in_progress_count, row.resolved_count, row.oldest_open_at)
+            for row in AssigneeWorkload.objects.all()
+        }
+
+    def expected(self):
+        expected = {}
+        for ticket in Ticket.objects.filter(assigned_to__isnull=False).order_by('created_at'):
+            counts = expected.setdefault(ticket.assigned_to_id, [0, 0, 0, None])
+            counts[['OPEN', 'IN_PROGRESS', 'RESOLVED'].index(ticket.status)] += 1
+            if ticket.status != 'RESOLVED' and counts[3] is None:
+                counts[3] = ticket.created_at
+        return {assignee_id: tuple(counts) for assignee_id, counts in expected.items()}
+
+    def test_signals_keep_affected_rows_current(self):
+        changes = [
+            lambda: Ticket.objects.create(title='a', description='x', created_by=self.student, assigned_to=self.ict),
+            lambda: Ticket.objects.create(title='b', description='x', created_by=self.student, assigned_to=self.ict, status='IN_PROGRESS'),
+            lambda: Ticket.objects.create(title='c', description='x', created_by=self.student),
+            lambda: self.save(Ticket.objects.get(title='c'), assigned_to=self.staff),
+            lambda: self.save(Ticket.objects.get(title='a'), status='RESOLVED'),
+            lambda: self.save(Ticket.objects.get(title='b'), assigned_to=self.staff),
+            lambda: self.save(Ticket.objects.get(title='c'), assigned_to=None),
+            lambda: Ticket.objects.get(title='b').delete(),
+        ]
+        for step, change in enumerate(changes):
+            with self.subTest(step=step):
+                with self.captureOnCommitCallbacks(execute=True):
+                    change()
+                self.assertEqual(self.summary(), self.expected())
+        # ict keeps a row for the resolved ticket; staff has nothing left
+        self.assertEqual(self.summary(), {self.ict.id: (0, 0, 1, None)})
+
+    def save(self, ticket, **changes):
+        for field, value in changes.items():
+            setattr(ticket, field, value)
+        ticket.save()
+
+    def test_refresh_command_rebuilds_table(self):
+        Ticket.objects.create(title='a', description='x', created_by=self.student, assigned_to=self.ict)
+        Ticket.objects.create(title='b', description='x', created_by=self.student, assigned_to=self.staff, status='IN_PROGRESS')
+        # Out-of-band writes the signals never see
+        Ticket.objects.filter(title='a').update(status='RESOLVED')
+        AssigneeWorkload.objects.filter(assignee=self.staff).delete()
+        self.assertNotEqual(self.summary(), self.expected())
+
+        out = io.StringIO()
+        call_command('refresh_workload', stdout=out)
+        self.assertIn('Refreshed workload table', out.getvalue())
+        self.assertEqual(self.summary(), self.expected())
+
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        rows = client.get('/api/tickets/workload/').json()
+        self.assertEqual(
+            [(row['assignee']['id'], row['open_count'], row['in_progress_count'], row['resolved_count']) for row in rows],
+            [(self.staff.id, 0, 1, 0), (self.ict.id, 0, 0, 1)]
+        )
+
+    def test_materialized_view_refreshed_as_a_whole(self):
+        with mock.patch('tickets.workload.connection') as pg:
+            pg.vendor = 'postgresql'
+            execute = pg.cursor.return_value.__enter__.return_value.execute
+            call_command('refresh_workload', stdout=io.StringIO())
+            execute.assert_called_once_with('REFRESH MATERIALIZED VIEW CONCURRENTLY ticket_workload')
+            execute.reset_mock()
+            call_command('refresh_workload', '--blocking', stdout=io.StringIO())
+            execute.assert_called_once_with('REFRESH MATERIALIZED VIEW ticket_workload')
+            # Ticket changes leave the view to its schedule
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                Ticket.objects.create(title='a', description='x', created_by=self.student, assigned_to=self.ict)
+        self.assertFalse([q for q in queries if 'ticket_workload' in q['sql']])
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class ConditionalTicketReadTests(TestCase):
+    """Ticket detail answers unchanged reads with 304 and changes its validators on writes"""
+
+    def setUp(self):
+        self.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        self.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        self.ticket = Ticket.objects.create(title='Torn cover', description='x', created_by=self.student, assigned_to=self.ict)
+        # An hour back, so changes made now get a later Last-Modified second
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Ticket.objects.update(updated_at=hour_ago, created_at=hour_ago)
+        User.objects.update(updated_at=hour_ago)
+        self.path = f'/api/tickets/{self.ticket.id}/'
+
+    def get(self, **headers):
+        return self.client.get(self.path, headers={'Authorization': f'Bearer {AccessToken.for_user(self.student)}', **headers})
+
+    def test_unchanged_ticket_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(**{'If-None-Match': response['ETag']}).status_code, 304)
+        # The user and the validators, nothing serialized
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(self.get(**{'If-Modified-Since': response['Last-Modified']}).status_code, 304)
+        self.assertEqual(self.get(**{'If-None-Match': '"stale"'}).status_code, 200)
+
+    def test_writes_change_validators(self):
+        writes = {
+            'ticket edited': lambda: Ticket.objects.filter(pk=self.ticket.pk).update(title='Torn cover and pages', updated_at=timezone.now()),
+            'comment added': lambda: Comment.objects.create(ticket=self.ticket, author=self.ict, message='On it'),
+            'assignee renamed': lambda: User.objects.filter(pk=self.ict.pk).update(first_name='Ivy', updated_at=timezone.now()),
+        }
+        for write, apply in writes.items():
+            with self.subTest(write=write):
+                before = self.get()
+                apply()
+                after = self.get(**{'If-None-Match': before['ETag']})
+                self.assertEqual(after.status_code, 200)
+                self.assertNotEqual(after['ETag'], before['ETag'])
+                self.assertNotEqual(after.content, before.content)
+                self.assertEqual(self.get(**{'If-None-Match': after['ETag']}).status_code, 304)
+
+
+class TicketActionPermissionTests(TestCase):
+    """Extra actions enforce the permission_classes they declare"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        cls.staff = User.objects.create_user(email='staff@example.com', username='staff', password='x', role='staff')
+        cls.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        cls.ticket = Ticket.objects.create(title='Torn cover', description='x', created_by=cls.student)
+
+    def request(self, user, method, path, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        return getattr(client, method)(path, data, format='json')
+
+    def test_assign_is_for_ict_and_super_admins(self):
+        path = f'/api/tickets/{self.ticket.id}/assign/'
+        # Ticket creators and staff can't assign, even their own tickets
+        for user in (self.student, self.staff):
+            with self.subTest(role=user.role):
+                self.assertEqual(self.request(user, 'post', path, {'assigned_to_id': self.ict.id}).status_code, 403)
+        self.ticket.refresh_from_db()
+        self.assertIsNone(self.ticket.assigned_to)
+
+        response = self.request(self.ict, 'post', path, {'assigned_to_id': self.staff.id})
+        self.assertEqual(response.status_code, 200)
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.assigned_to, self.staff)
+
+    def test_team_views_are_for_staff_and_ict(self):
+        for path in ['/api/tickets/workload/', '/api/tickets/analytics/', '/api/tickets/analytics/assignees/']:
+            with self.subTest(path=path):
+                self.assertEqual(self.request(self.student, 'get', path).status_code, 403)
+                self.assertEqual(self.request(self.staff, 'get', path).status_code, 200)
+
+
+class AnalyticsRollupTests(TestCase):
+    """Rollups credit the assignee of the time and pick up events committed late"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        cls.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        cls.other_ict = User.objects.create_user(email='ict2@example.com', username='ict2', password='x', role='ict')
+
+    def resolved_ticket(self, assignee):
+        ticket = Ticket.objects.create(title='Torn page', description='x', created_by=self.student, assigned_to=assignee)
+        Comment.objects.create(ticket=ticket, author=assignee, message='Looking into it')
+        ticket.status = 'RESOLVED'
+        ticket.save()
+        return ticket
+
+    def stats(self, assignee):
+        return TicketDailyStats.objects.filter(assignee=assignee).values_list('resolved_count', 'response_count').first()
+
+    def test_reassignment_keeps_credit(self):
+        ticket = self.resolved_ticket(self.ict)
+        analytics.update_rollups()
+        self.assertEqual(self.stats(self.ict), (1, 1))
+
+        ticket.assigned_to = self.other_ict
+        ticket.save()
+        analytics.update_rollups()
+        self.assertEqual(self.stats(self.ict), (1, 1))
+        self.assertIsNone(self.stats(self.other_ict))
+        self.assertEqual(analytics.update_rollups(full=True)[1], TicketDailyStats.objects.count())
+        self.assertEqual(self.stats(self.ict), (1, 1))
+
+    def test_created_counts_for_first_assignee(self):
+        ticket = Ticket.objects.create(title='Torn page', description='x', created_by=self.student)
+        for assignee in (self.ict, self.other_ict):
+            ticket.assigned_to = assignee
+            ticket.save()
+            analytics.update_rollups()
+            created = dict(TicketDailyStats.objects.values_list('assignee_id', 'created_count'))
+            self.assertEqual(created, {None: 1, self.ict.pk: 1})
+        analytics.update_rollups(full=True)
+        self.assertEqual(dict(TicketDailyStats.objects.values_list('assignee_id', 'created_count')), {None: 1, self.ict.pk: 1})
+
+    def test_late_commit_picked_up(self):
+        analytics.update_rollups()
+        ticket = self.resolved_ticket(self.ict)
+        # A run that read the high-water mark while these events were uncommitted
+        last_event_id = TicketEvent.objects.order_by('-id').values_list('id', flat=True).first()
+        RollupState.objects.filter(name=analytics.ROLLUP_NAME).update(last_event_id=last_event_id)
+
+        analytics.update_rollups()
+        self.assertEqual(self.stats(None), (1, 1))
+        self.assertEqual(ticket.events.filter(event=TicketEvent.STATUS_CHANGED).count(), 1)
+
+    def test_one_row_per_day_and_assignee(self):
+        today = timezone.localdate()
+        TicketDailyStats.objects.create(day=today, assignee=None)
+        TicketDailyStats.objects.create(day=today, assignee=self.ict)
+        for assignee in (None, self.ict):
+            with self.subTest(assignee=assignee), self.assertRaises(IntegrityError), transaction.atomic():
+                TicketDailyStats.objects.create(day=today, assignee=assignee)
+
+
+class ImportTicketsTests(TestCase):
+    """import_tickets keeps legacy ids, validates references and skips collisions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(email='student@example.com', username='student', password='x')
+        cls.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        cls.existing = Ticket.objects.create(title='Existing', description='Already here', created_by=cls.student)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return path
+
+    def import_files(self, **files):
+        out = io.StringIO()
+        call_command('import_tickets', stdout=out, **files)
+        return out.getvalue()
+
+    def test_csv_tickets_and_ndjson_comments(self):
+        tickets = self.write('tickets.csv', (
+            'id,title,description,status,created_by,assigned_to,created_at,updated_at\n'
+            '500,Torn cover,Cover is torn,RESOLVED,STUDENT@example.com,ict@example.com,2024-01-02T10:00:00,2024-01-05T10:00:00\n'
+            '501,Missing pages,Pages 3-9,OPEN,student@example.com,,2024-02-01T09:00:00Z,\n'
+        ))
+        comments = self.write('comments.ndjson', '\n'.join(json.dumps(record) for record in [
+            {'id': 900, 'ticket_id': 500, 'author': 'ict@example.com', 'message': 'Fixed', 'created_at': '2024-01-04T10:00:00'},
+            {'id': 901, 'ticket_id': 501, 'author': 'student@example.com', 'message': 'Any news?'},
+        ]))
+        output = self.import_files(tickets=tickets, comments=comments)
+
+        self.assertIn('Imported 2 tickets and 2 comments', output)
+        resolved = Ticket.objects.get(pk=500)
+        self.assertEqual((resolved.status, resolved.created_by, resolved.assigned_to), ('RESOLVED', self.student, self.ict))
+        self.assertEqual(resolved.created_at.isoformat(), '2024-01-02T10:00:00+00:00')
+        self.assertEqual(Comment.objects.get(pk=900).ticket_id, 500)
+        self.assertTrue(TicketEvent.objects.filter(ticket_id=500, event=TicketEvent.COMMENTED).exists())
+        # Sequences are moved past the legacy ids
+        self.assertGreater(Ticket.objects.create(title='New', description='x', created_by=self.student).pk, 501)
+        self.assertGreater(Comment.objects.create(ticket=resolved, author=self.ict, message='x').pk, 901)
+
+    def test_invalid_references_and_collisions_skipped(self):
+        tickets = self.write('tickets.ndjson', '\n'.join(json.dumps(record) for record in [
+            {'id': self.existing.pk, 'title': 'Collides', 'description': 'x', 'created_by': 'student@example.com'},
+            {'id': 600, 'title': 'Unknown creator', 'description': 'x', 'created_by': 'nobody@example.com'},
+            {'id': 601, 'title': 'Good', 'description': 'x', 'created_by': 'student@example.com', 'status': 'done'},
+            {'id': 602, 'title': 'Good', 'description': 'x', 'created_by': 'student@example.com'},
+            {'id': 602, 'title': 'Duplicate', 'description': 'x', 'created_by': 'student@example.com'},
+            {'id': 604, 'title': 'Good', 'description': 'x', 'created_by': 'student@example.com'},
+        ]))
+        comments = self.write('comments.csv', (
+            'ticket_id,author,message,created_at\n'
+            f'{self.existing.pk},student@example.com,For the colliding legacy ticket,\n'
+            '604,student@example.com,Good,\n'
+            '603,student@example.com,Unknown ticket,\n'
+            '604,nobody@example.com,Unknown author,\n'
+            '602,student@example.com,Which 602?,\n'
+        ))
+        output = self.import_files(tickets=tickets, comments=comments)
+
+        self.assertIn('Imported 2 tickets and 1 comments', output)
+        for reason in ['ticket id already exists', 'ticket creator email not found', 'unknown ticket status',
+                       'duplicate ticket id', 'comment references unknown ticket', 'comment author email not found']:
+            self.assertIn(f'Skipped 1 rows: {reason}', output)
+        # A duplicated id's comments can't be told apart
+        self.assertIn('Skipped 2 rows: comment references a ticket that was not imported', output)
+        self.assertEqual(Ticket.objects.get(pk=self.existing.pk).title, 'Existing')
+        self.assertFalse(self.existing.comments.exists())
+
+    def test_rejected_ids_never_take_comments_of_existing_tickets(self):
+        existing = Ticket.objects.bulk_create(
+            Ticket(title=f'Existing {number}', description='x', created_by=self.student) for number in range(3)
+        )
+        tickets = self.write('tickets.ndjson', '\n'.join(json.dumps(record) for record in [
+            {'id': existing[0].pk, 'title': 'Unknown creator', 'description': 'x', 'created_by': 'nobody@example.com'},
+            {'id': existing[1].pk, 'title': 'Bad status', 'description': 'x', 'created_by': 'student@example.com',
+             'status': 'done'},
+            {'id': existing[2].pk, 'title': 'Bad timestamp', 'description': 'x', 'created_by': 'student@example.com',
+             'created_at': 'yesterday'},
+        ]))
+        comments = self.write('comments.csv', 'ticket_id,author,message,created_at\n' + ''.join(
+            f'{ticket.pk},student@example.com,For the rejected ticket,\n' for ticket in existing
+        ))
+        output = self.import_files(tickets=tickets, comments=comments)
+
+        self.assertIn('Imported 0 tickets and 0 comments', output)
+        self.assertIn('Skipped 3 rows: comment references a ticket that was not imported', output)
+        self.assertFalse(Comment.objects.filter(ticket__in=existing).exists())
+
+    def test_existing_comment_id_skipped(self):
+        taken = Comment.objects.create(ticket=self.existing, author=self.student, message='Original')
+        comments = self.write('comments.ndjson', json.dumps(
+            {'id': taken.pk, 'ticket_id': self.existing.pk, 'author': 'ict@example.com', 'message': 'Imported'}
+        ))
+        output = self.import_files(comments=comments)
+        self.assertIn('Skipped 1 rows: comment id already exists', output)
+        self.assertEqual(Comment.objects.get(pk=taken.pk).message, 'Original')
+
+    def test_ticket_lookups_per_chunk(self):
+        """Comments on tickets already in the database don't query once per ticket"""
+        ticket_ids = [ticket.pk for ticket in Ticket.objects.bulk_create(
+            Ticket(title=f'Ticket {number}', description='x', created_by=self.student) for number in range(40)
+        )]
+
+        def queries(count):
+            path = self.write(f'comments-{count}.csv', 'ticket_id,author,message,created_at\n' + ''.join(
+                f'{ticket_id},student@example.com,Comment,\n' for ticket_id in ticket_ids[:count]
+            ))
+            with CaptureQueriesContext(connection) as context:
+                self.import_files(comments=path)
+            return len(context)
+
+        self.assertEqual(queries(2), queries(40))
+
+
+class GenerateDatasetTests(TestCase):
+    """generate_dataset is reproducible and loads everything the signals would have"""
+
+    def generate(self, **options):
+        """Rows generated with `options`, rolled back afterwards"""
+        with transaction.atomic():
+            call_command('generate_dataset', scale=0.02, until='2026-01-31', stdout=io.StringIO(), **options)
+            rows = {
+                'users': list(User.objects.order_by('id').values_list('id', 'email', 'role', 'created_at')),
+                'tickets': list(Ticket.objects.order_by('id').values_list()),
+                'comments': list(Comment.objects.order_by('id').values_list()),
+                'notifications': list(
+                    Notification.objects.order_by('id').values_list(
+                        'user_id', 'notification_type', 'is_read', 'created_at', 'ticket_id', 'comment_id'
+                    )
+                ),
+                'events': TicketEvent.objects.count(),
+            }
+            transaction.set_rollback(True)
+        return rows
+
+    def test_same_seed_same_rows(self):
+        rows = self.generate(seed=1)
+        self.assertEqual(rows, self.generate(seed=1))
+        self.assertNotEqual(rows['tickets'], self.generate(seed=2)['tickets'])
+
+        roles = [role for _, _, role, _ in rows['users']]
+        self.assertEqual(len(roles), 20)
+        self.assertEqual({role: roles.count(role) for role in set(roles)}, {'student': 16, 'staff': 2, 'ict': 1, 'super_admin': 1})
+        self.assertEqual(len(rows['tickets']), 100)
+        # One new_ticket notification per ticket for the ICT member and the super admin
+        new_tickets = [row for row in rows['notifications'] if row[1] == 'new_ticket']
+        self.assertEqual(len(new_tickets), 200)
+        self.assertGreaterEqual(rows['events'], 100)
+
+    def test_team_stops_growing(self):
+        command = generate_dataset.Command()
+        command.rng = random.Random(0)
+        command.end = timezone.now()
+        command.password = ''
+        for scale, students in [(1, 880), (4, 3580)]:
+            with self.subTest(scale=scale):
+                rows = list(command.user_rows(scale))
+                self.assertEqual(len(rows), scale * 1000)
+                sizes = {role: len(ids) for role, ids in command.user_ids.items()}
+                self.assertEqual(sizes, {'student': students, 'staff': scale * 100, 'ict': 15, 'super_admin': 5})
+
+    def test_rejects_bad_options(self):
+        for options in [{'scale': 0}, {'batch_size': 0}, {'batch_size': -5}]:
+            with self.subTest(**options), self.assertRaises(CommandError):
+                call_command('generate_dataset', stdout=io.StringIO(), **options)
+        self.assertFalse(User.objects.exists())
+
+    def test_refuses_to_load_twice(self):
+        call_command('generate_dataset', scale=0.01, stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', scale=0.01, stdout=io.StringIO())
+        # New users get ids past the generated ones
+        self.assertGreater(User.objects.create_user(email='new@example.com', username='new', password='x').pk, 10)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class TicketQueryBudgetTests(QueryBudgetAssertions, TestCase):
+    """Ticket endpoints stay within their query budgets whatever the page holds"""
+
+    def setUp(self):
+        self.users = seed_helpdesk(tickets=2)
+        self.ticket = Ticket.objects.filter(created_by=self.users['student']).order_by('id').first()
+
+    def grow(self):
+        seed_helpdesk(tickets=8, comments=3, prefix='more')
+
+    def test_list_endpoints(self):
+        paths = [
+            '/api/tickets/', '/api/tickets/?compact=true', '/api/tickets/?include=latest_comments:3',
+            '/api/tickets/my_tickets/', '/api/tickets/my_tickets/?compact=1', '/api/tickets/changes/',
+        ]
+        for role in ('student', 'ict', 'super_admin'):
+            for path in paths:
+                with self.subTest(role=role, path=path):
+                    self.assertWithinBudget(self.users[role], path)
+        for path in ['/api/tickets/assigned_to_me/', '/api/tickets/assigned_to_me/?compact=1']:
+            with self.subTest(path=path):
+                self.assertWithinBudget(self.users['ict'], path, grow=self.grow)
+        self.grow()
+        for path in paths:
+            with self.subTest(path=path, grown=True):
+                self.assertWithinBudget(self.users['super_admin'], path)
+
+    def test_detail_endpoints(self):
+        for path in [
+            f'/api/tickets/{self.ticket.id}/', f'/api/tickets/{self.ticket.id}/?include=latest_comments',
+            f'/api/tickets/{self.ticket.id}/timeline/',
+        ]:
+            with self.subTest(path=path):
+                self.assertWithinBudget(self.users['student'], path, grow=self.grow)
+
+    def test_reporting_endpoints(self):
+        paths = ['/api/tickets/stats/', '/api/tickets/analytics/', '/api/tickets/analytics/assignees/', '/api/tickets/workload/']
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertWithinBudget(self.users['super_admin'], path)
+        self.grow()
+        for path in paths:
+            with self.subTest(path=path, grown=True):
+                self.assertWithinBudget(self.users['super_admin'], path)
+
+    @override_settings(QUERY_BUDGETS_ENFORCED=True)
+    def test_middleware_enforces_budget(self):
+        path = f'/api/tickets/{self.ticket.id}/timeline/'
+        response = self.get_as(self.users['student'], path)
+        self.assertLessEqual(int(response['X-Query-Count']), views.TicketViewSet.timeline.query_budget)
+
+        with mock.patch.object(views.TicketViewSet.timeline, 'query_budget', 1):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'budget 1'), self.assertLogs('bookissue.budgets'):
+                self.get_as(self.users['student'], path)
@@ -1,6 +1,7 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from bookissue.cache import cache_response
+from . import async_views, views
 
 app_name = 'tickets'
 
@@ -9,5 +10,8 @@ router = DefaultRouter()
 router.register(r'', views.TicketViewSet, basename='ticket')
 
 urlpatterns = [
+    # Async reads, falling back to the viewset for everything else
+    path('', cache_response(*views.TicketViewSet.cached_actions['list'])(async_views.ticket_list), name='ticket-list-async'),
+    re_path(r'^(?P<pk>[0-9]+)/$', async_views.ticket_detail, name='ticket-detail-async'),
     path('', include(router.urls)),
 ]
@@ -1,33 +1,113 @@
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import MultiPartParser, FormParser
+from django.db.models import Count, Max, Prefetch, Sum
+from django.utils import timezone
+from datetime import timedelta
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from bookissue.docs import openapi, swagger_auto_schema
 
-from .models import Ticket
+from .models import AssigneeWorkload, Ticket, TicketDailyStats, TicketEvent
 from .serializers import (
     TicketSerializer,
     TicketCreateSerializer,
-    TicketListSerializer
+    TicketListSerializer,
+    TicketEventSerializer,
+    TicketDailyStatsSerializer,
+    AssigneeDailyStatsSerializer,
+    TicketCompactSerializer,
+    TombstoneSerializer,
+    WorkloadSerializer
 )
-from .permissions import IsOwnerOrCanManageTickets, CanAssignTickets
+from .sync import (
+    DEFAULT_BATCH_SIZE,
+    MAX_BATCH_SIZE,
+    InvalidCursor,
+    changes_since,
+    decode_cursor,
+    encode_cursor,
+    initial_position
+)
+from .permissions import IsOwnerOrCanManageTickets, CanAssignTickets, CanViewAllTickets
 from users.models import User
+from comments.models import Comment
+from comments.serializers import CommentSerializer
+from users.sideload import compact_list_response, compact_requested
+from bookissue.budgets import query_budget
+from bookissue.cache import CachedActionsMixin
+from bookissue.conditional import latest, make_etag, not_modified, set_validators
+from bookissue.compiled import compiled_list_response
+from bookissue.fieldsets import prune_queryset
+from bookissue.renderers import FastJSONParser
+
+LATEST_COMMENTS_DEFAULT = 3
+LATEST_COMMENTS_MAX = 20
+
+include_parameter = openapi.Parameter(
+    'include', openapi.IN_QUERY,
+    description=f"Embed related data, e.g. latest_comments:3 (newest N comments, max {LATEST_COMMENTS_MAX})",
+    type=openapi.TYPE_STRING
+)
+fields_parameters = [
+    openapi.Parameter('fields', openapi.IN_QUERY, description="Comma-separated fields to return, e.g. id,title,status", type=openapi.TYPE_STRING),
+    openapi.Parameter('omit', openapi.IN_QUERY, description="Comma-separated fields to leave out", type=openapi.TYPE_STRING),
+]
+compact_parameter = openapi.Parameter(
+    'compact', openapi.IN_QUERY,
+    description="Return user ids in rows and each user once under included.users",
+    type=openapi.TYPE_BOOLEAN
+)
+
+
+def validator_rows(queryset, pk):
+    """
+    The values a ticket detail's validators derive from: besides the
+    ticket's own updated_at, the representation depends on its comment
+    count, embedded comments (edits included) and on the nested
+    creator/assignee.
+    """
+    return (
+        queryset.filter(pk=pk)
+        .annotate(
+            comment_count=Count('comments'),
+            last_comment_id=Max('comments__id'),
+            last_comment_at=Max('comments__created_at'),
+            last_comment_update=Max('comments__updated_at'),
+        )
+        .values_list(
+            'updated_at', 'created_by__updated_at', 'assigned_to__updated_at',
+            'comment_count', 'last_comment_id', 'last_comment_at', 'last_comment_update'
+        )
+    )
+
+
+def ticket_validators(pk, include, row):
+    """ETag and Last-Modified for a validator_rows() row"""
+    updated_at, creator_updated_at, assignee_updated_at, _, _, last_comment_at, last_comment_update = row
+    last_modified = latest(updated_at, creator_updated_at, assignee_updated_at, last_comment_at, last_comment_update)
+    return make_etag('ticket', pk, include, *row), last_modified
 
 
-class TicketViewSet(viewsets.ModelViewSet):
+class TicketViewSet(CachedActionsMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing tickets
     """
     queryset = Ticket.objects.all()
     permission_classes = [permissions.IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, FastJSONParser]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'assigned_to', 'created_by']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'updated_at', 'status']
     ordering = ['-created_at']
+    # Dashboard lists, cached per user (rows embed users and comment counts)
+    cached_actions = {
+        'list': ('tickets', 'comments', 'users'),
+        'my_tickets': ('tickets', 'comments', 'users'),
+        'assigned_to_me': ('tickets', 'comments', 'users'),
+    }
 
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -42,7 +122,8 @@ class TicketViewSet(viewsets.ModelViewSet):
         if self.action in ['list', 'retrieve', 'update', 'partial_update', 'destroy']:
             permission_classes = [permissions.IsAuthenticated, IsOwnerOrCanManageTickets]
         else:
-            permission_classes = [permissions.IsAuthenticated]
+            # Extra actions may declare their own permission_classes
+            permission_classes = self.permission_classes
         
         return [permission() for permission in permission_classes]
 
@@ -52,10 +133,82 @@ class TicketViewSet(viewsets.ModelViewSet):
         
         if user.can_manage_tickets():
             # Staff and ICT can see all tickets
-            return Ticket.objects.all()
+            queryset = Ticket.objects.all()
         else:
             # Students can only see their own tickets
-            return Ticket.objects.filter(created_by=user)
+            queryset = Ticket.objects.filter(created_by=user)
+
+        if self.action in ['list', 'retrieve']:
+            if self.action == 'list' and compact_requested(self.request):
+                serializer = TicketCompactSerializer(context=self.get_serializer_context())
+            else:
+                serializer = self.get_serializer()
+            queryset = self.prune_queryset(queryset, serializer)
+            limit = self.get_latest_comments_limit()
+            if limit:
+                queryset = queryset.prefetch_related(Prefetch(
+                    'comments',
+                    queryset=Comment.latest_for_tickets(limit),
+                    to_attr='latest_comments'
+                ))
+        return queryset
+
+    def prune_queryset(self, queryset, serializer):
+        """Load only the joins, counts and columns the serializer renders"""
+        return prune_queryset(
+            queryset, serializer,
+            annotations={'comments_count': Count('comments')},
+            always=['created_by']
+        )
+
+    def get_latest_comments_limit(self):
+        """Parse ?include=latest_comments[:N]; None when not requested"""
+        include = self.request.query_params.get('include', '')
+        for item in include.split(','):
+            name, _, count = item.strip().partition(':')
+            if name != 'latest_comments':
+                continue
+            if not count:
+                return LATEST_COMMENTS_DEFAULT
+            if not count.isdigit() or int(count) < 1:
+                raise ValidationError({'error': 'Invalid latest_comments count'})
+            return min(int(count), LATEST_COMMENTS_MAX)
+        return None
+
+    def get_validators(self):
+        """ETag and Last-Modified for the ticket detail, from one small query"""
+        pk = str(self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, ''))
+        if not pk.isdigit():
+            return None, None
+
+        row = validator_rows(self.get_queryset(), pk).first()
+        if row is None:
+            return None, None
+        return ticket_validators(pk, self.request.query_params.get('include', ''), row)
+
+    @swagger_auto_schema(manual_parameters=[include_parameter, compact_parameter, *fields_parameters])
+    @query_budget(5)
+    def list(self, request, *args, **kwargs):
+        """List tickets, optionally with their latest comments or in the compact shape"""
+        queryset = self.filter_queryset(self.get_queryset())
+        if compact_requested(request):
+            return compact_list_response(self, queryset, TicketCompactSerializer)
+        if self.get_latest_comments_limit() is None:
+            response = compiled_list_response(self, queryset, self.get_serializer())
+            if response is not None:
+                return response
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(manual_parameters=[include_parameter, *fields_parameters])
+    @query_budget(5)
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a ticket, answering conditional requests with 304"""
+        etag, last_modified = self.get_validators()
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
 
     @swagger_auto_schema(
         operation_description="Create a new ticket",
@@ -68,6 +221,11 @@ class TicketViewSet(viewsets.ModelViewSet):
         """Auto-fill created_by with current user"""
         serializer.save(created_by=self.request.user)
 
+    def perform_update(self, serializer):
+        """Record who made the change in the ticket's activity log"""
+        serializer.instance._actor = self.request.user
+        serializer.save()
+
     @swagger_auto_schema(
         operation_description="Assign ticket to a staff/ICT member",
         request_body=openapi.Schema(
@@ -105,6 +263,7 @@ class TicketViewSet(viewsets.ModelViewSet):
         else:
             ticket.assigned_to = None
         
+        ticket._actor = request.user
         ticket.save()
         serializer = TicketSerializer(ticket)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -135,27 +294,43 @@ class TicketViewSet(viewsets.ModelViewSet):
             )
         
         ticket.status = new_status
+        ticket._actor = request.user
         ticket.save()
         
         serializer = TicketSerializer(ticket)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @swagger_auto_schema(
+        operation_description="Get the activity log of a ticket (creation, status changes, assignments, comments)",
+        responses={200: TicketEventSerializer(many=True)}
+    )
+    @action(detail=True, methods=['get'])
+    @query_budget(3)
+    def timeline(self, request, pk=None):
+        """Get the ticket's activity log, oldest first"""
+        ticket = self.get_object()
+        events = TicketEvent.objects.filter(ticket=ticket).order_by('id')
+        serializer = TicketEventSerializer(events, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @swagger_auto_schema(
         operation_description="Get tickets assigned to current user",
+        manual_parameters=[compact_parameter],
         responses={200: TicketListSerializer(many=True)}
     )
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @query_budget(3)
     def my_tickets(self, request):
         """Get tickets created by current user"""
-        tickets = Ticket.objects.filter(created_by=request.user)
-        serializer = TicketListSerializer(tickets, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.list_unpaginated(Ticket.objects.filter(created_by=request.user))
 
     @swagger_auto_schema(
         operation_description="Get tickets assigned to current user",
+        manual_parameters=[compact_parameter],
         responses={200: TicketListSerializer(many=True)}
     )
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @query_budget(3)
     def assigned_to_me(self, request):
         """Get tickets assigned to current user (staff/ICT only)"""
         if not request.user.can_manage_tickets():
@@ -164,8 +339,21 @@ class TicketViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        tickets = Ticket.objects.filter(assigned_to=request.user)
-        serializer = TicketListSerializer(tickets, many=True)
+        return self.list_unpaginated(Ticket.objects.filter(assigned_to=request.user))
+
+    def list_unpaginated(self, tickets):
+        """Full (unpaginated) ticket list in the shape and fields the request asks for"""
+        context = self.get_serializer_context()
+        if compact_requested(self.request):
+            tickets = self.prune_queryset(tickets, TicketCompactSerializer(context=context))
+            return compact_list_response(self, tickets, TicketCompactSerializer, paginate=False)
+
+        serializer = TicketListSerializer(context=context)
+        tickets = self.prune_queryset(tickets, serializer)
+        response = compiled_list_response(self, tickets, serializer, paginate=False)
+        if response is not None:
+            return response
+        serializer = TicketListSerializer(tickets, many=True, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
@@ -187,6 +375,7 @@ class TicketViewSet(viewsets.ModelViewSet):
         }
     )
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @query_budget(7)
     def stats(self, request):
         """Get ticket statistics"""
         if request.user.can_manage_tickets():
@@ -211,3 +400,151 @@ class TicketViewSet(viewsets.ModelViewSet):
             'assigned_tickets': assigned_tickets,
             'unassigned_tickets': unassigned_tickets
         }, status=status.HTTP_200_OK)
+
+    def get_analytics_days(self, request):
+        """Number of days requested through ?days= (1-366, default 30)"""
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 30
+        return max(1, min(days, 366))
+
+    @swagger_auto_schema(
+        operation_description="Get daily resolution and first-response analytics (staff/ICT only). Durations are in seconds.",
+        manual_parameters=[
+            openapi.Parameter('days', openapi.IN_QUERY, description="Number of days to return (default 30)", type=openapi.TYPE_INTEGER)
+        ],
+        responses={
+            200: openapi.Response(
+                description="Daily analytics",
+                examples={
+                    "application/json": {
+                        "days": [
+                            {
+                                "day": "2025-08-01",
+                                "created_count": 12,
+                                "resolved_count": 9,
+                                "resolve_p50": 86400.0,
+                                "resolve_p90": 259200.0,
+                                "response_count": 10,
+                                "response_p50": 3600.0,
+                                "response_p90": 14400.0
+                            }
+                        ],
+                        "totals": {"created_count": 12, "resolved_count": 9}
+                    }
+                }
+            )
+        }
+    )
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated, CanViewAllTickets])
+    @query_budget(3)
+    def analytics(self, request):
+        """Get team-wide daily analytics from the precomputed rollups"""
+        since = timezone.localdate() - timedelta(days=self.get_analytics_days(request) - 1)
+        rows = TicketDailyStats.objects.filter(day__gte=since, assignee__isnull=True).order_by('day')
+        totals = rows.aggregate(created_count=Sum('created_count'), resolved_count=Sum('resolved_count'))
+        return Response({
+            'days': TicketDailyStatsSerializer(rows, many=True).data,
+            'totals': {key: value or 0 for key, value in totals.items()}
+        }, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description="Get daily throughput per assignee (staff/ICT only). Durations are in seconds.",
+        manual_parameters=[
+            openapi.Parameter('days', openapi.IN_QUERY, description="Number of days to return (default 30)", type=openapi.TYPE_INTEGER)
+        ],
+        responses={200: AssigneeDailyStatsSerializer(many=True)}
+    )
+    @action(detail=False, methods=['get'], url_path='analytics/assignees',
+            permission_classes=[permissions.IsAuthenticated, CanViewAllTickets])
+    @query_budget(2)
+    def analytics_assignees(self, request):
+        """Get per-assignee daily throughput from the precomputed rollups"""
+        since = timezone.localdate() - timedelta(days=self.get_analytics_days(request) - 1)
+        rows = (
+            TicketDailyStats.objects.filter(day__gte=since, assignee__isnull=False)
+            .select_related('assignee')
+            .order_by('day', 'assignee_id')
+        )
+        return Response(AssigneeDailyStatsSerializer(rows, many=True).data, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description="Get open/in-progress/resolved counts and the oldest unresolved ticket per assignee (staff/ICT only)",
+        responses={
+            200: openapi.Response(
+                description="Team workload",
+                examples={
+                    "application/json": [
+                        {
+                            "assignee": {"id": 4, "email": "ict@example.com", "full_name": "ICT Officer", "role": "ict"},
+                            "open_count": 5,
+                            "in_progress_count": 2,
+                            "resolved_count": 40,
+                            "oldest_open_at": "2025-08-01T10:00:00Z",
+                            "oldest_open_age_seconds": 172800
+                        }
+                    ]
+                }
+            )
+        }
+    )
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated, CanViewAllTickets])
+    @query_budget(2)
+    def workload(self, request):
+        """Get the whole team's workload from the precomputed summary"""
+        rows = (
+            AssigneeWorkload.objects.select_related('assignee')
+            .order_by('-open_count', '-in_progress_count', 'assignee_id')
+        )
+        return Response(WorkloadSerializer(rows, many=True).data, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description="Get tickets, comments and deletions changed since a sync cursor",
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Cursor returned by the previous call (omit for a full sync)", type=openapi.TYPE_STRING),
+            openapi.Parameter('limit', openapi.IN_QUERY, description=f"Maximum rows per stream (default {DEFAULT_BATCH_SIZE}, max {MAX_BATCH_SIZE})", type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Batch of changes",
+                examples={
+                    "application/json": {
+                        "tickets": [],
+                        "comments": [],
+                        "deleted": [{"object_type": "comment", "object_id": 12, "ticket_id": 3, "deleted_at": "2025-08-01T10:00:00Z"}],
+                        "cursor": "eyJ0IjpbbnVsbCwwXSwiYyI6W251bGwsMF0sImQiOjB9",
+                        "has_more": False
+                    }
+                }
+            ),
+            400: "Bad Request - Invalid cursor or limit"
+        }
+    )
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @query_budget(5)
+    def changes(self, request):
+        """Delta sync feed, scoped exactly like the ticket list"""
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_BATCH_SIZE))
+        except ValueError:
+            return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MAX_BATCH_SIZE))
+
+        cursor = request.query_params.get('cursor')
+        try:
+            position = decode_cursor(cursor) if cursor else initial_position()
+        except InvalidCursor:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+        tickets, comments, tombstones, next_position, has_more = changes_since(
+            self.get_queryset(), request.user, position, limit
+        )
+        context = self.get_serializer_context()
+        return Response({
+            'tickets': TicketSerializer(tickets, many=True, context=context).data,
+            'comments': CommentSerializer(comments, many=True, context=context).data,
+            'deleted': TombstoneSerializer(tombstones, many=True).data,
+            'cursor': encode_cursor(next_position),
+            'has_more': has_more
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,71 @@
+"""
+Maintenance of the per-assignee workload summary (AssigneeWorkload).
+
+PostgreSQL keeps it in a materialized view that is refreshed concurrently
+(readers are never blocked), typically from cron via refresh_workload.
+Other databases store it in a plain table and recompute only the rows of
+assignees touched by a ticket change.
+"""
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q
+
+from .models import AssigneeWorkload, Ticket
+
+
+def uses_materialized_view():
+    return connection.vendor == 'postgresql'
+
+
+def _aggregate(tickets):
+    return (
+        tickets.filter(assigned_to__isnull=False)
+        .order_by()
+        .values('assigned_to_id')
+        .annotate(
+            open_count=Count('id', filter=Q(status='OPEN')),
+            in_progress_count=Count('id', filter=Q(status='IN_PROGRESS')),
+            resolved_count=Count('id', filter=Q(status='RESOLVED')),
+            oldest_open_at=Min('created_at', filter=~Q(status='RESOLVED')),
+        )
+    )
+
+
+def _rows(aggregates):
+    return [
+        AssigneeWorkload(
+            assignee_id=row['assigned_to_id'],
+            open_count=row['open_count'],
+            in_progress_count=row['in_progress_count'],
+            resolved_count=row['resolved_count'],
+            oldest_open_at=row['oldest_open_at'],
+        )
+        for row in aggregates
+    ]
+
+
+def refresh_workload(concurrently=True):
+    """Rebuild the whole summary"""
+    if uses_materialized_view():
+        option = 'CONCURRENTLY ' if concurrently else ''
+        with connection.cursor() as cursor:
+            cursor.execute(f'REFRESH MATERIALIZED VIEW {option}{AssigneeWorkload._meta.db_table}')
+        return
+
+    with transaction.atomic():
+        AssigneeWorkload.objects.all().delete()
+        AssigneeWorkload.objects.bulk_create(_rows(_aggregate(Ticket.objects.all())))
+
+
+def update_workload(assignee_ids):
+    """
+    Recompute the rows of the given assignees (table mode only; the
+    materialized view is refreshed as a whole on its own schedule).
+    """
+    assignee_ids = {pk for pk in assignee_ids if pk}
+    if not assignee_ids or uses_materialized_view():
+        return
+
+    rows = _rows(_aggregate(Ticket.objects.filter(assigned_to_id__in=assignee_ids)))
+    with transaction.atomic():
+        AssigneeWorkload.objects.filter(assignee_id__in=assignee_ids).delete()
+        AssigneeWorkload.objects.bulk_create(rows)
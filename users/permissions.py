@@ -43,6 +43,15 @@ class IsICTUser(permissions.BasePermission):
         return request.user.is_authenticated and request.user.is_ict()
 
 
+class IsSuperAdmin(permissions.BasePermission):
+    """
+    Custom permission to only allow super admins.
+    """
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.is_super_admin()
+
+
 class CanManageTickets(permissions.BasePermission):
     """
     Custom permission for users who can manage tickets (staff and ICT).
@@ -3,6 +3,7 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 import os
 from .models import User
+from bookissue.fieldsets import SparseFieldsMixin
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -79,12 +80,13 @@ class UserLoginSerializer(serializers.Serializer):
             raise serializers.ValidationError('Must include email and password.')
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for user profile (read/update)
     """
     full_name = serializers.ReadOnlyField()
     profile_picture_url = serializers.ReadOnlyField()
+    sparse_requires = {'full_name': ['first_name', 'last_name'], 'profile_picture_url': ['profile_picture']}
 
     class Meta:
         model = User
@@ -112,12 +114,29 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return value
 
 
-class UserListSerializer(serializers.ModelSerializer):
+def user_full_name(first_name, last_name):
+    """User.full_name from column values"""
+    return f"{first_name} {last_name}"
+
+
+def user_picture_url(profile_picture):
+    """User.profile_picture_url from the stored file name"""
+    if profile_picture:
+        return User._meta.get_field('profile_picture').storage.url(profile_picture)
+    return None
+
+
+class UserListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for listing users (minimal info)
     """
     full_name = serializers.ReadOnlyField()
     profile_picture_url = serializers.ReadOnlyField()
+    sparse_requires = {'full_name': ['first_name', 'last_name'], 'profile_picture_url': ['profile_picture']}
+    compiled_fields = {
+        'full_name': (['first_name', 'last_name'], user_full_name),
+        'profile_picture_url': (['profile_picture'], user_picture_url),
+    }
 
     class Meta:
         model = User
@@ -0,0 +1,111 @@
+"""
+Side-loading of users for list payloads: rows reference users by id and
+each user is sent once under `included.users` (a map keyed by id), in the
+same shape as UserListSerializer, built from values() rows.
+
+List endpoints switch to this compact shape with ?compact=true. Long
+unpaginated lists are streamed (bookissue/streaming.py), their users
+sent after the rows.
+"""
+from rest_framework.fields import DateTimeField
+from rest_framework.response import Response
+
+from bookissue.streaming import render_json, split_rows, stream_json_list
+
+from .models import User
+
+USER_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name', 'role',
+    'department', 'profile_picture', 'is_active', 'created_at'
+)
+
+_datetime = DateTimeField()
+
+
+def user_row(values, request=None):
+    """UserListSerializer-compatible dict from a values() row"""
+    picture_url = None
+    if values['profile_picture']:
+        picture_url = User._meta.get_field('profile_picture').storage.url(values['profile_picture'])
+
+    return {
+        'id': values['id'],
+        'email': values['email'],
+        'username': values['username'],
+        'first_name': values['first_name'],
+        'last_name': values['last_name'],
+        'full_name': f"{values['first_name']} {values['last_name']}",
+        'role': values['role'],
+        'department': values['department'],
+        # Like ImageField serialization: absolute when a request is available
+        'profile_picture': request.build_absolute_uri(picture_url) if picture_url and request else picture_url,
+        'profile_picture_url': picture_url,
+        'is_active': values['is_active'],
+        'created_at': _datetime.to_representation(values['created_at']),
+    }
+
+
+def _user_rows(user_ids):
+    user_ids = {pk for pk in user_ids if pk is not None}
+    if not user_ids:
+        return User.objects.none()
+    return User.objects.filter(id__in=user_ids).order_by('id').values(*USER_FIELDS)
+
+
+def sideload_users(user_ids, request=None):
+    """The given users (None ids are skipped) keyed by id, in one query"""
+    return {row['id']: user_row(row, request) for row in _user_rows(user_ids)}
+
+
+async def asideload_users(user_ids, request=None):
+    """sideload_users() for async views"""
+    return {row['id']: user_row(row, request) async for row in _user_rows(user_ids)}
+
+
+def compact_requested(request):
+    return request.query_params.get('compact', '').lower() in ('true', '1', 'yes')
+
+
+def compact_list_response(view, queryset, serializer_class, paginate=True):
+    """
+    List response in the compact shape: rows rendered by `serializer_class`
+    (users as ids, collected by its `user_ids(rows)` for the fields it
+    renders) and the users under included.users. Paginated like the view
+    when `paginate` is set.
+    """
+    page = view.paginate_queryset(queryset) if paginate else None
+    if page is not None:
+        rows = page
+    elif paginate:
+        rows = list(queryset)
+    else:
+        rows, rest = split_rows(view.request, queryset)
+        if rest is not None:
+            return stream_compact_list(view, rows, rest, serializer_class)
+        rows = list(rows)
+    serializer = serializer_class(rows, many=True, context=view.get_serializer_context())
+    data = serializer.data
+    included = {'users': sideload_users(serializer.child.user_ids(rows), view.request)}
+
+    if page is None:
+        return Response({'results': data, 'included': included})
+    response = view.get_paginated_response(data)
+    response.data['included'] = included
+    return response
+
+
+def stream_compact_list(view, head, rest, serializer_class):
+    """compact_list_response() streamed; the users go out after the last row"""
+    context = view.get_serializer_context()
+    user_ids = set()
+
+    def render(rows):
+        serializer = serializer_class(rows, many=True, context=context)
+        user_ids.update(serializer.child.user_ids(rows))
+        return serializer.data
+
+    def included():
+        users = render_json({'users': sideload_users(user_ids, view.request)})
+        return b',"included":' + users + b'}'
+
+    return stream_json_list(view.request, head, rest, render, before=b'{"results":', after=included)
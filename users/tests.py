@@ -1,3 +1,162 @@
-from django.test import TestCase
+import itertools
+from unittest import mock
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from bookissue.compiled import compile_serializer
+from bookissue.testing import QueryBudgetAssertions, seed_helpdesk
+from comments.models import Comment
+from notifications.models import Notification
+from tickets.models import Ticket
+from .models import User
+from .sideload import sideload_users
+from .serializers import UserListSerializer
+
+
+class CompiledUserSerializerTests(TestCase):
+    """Golden tests: the compiled list path renders byte-identical output"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            email='staff@example.com', username='staff', password='x',
+            first_name='Sam', last_name='Staff', role='staff', department='Library'
+        )
+        User.objects.create_user(
+            email='pic@example.com', username='pic', password='x', first_name='Pat', last_name='O\'Pic',
+            profile_picture='profile_pictures/profile_2.jpg', is_active=False
+        )
+        User.objects.create_user(
+            email='ict@example.com', username='ict', password='x', first_name='Ìan', last_name='Ict', role='ict'
+        )
+
+    def test_user_list_matches_serializer(self):
+        queryset = User.objects.order_by('id')
+        compiled = compile_serializer(UserListSerializer())
+        expected = JSONRenderer().render(UserListSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(compiled.render(queryset.values_list(*compiled.paths)))
+        self.assertEqual(expected, actual)
+
+    def test_list_endpoint_matches_regular_path(self):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        for url in ['/api/users/', '/api/users/?fields=id,full_name,profile_picture', '/api/users/?omit=email&role=student']:
+            compiled = client.get(url)
+            with mock.patch('users.views.compiled_list_response', return_value=None):
+                regular = client.get(url)
+            self.assertEqual(compiled.status_code, 200)
+            self.assertEqual(compiled.content, regular.content, url)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class UserQueryBudgetTests(QueryBudgetAssertions, TestCase):
+    """User endpoints stay within their query budgets whatever the page holds"""
+
+    def test_read_endpoints(self):
+        users = seed_helpdesk(tickets=1)
+        numbers = itertools.count()
+
+        def grow():
+            for index in itertools.islice(numbers, 10):
+                User.objects.create(email=f'user{index}@example.org', username=f'user-{index}', role='student')
+            seed_helpdesk(tickets=3, prefix='more')
+
+        self.assertWithinBudget(users['student'], '/api/users/me/')
+        for path in ['/api/users/', '/api/users/?compact=1', '/api/users/stats/']:
+            with self.subTest(path=path):
+                self.assertWithinBudget(users['staff'], path, grow=grow)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class SideloadUsersTests(TestCase):
+    """Compact lists reference users by id and send each referenced user once, as the full shape would"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(
+            email='student@example.com', username='student', password='x', first_name='Jane', last_name='Doe',
+            profile_picture='profile_pictures/profile_1.jpg'
+        )
+        cls.ict = User.objects.create_user(email='ict@example.com', username='ict', password='x', role='ict')
+        cls.staff = User.objects.create_user(email='staff@example.com', username='staff', password='x', role='staff')
+        User.objects.create_user(email='bystander@example.com', username='bystander', password='x')
+        for index in range(6):
+            ticket = Ticket.objects.create(
+                title=f'Ticket {index}', description='x', created_by=cls.student,
+                assigned_to=[None, cls.ict, cls.staff][index % 3]
+            )
+            for author in (cls.student, cls.staff, cls.student):
+                Comment.objects.create(ticket=ticket, author=author, message='Any news?')
+        Notification.create_notification(cls.student, 'Assigned', 'x')
+        Notification.create_notification(cls.student, 'Commented', 'x')
+
+    def get(self, path):
+        client = APIClient()
+        client.force_authenticate(self.ict)
+        response = client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        return response.json()
+
+    def test_user_rows_match_user_list_serializer(self):
+        request = Request(RequestFactory().get('/api/tickets/'))
+        users = User.objects.order_by('id')
+        for context in ({}, {'request': request}):
+            with self.subTest(request='request' in context):
+                expected = {user.id: UserListSerializer(user, context=context).data for user in users}
+                self.assertEqual(sideload_users(list(expected) + [None], context.get('request')), expected)
+        self.assertTrue(sideload_users([self.student.id], request)[self.student.id]['profile_picture'].startswith('http://'))
+        with self.assertNumQueries(0):
+            self.assertEqual(sideload_users([None]), {})
+
+    def assertSideloaded(self, full_rows, compact, references):
+        """Every reference resolves to the user the full row embeds; nothing else is included"""
+        users = compact['included']['users']
+        referenced = set()
+        for full, row in zip(full_rows, compact['results'], strict=True):
+            for compact_field, full_field in references.items():
+                user_id = row[compact_field]
+                if user_id is None:
+                    self.assertIsNone(full[full_field])
+                    continue
+                referenced.add(str(user_id))
+                self.assertEqual(users[str(user_id)], full[full_field])
+        self.assertEqual(set(users), referenced)
+
+    def test_ticket_list(self):
+        full = self.get('/api/tickets/?ordering=id')
+        compact = self.get('/api/tickets/?ordering=id&compact=1')
+        self.assertSideloaded(full['results'], compact, {'created_by': 'created_by', 'assigned_to': 'assigned_to'})
+        # Six tickets reference the same three users
+        self.assertEqual(len(compact['included']['users']), 3)
+        self.assertEqual(compact['count'], full['count'])
+
+    def test_ticket_list_with_latest_comments(self):
+        compact = self.get('/api/tickets/?ordering=id&compact=1&include=latest_comments:2&fields=id,latest_comments')
+        authors = {str(c['author']) for row in compact['results'] for c in row['latest_comments']}
+        self.assertEqual(authors, {str(self.student.id), str(self.staff.id)})
+        self.assertEqual(set(compact['included']['users']), authors)
+
+    def test_comment_list(self):
+        ticket = Ticket.objects.order_by('id').first()
+        path = f'/api/comments/tickets/{ticket.id}/comments/'
+        full = self.get(path)
+        compact = self.get(f'{path}?compact=1')
+        self.assertSideloaded(full['results'], compact, {'author': 'author_details'})
+        self.assertEqual(len(compact['results']), 3)
+        self.assertEqual(len(compact['included']['users']), 2)
+
+    def test_notification_list(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        compact = client.get('/api/notifications/?compact=1').json()
+        self.assertEqual({row['user'] for row in compact['results']}, {self.student.id})
+        self.assertEqual(compact['included']['users'], {str(self.student.id): UserListSerializer(
+            self.student, context={'request': Request(RequestFactory().get('/'))}
+        ).data})
+
+    def test_pruned_user_fields_include_nobody(self):
+        compact = self.get('/api/tickets/?compact=1&fields=id,title')
+        self.assertEqual(compact['included']['users'], {})
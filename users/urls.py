@@ -1,6 +1,8 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 
+from bookissue.cache import cache_response
+
 from . import views
 
 app_name = 'users'
@@ -19,8 +21,8 @@ urlpatterns = [
     path('me/', views.get_current_user, name='current_user'),
     
     # User management endpoints (for staff and ICT)
-    path('', views.UserListView.as_view(), name='user_list'),
+    path('', cache_response('users')(views.UserListView.as_view()), name='user_list'),
     path('create/', views.UserCreateView.as_view(), name='user_create'),
     path('<int:id>/', views.UserDetailView.as_view(), name='user_detail'),
-    path('stats/', views.get_user_stats, name='user_stats'),
+    path('stats/', cache_response('users')(views.get_user_stats), name='user_stats'),
 ]
@@ -6,8 +6,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ValidationError
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from bookissue.docs import openapi, swagger_auto_schema
 
 from .models import User
 from .serializers import (
@@ -20,6 +19,9 @@ from .serializers import (
     ProfilePictureUploadSerializer
 )
 from .permissions import IsOwnerOrReadOnly, IsStaffOrICT, CanManageTickets
+from bookissue.budgets import query_budget
+from bookissue.compiled import compiled_list_response
+from bookissue.fieldsets import prune_queryset
 
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -282,7 +284,15 @@ class UserListView(generics.ListAPIView):
         if is_active is not None:
             queryset = queryset.filter(is_active=is_active.lower() == 'true')
 
-        return queryset
+        return prune_queryset(queryset, self.get_serializer())
+
+    @query_budget(3)
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        response = compiled_list_response(self, queryset, self.get_serializer())
+        if response is not None:
+            return response
+        return super().list(request, *args, **kwargs)
 
 
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -299,6 +309,11 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
             return UserUpdateSerializer
         return UserProfileSerializer
 
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return prune_queryset(User.objects.all(), self.get_serializer())
+        return User.objects.all()
+
     def perform_destroy(self, instance):
         # Prevent super admins from deleting themselves
         if instance == self.request.user:
@@ -315,6 +330,7 @@ class UserCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsStaffOrICT]
 
 
+@query_budget(1)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def get_current_user(request):
@@ -325,6 +341,7 @@ def get_current_user(request):
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@query_budget(6)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, CanManageTickets])
 def get_user_stats(request):